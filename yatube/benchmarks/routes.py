@@ -0,0 +1,76 @@
+from collections import namedtuple
+
+from django.urls import URLPattern
+
+from about import urls as about_urls
+from posts import api_urls
+from posts import urls as posts_urls
+
+# user: None для анонимного запроса, иначе "author" или "reader" из Sample.
+Route = namedtuple("Route", "label name method kwargs params user")
+
+
+def url_names():
+    """Имена всех адресов posts.urls, about.urls и JSON API."""
+    names = set()
+    for module, prefix in (
+        (posts_urls, ""), (about_urls, "about:"), (api_urls, "api_v1:")
+    ):
+        for pattern in module.urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                names.add(prefix + pattern.name)
+    return names
+
+
+def routes(sample):
+    """
+    Запросы, которыми прогоняются страницы. Для записи на каждый
+    прогон создаётся новая запись или комментарий, подписка и отписка
+    идут парой и каждый раз реально меняют данные.
+    """
+    author = {"username": sample.author.username}
+    post = {**author, "post_id": sample.post.id}
+    return [
+        Route("index", "index", "GET", {}, {}, None),
+        Route("index (auth)", "index", "GET", {}, {}, "reader"),
+        Route("index ?page=20", "index", "GET", {}, {"page": 20}, None),
+        Route("popular", "popular", "GET", {}, {}, None),
+        Route("group_list", "group_list", "GET", {}, {}, None),
+        Route("group_posts", "group_posts", "GET",
+              {"slug": sample.group.slug}, {}, None),
+        Route("profile", "profile", "GET", author, {}, "reader"),
+        Route("post", "post", "GET", post, {}, "reader"),
+        Route("post_comments", "post_comments", "GET", post, {}, "reader"),
+        Route("follow_index", "follow_index", "GET", {}, {}, "reader"),
+        Route("search", "search", "GET", {}, {"q": "кот прогулка"}, None),
+        Route("notifications", "notifications", "GET", {}, {}, "author"),
+        Route("new_post (form)", "new_post", "GET", {}, {}, "reader"),
+        Route("new_post", "new_post", "POST", {},
+              {"text": "Запись из бенчмарка"}, "reader"),
+        Route("post_edit (form)", "post_edit", "GET", post, {}, "author"),
+        Route("post_edit", "post_edit", "POST", post,
+              {"text": "Исправленная запись"}, "author"),
+        Route("add_comment", "add_comment", "POST", post,
+              {"text": "Комментарий из бенчмарка"}, "reader"),
+        Route("profile_follow", "profile_follow", "GET",
+              author, {}, "reader"),
+        Route("profile_unfollow", "profile_unfollow", "GET",
+              author, {}, "reader"),
+        Route("about:author", "about:author", "GET", {}, {}, None),
+        Route("about:tech", "about:tech", "GET", {}, {}, None),
+        Route("api index", "api_v1:index", "GET", {}, {}, None),
+        Route("api group_posts", "api_v1:group_posts", "GET",
+              {"slug": sample.group.slug}, {}, None),
+        Route("api profile", "api_v1:profile", "GET", author, {}, None),
+        Route("api comments", "api_v1:comments", "GET",
+              {"post_id": sample.post.id}, {}, None),
+        Route("api follow_index", "api_v1:follow_index", "GET",
+              {}, {}, "reader"),
+        Route("api following", "api_v1:following", "GET",
+              {"username": sample.reader.username}, {}, None),
+    ]
+
+
+def missing(route_list):
+    """Адреса, которые не покрыты ни одним запросом бенчмарка."""
+    return url_names() - {route.name for route in route_list}
@@ -0,0 +1,156 @@
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Разница p95 меньше этой величины не считается регрессией:
+# на страницах в пару миллисекунд она тонет в шуме.
+LATENCY_SLACK_MS = 2
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def clients(sample):
+    result = {None: Client()}
+    for name in ("author", "reader"):
+        result[name] = Client()
+        result[name].force_login(getattr(sample, name))
+    return result
+
+
+def request(client, route):
+    url = reverse(route.name, kwargs=route.kwargs)
+    if route.method == "POST":
+        response = client.post(url, route.params)
+    else:
+        response = client.get(url, route.params)
+    if response.streaming:
+        # Потоковый ответ рендерится при чтении, его время тоже в счёт.
+        b"".join(response.streaming_content)
+    if response.status_code >= 400:
+        raise BenchmarkError(
+            f"{route.label}: {route.method} {url} -> {response.status_code}"
+        )
+    return response
+
+
+def run(routes, sample, rounds=20, warmup=2):
+    """
+    Прогоняет все запросы по кругу rounds раз после warmup разогревочных
+    кругов. Запросы на запись идут вперемешку с чтением, как на живом
+    сайте, поэтому кэш страниц честно сбрасывается.
+
+    Выделения памяти меряются отдельным кругом под tracemalloc,
+    чтобы трассировка не искажала задержки.
+    """
+    users = clients(sample)
+    # Объекты, созданные при заполнении базы, убираются из-под сборщика
+    # мусора: иначе полные проходы по ним дают всплески в десятки
+    # миллисекунд у случайных адресов.
+    gc.collect()
+    gc.freeze()
+    try:
+        return measure(routes, users, rounds, warmup)
+    finally:
+        gc.unfreeze()
+
+
+def measure(routes, users, rounds, warmup):
+    timings = {route.label: [] for route in routes}
+    queries = {route.label: 0 for route in routes}
+    for number in range(warmup + rounds):
+        for route in routes:
+            # Журнал запросов ограничен 9000 записями, иначе
+            # CaptureQueriesContext перестаёт видеть новые запросы.
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                request(users[route.user], route)
+                elapsed = time.perf_counter() - start
+            if number >= warmup:
+                timings[route.label].append(elapsed * 1000)
+                queries[route.label] = max(
+                    queries[route.label], len(captured)
+                )
+
+    allocations = {}
+    for route in routes:
+        tracemalloc.start()
+        try:
+            request(users[route.user], route)
+            allocations[route.label] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        route.label: {
+            "p50_ms": round(percentile(timings[route.label], 0.50), 2),
+            "p95_ms": round(percentile(timings[route.label], 0.95), 2),
+            "p99_ms": round(percentile(timings[route.label], 0.99), 2),
+            "queries": queries[route.label],
+            "alloc_kib": round(allocations[route.label] / 1024, 1),
+        }
+        for route in routes
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Регрессии относительно baseline. Число запросов к базе не должно
+    расти вовсе, p95 и выделения памяти — больше чем на tolerance.
+    """
+    regressions = []
+    for label, current in results.items():
+        base = baseline.get(label)
+        if base is None:
+            continue
+        if current["queries"] > base["queries"]:
+            regressions.append(
+                f"{label}: запросов к базе {current['queries']}, "
+                f"было {base['queries']}"
+            )
+        if (
+            current["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+            and current["p95_ms"] - base["p95_ms"] > LATENCY_SLACK_MS
+        ):
+            regressions.append(
+                f"{label}: p95 {current['p95_ms']} мс, "
+                f"было {base['p95_ms']} мс"
+            )
+        if current["alloc_kib"] > base["alloc_kib"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: выделено {current['alloc_kib']} КиБ, "
+                f"было {base['alloc_kib']} КиБ"
+            )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, params, results):
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(
+            {"params": params, "routes": results},
+            baseline_file,
+            ensure_ascii=False,
+            indent=2,
+        )
+        baseline_file.write("\n")
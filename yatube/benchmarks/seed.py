@@ -0,0 +1,176 @@
+import json
+import random
+from collections import namedtuple
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+from posts import popular, search, thumbnails, timeline
+from posts.counters import rebuild_counters, rebuild_group_stats
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Больше 500 строк в одном INSERT старый SQLite не принимает.
+BATCH_SIZE = 500
+
+WORDS = (
+    "город", "утро", "кофе", "дорога", "поезд", "книга", "море", "зима",
+    "лето", "работа", "проект", "код", "ошибка", "релиз", "друзья", "кот",
+    "собака", "прогулка", "парк", "музыка", "концерт", "фильм", "ужин",
+    "рецепт", "погода", "дождь", "солнце", "горы", "река", "лес", "вечер",
+    "новости", "идея", "планы", "отпуск", "фотография", "сад", "весна",
+    "осень", "снег", "велосипед", "бег", "тренировка", "учёба", "экзамен",
+)
+
+Sample = namedtuple("Sample", "author reader post group")
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def zipf_weights(count):
+    """
+    Накопленные веса для random.choices(cum_weights=...): вес i-го
+    элемента 1/(i+1), так что немногие авторы и группы популярны.
+    """
+    return list(accumulate(1 / (rank + 1) for rank in range(count)))
+
+
+def source_image(rng, number):
+    image = Image.effect_mandelbrot(
+        (1600, 1000),
+        (-2 + rng.random(), -1.2, 1, 1.2),
+        60 + number
+    ).convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, "jpeg", quality=90)
+    return default_storage.save(
+        f"posts/bench-{number}.jpg", ContentFile(buffer.getvalue())
+    )
+
+
+def seed(users=200, groups=20, posts=20000, comments=50000, follows=20,
+         images=5, image_share=0.2, random_seed=0):
+    """
+    Заполняет базу данными реалистичного объёма пакетными вставками.
+
+    bulk_create не вызывает сигналы, поэтому счётчики, ленты подписок,
+    поисковый индекс и варианты картинок строятся отдельно — теми же
+    функциями, что и в приложении. Возвращает Sample с объектами,
+    на которых удобно строить адреса страниц.
+    """
+    rng = random.Random(random_seed)
+    now = timezone.now()
+
+    User.objects.bulk_create(
+        (User(username=f"user{number}", password="!")
+         for number in range(users)),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+    user_weights = zipf_weights(len(user_ids))
+
+    Group.objects.bulk_create(
+        (
+            Group(
+                title=f"Группа {number}",
+                slug=f"group-{number}",
+                description=sentence(rng, 5, 20),
+            )
+            for number in range(groups)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    group_ids = list(Group.objects.order_by("id").values_list("id", flat=True))
+    group_weights = zipf_weights(len(group_ids))
+
+    pairs = set()
+    for user_id in user_ids:
+        for author_id in rng.choices(
+            user_ids, cum_weights=user_weights, k=follows
+        ):
+            if author_id != user_id:
+                pairs.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in sorted(pairs)),
+        batch_size=BATCH_SIZE,
+    )
+
+    authors = rng.choices(user_ids, cum_weights=user_weights, k=posts)
+    post_groups = rng.choices(
+        group_ids, cum_weights=group_weights, k=posts
+    )
+    Post.objects.bulk_create(
+        (
+            Post(
+                text=sentence(rng, 10, 80),
+                author_id=author_id,
+                group_id=group_id if rng.random() < 0.6 else None,
+            )
+            for author_id, group_id in zip(authors, post_groups)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    # pub_date с auto_now_add заполняется текущим временем,
+    # раскладываем записи по последнему году.
+    post_ids = list(Post.objects.order_by("id").values_list("id", flat=True))
+    step = timedelta(days=365) / max(len(post_ids), 1)
+    batch = [
+        Post(id=post_id, pub_date=now - step * (len(post_ids) - index))
+        for index, post_id in enumerate(post_ids)
+    ]
+    Post.objects.bulk_update(batch, ["pub_date"], batch_size=BATCH_SIZE)
+
+    with_images = rng.sample(post_ids, int(len(post_ids) * image_share))
+    for number in range(min(images, len(with_images))):
+        post = Post.objects.get(id=with_images[number])
+        post.image.name = source_image(rng, number)
+        manifest = json.dumps(thumbnails.build_variants(post))
+        Post.objects.filter(id__in=with_images[number::images]).update(
+            image=post.image.name,
+            image_manifest=manifest,
+            thumbnail_status=Post.THUMBNAIL_READY,
+        )
+
+    # Свежие записи комментируют чаще старых.
+    commented = rng.choices(
+        post_ids[::-1], cum_weights=zipf_weights(len(post_ids)), k=comments
+    )
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                text=sentence(rng, 3, 30),
+            )
+            for post_id in commented
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Comment.objects.fill_root_paths()
+
+    rebuild_counters()
+    rebuild_group_stats()
+    timeline.rebuild()
+    search.rebuild(Post)
+    popular.update_all()
+
+    author = User.objects.get(id=user_ids[0])
+    reader = User.objects.get(id=user_ids[1])
+    if not Follow.objects.filter(user=reader, author=author).exists():
+        Follow.objects.create(user=reader, author=author)
+    return Sample(
+        author=author,
+        reader=reader,
+        post=Post.objects.filter(author=author).latest("pub_date", "id"),
+        group=Group.objects.get(id=group_ids[0]),
+    )
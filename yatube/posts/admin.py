@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import Group, Post
+from . import search
+from .models import Group, Post, Task
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по индексу, а не через LIKE по всей таблице.
+        if not search_term:
+            return queryset, False
+        return search.get_backend().filter(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "description")
@@ -16,5 +24,19 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "attempts", "run_at", "key")
+    list_filter = ("status", "name")
+    search_fields = ("key",)
+    actions = ("retry",)
+
+    def retry(self, request, queryset):
+        queryset.filter(status=Task.FAILED).update(
+            status=Task.PENDING, attempts=0, run_at=timezone.now()
+        )
+    retry.short_description = "Повторить упавшие задачи"
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Task, TaskAdmin)
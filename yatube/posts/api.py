@@ -0,0 +1,192 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from django.views.decorators.vary import vary_on_cookie
+
+from . import timeline
+from .models import Comment, Follow, Group, Post, User
+from .page_cache import (group_id, has_version, remember_id, remember_version,
+                         user_id, versions_etag)
+from .paginator import CursorPaginator
+from .views import follow_versions, get_page
+
+API_VERSION = "v1"
+
+# Без пробелов после разделителей: ответы читают приложения, не люди.
+JSON_PARAMS = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+def post_payload(post):
+    return {
+        "id": post.id,
+        "author": post.author.username,
+        "group": post.group.slug if post.group_id else None,
+        "text": post.text,
+        "pub_date": post.pub_date.isoformat(),
+        "image": post.image.url if post.image else None,
+        "comments": post.comment_count,
+    }
+
+
+def comment_payload(comment):
+    return {
+        "id": comment.id,
+        "parent": comment.parent_id,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created.isoformat(),
+    }
+
+
+def author_payload(user):
+    return {"username": user.username, "name": user.get_full_name()}
+
+
+def page_response(page, payload):
+    return JsonResponse(
+        {
+            "results": [payload(item) for item in page],
+            "next_cursor": page.next_cursor,
+            "previous_cursor": page.previous_cursor,
+        },
+        json_dumps_params=JSON_PARAMS,
+    )
+
+
+def error_response(detail, status):
+    return JsonResponse(
+        {"detail": detail}, status=status, json_dumps_params=JSON_PARAMS
+    )
+
+
+def feed_etag(feed_versions):
+    """
+    ETag ответа из поколений лент. feed_versions(request, **kwargs)
+    возвращает имена счётчиков или None, если ETag не нужен.
+
+    Счётчики читаются из кэша, поэтому клиент с актуальным ETag
+    получает 304 без запросов к базе.
+    """
+    def etag(request, *args, **kwargs):
+        names = feed_versions(request, *args, **kwargs)
+        if names is None:
+            return None
+        return f'"{API_VERSION}-{versions_etag(names)}"'
+
+    def decorator(view):
+        @wraps(view)
+        @require_GET
+        @cache_control(no_cache=True)
+        @condition(etag_func=etag)
+        def wrapper(request, *args, **kwargs):
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@feed_etag(lambda request: ["index"])
+def index(request):
+    paginator = CursorPaginator(Post.objects.feed(), settings.POSTS_PER_PAGE)
+    return page_response(get_page(request, paginator), post_payload)
+
+
+def group_versions(request, slug):
+    feed_group_id = group_id(slug)
+    if feed_group_id is None:
+        return None
+    return ["groups", f"group:{feed_group_id}"]
+
+
+@feed_etag(group_versions)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    remember_id("group", slug, group.id)
+    paginator = CursorPaginator(
+        Post.objects.feed().filter(group=group),
+        settings.POSTS_PER_PAGE
+    )
+    return page_response(get_page(request, paginator), post_payload)
+
+
+def profile_versions(request, username):
+    author_id = user_id(username)
+    if author_id is None:
+        return None
+    return ["groups", f"author:{author_id}"]
+
+
+@feed_etag(profile_versions)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    remember_id("user", username, author.id)
+    paginator = CursorPaginator(
+        Post.objects.feed().filter(author=author),
+        settings.POSTS_PER_PAGE
+    )
+    return page_response(get_page(request, paginator), post_payload)
+
+
+def comments_versions(request, post_id):
+    if not has_version(f"post:{post_id}"):
+        return None
+    return [f"post:{post_id}"]
+
+
+@feed_etag(comments_versions)
+def comments(request, post_id):
+    if not Post.objects.filter(id=post_id).exists():
+        raise Http404
+    remember_version(f"post:{post_id}")
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related("author"),
+        settings.POSTS_PER_PAGE,
+        date_field="created",
+    )
+    return page_response(get_page(request, paginator), comment_payload)
+
+
+@vary_on_cookie
+@feed_etag(follow_versions)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error_response("Нужна авторизация.", 401)
+    paginator = timeline.follow_paginator(
+        request.user,
+        settings.POSTS_PER_PAGE
+    )
+    return page_response(get_page(request, paginator), post_payload)
+
+
+def following_versions(request, username):
+    follower_id = user_id(username)
+    if follower_id is None:
+        return None
+    return [f"following:{follower_id}"]
+
+
+@feed_etag(following_versions)
+def following(request, username):
+    """Авторы, на которых подписан username, по порядку подписки."""
+    follower = get_object_or_404(User, username=username)
+    remember_id("user", username, follower.id)
+    follows = Follow.objects.filter(user=follower).select_related(
+        "author"
+    ).order_by("id")
+    try:
+        after = int(request.GET.get("cursor", 0))
+    except ValueError:
+        after = 0
+    items = list(follows.filter(id__gt=after)[:settings.POSTS_PER_PAGE + 1])
+    has_next = len(items) > settings.POSTS_PER_PAGE
+    items = items[:settings.POSTS_PER_PAGE]
+    return JsonResponse(
+        {
+            "results": [author_payload(follow.author) for follow in items],
+            "next_cursor": str(items[-1].id) if has_next else None,
+        },
+        json_dumps_params=JSON_PARAMS,
+    )
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import api
+
+app_name = "api_v1"
+
+urlpatterns = [
+    path("posts/", api.index, name="index"),
+    path("posts/<int:post_id>/comments/", api.comments, name="comments"),
+    path("groups/<slug>/posts/", api.group_posts, name="group_posts"),
+    path("users/<str:username>/posts/", api.profile, name="profile"),
+    path("users/<str:username>/following/", api.following,
+         name="following"),
+    path("follow/", api.follow_index, name="follow_index"),
+]
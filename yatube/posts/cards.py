@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from yatube.instrumentation import record_cache
+
+from . import fragments
+
+# Кнопка «Редактировать» зависит от зрителя, поэтому в кэш карточка
+# попадает с меткой, которая подменяется фрагментом edit_button.
+EDIT_BUTTON = mark_safe("<!-- edit-button -->")
+
+
+def card_key(post):
+    """Ключ меняется вместе с post.updated, старые карточки просто истекают."""
+    return f"post_card:{post.pk}:{post.updated.isoformat()}"
+
+
+def render_cards(posts, request):
+    """Собирает карточки записей из кэша одним запросом get_many."""
+    posts_by_key = {card_key(post): post for post in posts}
+    cards = cache.get_many(
+        posts_by_key,
+        version=settings.POST_CARD_CACHE_VERSION
+    )
+    missing = {
+        key: render_to_string(
+            "post_item.html",
+            {"post": post, "edit_button": EDIT_BUTTON}
+        )
+        for key, post in posts_by_key.items() if key not in cards
+    }
+    record_cache(hits=len(cards), misses=len(missing))
+    if missing:
+        cache.set_many(
+            missing,
+            settings.POST_CARD_TIMEOUT,
+            version=settings.POST_CARD_CACHE_VERSION
+        )
+        cards.update(missing)
+    return mark_safe("".join(
+        cards[key].replace(EDIT_BUTTON, fragments.include(
+            request, "edit_button", post.author_id, post.id
+        ))
+        for key, post in posts_by_key.items()
+    ))
@@ -0,0 +1,11 @@
+from .notifications import unread_count
+
+
+def notifications(request):
+    """
+    Число непрочитанных уведомлений для значка в меню.
+    """
+    if not request.user.is_authenticated:
+        return {}
+
+    return {"unread_notifications": unread_count(request.user.pk)}
@@ -0,0 +1,181 @@
+from django.db.models import (Case, Count, F, IntegerField, OuterRef,
+                              Subquery, Value, When)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (Comment, Follow, Group, GroupStats, Post, User,
+                     UserStats)
+
+REBUILD_BATCH_SIZE = 500
+STATS_FIELDS = ("posts_count", "followers_count", "following_count")
+GROUP_STATS_FIELDS = ("posts_count", "authors_count", "last_post_date")
+
+
+def change_user_counters(user_id, **deltas):
+    """
+    Атомарно меняет счётчики пользователя на указанные величины.
+    Счётчики не уходят в минус, а для удаляемых пользователей
+    строка со счётчиками заново не создаётся.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    guards = {
+        f"{field}__gte": -delta
+        for field, delta in deltas.items() if delta < 0
+    }
+    stats = UserStats.objects.filter(user_id=user_id, **guards)
+    if not stats.update(**changes) and not guards:
+        UserStats.objects.get_or_create(user_id=user_id)
+        stats.update(**changes)
+
+
+def change_comment_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    posts.update(
+        comment_count=F("comment_count") + delta,
+        updated=timezone.now()
+    )
+
+
+def update_group_stats(group_id, **changes):
+    stats = GroupStats.objects.filter(group_id=group_id)
+    if not stats.update(**changes):
+        GroupStats.objects.get_or_create(group_id=group_id)
+        stats.update(**changes)
+
+
+def later_post_date(pub_date):
+    """Выражение для last_post_date: сохранённая дата или pub_date."""
+    return Case(
+        When(last_post_date__gte=pub_date, then="last_post_date"),
+        default=Value(pub_date),
+    )
+
+
+def add_group_post(group_id, post):
+    """
+    Запись попала в группу: на одну запись больше, автор новый, если
+    других его записей в группе нет, дата последней — не раньше этой.
+    """
+    new_author = not Post.objects.filter(
+        group_id=group_id, author_id=post.author_id
+    ).exclude(pk=post.pk).exists()
+    update_group_stats(
+        group_id,
+        posts_count=F("posts_count") + 1,
+        authors_count=F("authors_count") + int(new_author),
+        last_post_date=later_post_date(post.pub_date),
+    )
+
+
+def remove_group_post(group_id, post):
+    """
+    Запись ушла из группы. Дата последней записи берётся заново
+    по индексу (group, -pub_date): это одна строка, а не пересчёт.
+    """
+    remaining = Post.objects.filter(group_id=group_id).exclude(pk=post.pk)
+    gone_author = not remaining.filter(author_id=post.author_id).exists()
+    GroupStats.objects.filter(
+        group_id=group_id,
+        posts_count__gte=1,
+        authors_count__gte=int(gone_author),
+    ).update(
+        posts_count=F("posts_count") - 1,
+        authors_count=F("authors_count") - int(gone_author),
+        last_post_date=Subquery(
+            remaining.order_by("-pub_date").values("pub_date")[:1]
+        ),
+    )
+
+
+def count_by(queryset, field):
+    """Подзапрос с числом строк queryset, где field = OuterRef("pk")."""
+    counts = queryset.filter(**{field: OuterRef("pk")}).order_by().values(
+        field
+    ).annotate(total=Count("pk")).values("total")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def rebuild_counters(user_model=User, stats_model=UserStats,
+                     post_model=Post, comment_model=Comment,
+                     follow_model=Follow):
+    """
+    Пересчитывает все счётчики по исходным таблицам.
+    Модели передаются параметрами, чтобы функцию можно было вызвать
+    из миграции с историческими моделями.
+    """
+    post_model.objects.update(
+        comment_count=count_by(comment_model.objects, "post")
+    )
+    stats_model.objects.bulk_create(
+        (
+            stats_model(user_id=user_id)
+            for user_id in user_model.objects.filter(
+                stats__isnull=True
+            ).values_list("pk", flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    users = user_model.objects.annotate(
+        posts_total=count_by(post_model.objects, "author"),
+        followers_total=count_by(follow_model.objects, "author"),
+        following_total=count_by(follow_model.objects, "user"),
+    ).values_list(
+        "pk", "posts_total", "followers_total", "following_total"
+    ).order_by("pk")
+    batch = []
+    for user_id, posts, followers, following in users.iterator():
+        batch.append(stats_model(
+            user_id=user_id,
+            posts_count=posts,
+            followers_count=followers,
+            following_count=following,
+        ))
+        if len(batch) == REBUILD_BATCH_SIZE:
+            stats_model.objects.bulk_update(batch, STATS_FIELDS)
+            batch = []
+    if batch:
+        stats_model.objects.bulk_update(batch, STATS_FIELDS)
+
+
+def rebuild_group_stats(group_model=Group, stats_model=GroupStats,
+                        post_model=Post):
+    """Пересчитывает сводки групп; модели — как в rebuild_counters."""
+    stats_model.objects.bulk_create(
+        (
+            stats_model(group_id=group_id)
+            for group_id in group_model.objects.filter(
+                stats__isnull=True
+            ).values_list("pk", flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    posts = post_model.objects.filter(group=OuterRef("pk")).order_by()
+    groups = group_model.objects.annotate(
+        posts_total=count_by(post_model.objects, "group"),
+        authors_total=Coalesce(Subquery(
+            posts.values("group").annotate(
+                total=Count("author", distinct=True)
+            ).values("total"),
+            output_field=IntegerField(),
+        ), 0),
+        last_date=Subquery(
+            posts.order_by("-pub_date").values("pub_date")[:1]
+        ),
+    ).values_list(
+        "pk", "posts_total", "authors_total", "last_date"
+    ).order_by("pk")
+    batch = []
+    for group_id, posts_total, authors_total, last_date in groups.iterator():
+        batch.append(stats_model(
+            group_id=group_id,
+            posts_count=posts_total,
+            authors_count=authors_total,
+            last_post_date=last_date,
+        ))
+        if len(batch) == REBUILD_BATCH_SIZE:
+            stats_model.objects.bulk_update(batch, GROUP_STATS_FIELDS)
+            batch = []
+    if batch:
+        stats_model.objects.bulk_update(batch, GROUP_STATS_FIELDS)
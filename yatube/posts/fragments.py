@@ -0,0 +1,87 @@
+"""
+Фрагменты страницы, которые зависят от зрителя: меню, кнопки
+редактирования и подписки. Страница для общего кэша рендерится
+с метками вместо фрагментов, а метки заменяются при каждом ответе —
+как Edge Side Includes, только на сервере приложения.
+"""
+import re
+
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Follow
+
+FRAGMENTS = {}
+# Аргументы меток — id и имена пользователей, двоеточий в них не бывает.
+MARKER = re.compile(r"<!-- esi:(\w+)((?::[\w.@+-]+)*) -->")
+
+
+def fragment(name):
+    """Регистрирует function(request, *args) как фрагмент name."""
+    def decorator(function):
+        FRAGMENTS[name] = function
+        return function
+    return decorator
+
+
+def defer(request, deferred):
+    """Пока deferred, страница рендерится для кэша: с метками."""
+    request.deferred_fragments = deferred
+
+
+def include(request, name, *args):
+    """Фрагмент name или метка для него, если страница уйдёт в кэш."""
+    if getattr(request, "deferred_fragments", False):
+        return mark_safe(
+            "<!-- esi:" + ":".join(map(str, (name, *args))) + " -->"
+        )
+    return FRAGMENTS[name](request, *map(str, args))
+
+
+def assemble(request, response):
+    """Копия ответа из кэша, где метки заменены фрагментами зрителя."""
+    content = MARKER.sub(
+        lambda match: FRAGMENTS[match[1]](
+            request, *match[2].split(":")[1:]
+        ),
+        response.content.decode(response.charset),
+    )
+    return HttpResponse(
+        content,
+        content_type=response["Content-Type"],
+        status=response.status_code,
+    )
+
+
+@fragment("nav")
+def nav(request):
+    return render_to_string("nav.html", request=request)
+
+
+@fragment("menu")
+def menu(request, active):
+    return render_to_string("menu.html", {active: True}, request=request)
+
+
+@fragment("edit_button")
+def edit_button(request, author_id, post_id):
+    user = request.user
+    if not user.is_authenticated or str(user.pk) != author_id:
+        return ""
+    return render_to_string(
+        "post_edit_button.html",
+        {"username": user.username, "post_id": post_id},
+    )
+
+
+@fragment("follow_button")
+def follow_button(request, author_id, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user,
+        author_id=author_id
+    ).exists()
+    return render_to_string(
+        "follow_button.html",
+        {"following": following, "username": username},
+    )
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "sqlite": "yatube.cache.SQLiteCache",
+    "redis": "django_redis.cache.RedisCache",
+}
+
+
+def percentile(values, share):
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def serve(backend, location, requests, pages, render_ms, seed):
+    """
+    Один воркер: читает случайные страницы, при промахе «рендерит»
+    страницу и кладёт её в кэш.
+    """
+    cache = import_string(BACKENDS[backend])(location, {
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": pages * 2},
+    })
+    rng = random.Random(seed)
+    page = "x" * 20000
+    hits = 0
+    latencies = []
+    for _ in range(requests):
+        key = f"bench_page:{rng.randrange(pages)}"
+        start = time.perf_counter()
+        if cache.get(key) is None:
+            time.sleep(render_ms / 1000)
+            cache.set(key, page)
+        else:
+            hits += 1
+        latencies.append(time.perf_counter() - start)
+    return hits, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает долю попаданий и задержку бэкендов кэша "
+        "при нескольких процессах-воркерах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--pages", type=int, default=500)
+        parser.add_argument("--render-ms", type=float, default=5)
+        parser.add_argument(
+            "--backends",
+            nargs="+",
+            choices=sorted(BACKENDS),
+            default=["locmem", "file", "sqlite"],
+        )
+        parser.add_argument(
+            "--redis-url",
+            default=os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/15"),
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'backend':<8} {'hit rate':>9} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'total s':>8}"
+        )
+        for backend in options["backends"]:
+            directory = tempfile.mkdtemp()
+            location = {
+                "locmem": "bench",
+                "file": directory,
+                "sqlite": os.path.join(directory, "cache.sqlite3"),
+                "redis": options["redis_url"],
+            }[backend]
+            try:
+                self.run_backend(backend, location, options)
+            except ImportError as error:
+                self.stdout.write(f"{backend:<8} пропущен: {error}")
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def run_backend(self, backend, location, options):
+        import_string(BACKENDS[backend])(location, {}).clear()
+        jobs = [
+            (backend, location, options["requests"], options["pages"],
+             options["render_ms"], seed)
+            for seed in range(options["workers"])
+        ]
+        start = time.perf_counter()
+        with multiprocessing.Pool(options["workers"]) as pool:
+            results = pool.starmap(serve, jobs)
+        total = time.perf_counter() - start
+
+        hits = sum(worker_hits for worker_hits, _ in results)
+        latencies = sorted(
+            latency for _, worker in results for latency in worker
+        )
+        self.stdout.write(
+            f"{backend:<8} {hits / len(latencies):>9.1%} "
+            f"{percentile(latencies, 0.50) * 1000:>8.2f} "
+            f"{percentile(latencies, 0.95) * 1000:>8.2f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.2f} "
+            f"{total:>8.2f}"
+        )
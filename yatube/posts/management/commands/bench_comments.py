@@ -0,0 +1,180 @@
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post, path_id
+
+from .bench_cache import percentile
+
+User = get_user_model()
+
+# Больше 500 строк в одном INSERT старый SQLite не принимает.
+BATCH_SIZE = 500
+
+
+def seed_threads(post, authors, count, reply_share, seed):
+    """
+    count комментариев к post. Доля reply_share — ответы на случайный
+    из последних комментариев, так что ветки бывают длинными и глубокими.
+    id и пути считаются заранее: bulk_create в SQLite id не возвращает.
+    """
+    rng = random.Random(seed)
+    start = (Comment.objects.order_by("-id").values_list(
+        "id", flat=True
+    ).first() or 0) + 1
+    paths = []
+    batch = []
+    for pk in range(start, start + count):
+        prefix, parent_id = [], None
+        if paths and rng.random() < reply_share:
+            parent_path = rng.choice(paths[-200:])
+            prefix = Comment.reply_prefix(parent_path)
+            parent_id = path_id(prefix, len(prefix) - 1) if prefix else None
+        path = Comment.make_path(prefix, pk)
+        paths.append(path)
+        batch.append(Comment(
+            id=pk,
+            post=post,
+            author=rng.choice(authors),
+            parent_id=parent_id,
+            text=f"Комментарий {pk}",
+            path=path,
+        ))
+        if len(batch) == BATCH_SIZE:
+            Comment.objects.bulk_create(batch)
+            batch = []
+    Comment.objects.bulk_create(batch)
+    Post.objects.filter(id=post.id).update(comment_count=count)
+
+
+class Command(BaseCommand):
+    help = (
+        "Меряет страницы комментариев записи с десятками тысяч "
+        "комментариев в ветках: первую и далёкую страницы по курсору, "
+        "те же страницы через OFFSET, поток всех комментариев и прежний "
+        "вывод всех комментариев разом."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--reply-share", type=float, default=0.6)
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--deep-page", type=int, default=100)
+
+    def handle(self, *args, **options):
+        with override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=["testserver"],
+            CACHES={"default": settings.CACHE_BACKENDS["locmem"]},
+        ):
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        authors = [
+            User.objects.create_user(username=f"commenter{number}")
+            for number in range(20)
+        ]
+        post = Post.objects.create(text="Вирусная запись", author=authors[0])
+        start = time.perf_counter()
+        seed_threads(
+            post, authors, options["comments"], options["reply_share"], 0
+        )
+        self.stdout.write(
+            f"Комментариев: {options['comments']}, "
+            f"заполнено за {time.perf_counter() - start:.1f} с"
+        )
+
+        client = Client()
+        url = reverse("post", kwargs={
+            "username": authors[0].username, "post_id": post.id
+        })
+        deep_cursor = self.walk_cursor(client, url, options["deep_page"])
+        cases = [
+            ("page 1", lambda: client.get(url)),
+            (f"page {options['deep_page']} cursor",
+             lambda: client.get(url, {"cursor": deep_cursor})),
+            (f"page {options['deep_page']} offset",
+             lambda: client.get(url, {"page": options["deep_page"]})),
+            # Куски только читаются, память клиента в замер не входит.
+            ("stream all", lambda: sum(map(len, client.get(reverse(
+                "post_comments",
+                kwargs={"username": authors[0].username, "post_id": post.id},
+            )).streaming_content))),
+            ("flat all (before)", lambda: render_to_string(
+                "posts/comment_list.html",
+                {
+                    "comments": post.comments.select_related("author"),
+                    "user_profile": authors[0],
+                    "post": post,
+                },
+            )),
+        ]
+
+        self.stdout.write(
+            f"{'case':<20} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'queries':>8} {'peak KiB':>9}"
+        )
+        for label, case in cases:
+            self.report(label, case, options["rounds"])
+        self.explain(post)
+
+    def walk_cursor(self, client, url, pages):
+        """Курсор страницы pages: до неё доходят по ссылкам «Следующая»."""
+        cursor = None
+        for _ in range(pages - 1):
+            page = client.get(url, {"cursor": cursor} if cursor else {})
+            cursor = page.context["comments"].next_cursor
+            if cursor is None:
+                break
+        return cursor
+
+    def report(self, label, case, rounds):
+        case()
+        timings = []
+        for _ in range(rounds):
+            # Журнал запросов сбрасывается в начале каждого запроса
+            # клиента, его нужно очистить до замера.
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                case()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = len(captured)
+        tracemalloc.start()
+        try:
+            case()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        timings.sort()
+        self.stdout.write(
+            f"{label:<20} {percentile(timings, 0.50):>8.2f} "
+            f"{percentile(timings, 0.95):>8.2f} {queries:>8} "
+            f"{peak / 1024:>9.1f}"
+        )
+
+    def explain(self, post):
+        """План запроса страницы: диапазон по индексу без сортировки."""
+        page = Comment.objects.threads().filter(
+            post=post, path__gt="5"
+        )[:settings.COMMENTS_PER_PAGE]
+        sql, params = page.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            for row in cursor.fetchall():
+                self.stdout.write(f"plan: {row[-1]}")
@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+# Ширина, которую браузер выберет из srcset, с учётом плотности экрана.
+CLIENTS = (
+    ("mobile 360px @1x", 360),
+    ("mobile 360px @2x", 720),
+    ("desktop 960px @1x", 960),
+)
+
+
+def pick(entries, width):
+    """Первый вариант не уже нужной ширины, как делает браузер."""
+    for name, variant_width in entries:
+        if variant_width >= width:
+            return name
+    return entries[-1][0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Считает объём картинок на странице ленты: оригинал, "
+        "прежний JPEG 960px и варианты из srcset для разных клиентов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--posts", type=int, default=settings.POSTS_PER_PAGE
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.filter(
+            thumbnail_status=Post.THUMBNAIL_READY
+        ).exclude(image_manifest="")[:options["posts"]]
+        manifests = [
+            (post.image.name, json.loads(post.image_manifest))
+            for post in posts
+        ]
+        if not manifests:
+            self.stdout.write("Нет записей с готовыми вариантами картинок.")
+            return
+
+        original = sum(default_storage.size(name) for name, _ in manifests)
+        legacy = sum(
+            default_storage.size(manifest["variants"]["image/jpeg"][-1][0])
+            for _, manifest in manifests
+        )
+        self.stdout.write(f"Записей с картинками: {len(manifests)}")
+        self.stdout.write(f"{'оригиналы':<24} {original / 1024:>10.1f} КиБ")
+        self.stdout.write(f"{'JPEG 960px':<24} {legacy / 1024:>10.1f} КиБ")
+
+        mimes = manifests[0][1]["variants"].keys()
+        for client, width in CLIENTS:
+            for mime in mimes:
+                size = sum(
+                    default_storage.size(
+                        pick(manifest["variants"][mime], width)
+                    )
+                    for _, manifest in manifests
+                )
+                label = f"{client} {mime.split('/')[1]}"
+                self.stdout.write(
+                    f"{label:<24} {size / 1024:>10.1f} КиБ "
+                    f"(экономия {1 - size / legacy:.0%})"
+                )
@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections, transaction
+
+from .bench_cache import percentile
+
+ALIAS = "bench"
+
+CONFIGS = {
+    "stock": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "CONN_MAX_AGE": 0,
+    },
+    "tuned-per-request": {
+        "ENGINE": "yatube.sqlite_backend",
+        "CONN_MAX_AGE": 0,
+    },
+    "tuned": {
+        "ENGINE": "yatube.sqlite_backend",
+        "CONN_MAX_AGE": 60,
+    },
+}
+
+
+def create_schema(path, rows):
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE bench_post (id INTEGER PRIMARY KEY, body TEXT)"
+        )
+        connection.execute(
+            "CREATE TABLE bench_counter (id INTEGER PRIMARY KEY, value INT)"
+        )
+        connection.execute("INSERT INTO bench_counter VALUES (1, 0)")
+        connection.executemany(
+            "INSERT INTO bench_post (body) VALUES (?)",
+            (("x" * 200,) for _ in range(rows))
+        )
+    connection.close()
+
+
+def serve(config, requests, write_share, seed):
+    """
+    Один воркер: requests «запросов», из них доля write_share пишет.
+    Запись читает счётчик, добавляет строку и обновляет счётчик в одной
+    транзакции — как get_or_create и счётчики в views. После каждого
+    запроса соединение закрывается, если так велит CONN_MAX_AGE.
+    """
+    connections.databases[ALIAS] = config
+    connection = connections[ALIAS]
+    rng = random.Random(seed)
+    errors = 0
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_share:
+                with transaction.atomic(using=ALIAS):
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT value FROM bench_counter WHERE id = 1"
+                        )
+                        cursor.execute(
+                            "INSERT INTO bench_post (body) VALUES (%s)",
+                            ["x" * 200]
+                        )
+                        cursor.execute(
+                            "UPDATE bench_counter SET value = value + 1 "
+                            "WHERE id = 1"
+                        )
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id, body FROM bench_post "
+                        "ORDER BY id DESC LIMIT 10"
+                    )
+                    cursor.fetchall()
+        except DatabaseError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+        connection.close_if_unusable_or_obsolete()
+    connection.close()
+    return errors, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность стандартного sqlite3 и "
+        "yatube.sqlite_backend при нескольких процессах-воркерах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--write-share", type=float, default=0.2)
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument(
+            "--configs",
+            nargs="+",
+            choices=list(CONFIGS),
+            default=list(CONFIGS),
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'config':<18} {'req/s':>8} {'errors':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for name in options["configs"]:
+            directory = tempfile.mkdtemp()
+            try:
+                path = os.path.join(directory, "bench.sqlite3")
+                create_schema(path, options["rows"])
+                self.run_config(name, {**CONFIGS[name], "NAME": path}, options)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def run_config(self, name, config, options):
+        jobs = [
+            (config, options["requests"], options["write_share"], seed)
+            for seed in range(options["workers"])
+        ]
+        start = time.perf_counter()
+        with multiprocessing.Pool(options["workers"]) as pool:
+            results = pool.starmap(serve, jobs)
+        total = time.perf_counter() - start
+
+        errors = sum(worker_errors for worker_errors, _ in results)
+        latencies = sorted(
+            latency for _, worker in results for latency in worker
+        )
+        self.stdout.write(
+            f"{name:<18} {len(latencies) / total:>8.0f} {errors:>7} "
+            f"{percentile(latencies, 0.50) * 1000:>8.2f} "
+            f"{percentile(latencies, 0.95) * 1000:>8.2f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.2f}"
+        )
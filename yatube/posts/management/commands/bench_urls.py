@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from benchmarks import routes, runner
+from benchmarks.seed import seed
+
+SEED_PARAMS = {
+    "users": 200,
+    "groups": 20,
+    "posts": 20000,
+    "comments": 50000,
+    "follows": 20,
+    "images": 5,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет отдельную базу данными, прогоняет все страницы "
+        "posts и about и сравнивает p50/p95/p99, число запросов "
+        "и выделения памяти с сохранённым baseline."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in SEED_PARAMS.items():
+            parser.add_argument(f"--{name}", type=int, default=default)
+        parser.add_argument("--rounds", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--cache",
+            choices=sorted(settings.CACHE_BACKENDS),
+            default="locmem",
+        )
+        parser.add_argument("--baseline", default=runner.BASELINE)
+        parser.add_argument("--tolerance", type=float, default=0.5)
+        parser.add_argument(
+            "--write-baseline",
+            action="store_true",
+            help="Сохранить результаты как новый baseline.",
+        )
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in SEED_PARAMS}
+        baseline = None
+        if not options["write_baseline"]:
+            baseline = runner.load_baseline(options["baseline"])
+            if baseline["params"] != params:
+                raise CommandError(
+                    "baseline снят на других объёмах данных: "
+                    f"{baseline['params']}"
+                )
+
+        results = self.measure(params, options)
+        self.report(results)
+
+        if options["write_baseline"]:
+            runner.save_baseline(options["baseline"], params, results)
+            self.stdout.write(f"baseline сохранён в {options['baseline']}")
+            return
+        regressions = runner.compare(
+            results, baseline["routes"], options["tolerance"]
+        )
+        if regressions:
+            raise CommandError(
+                "Регрессии относительно baseline:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    def measure(self, params, options):
+        """Всё меряется на временной базе, кэше и каталоге медиа."""
+        media_root = tempfile.mkdtemp()
+        cache = dict(settings.CACHE_BACKENDS[options["cache"]])
+        if options["cache"] == "sqlite":
+            cache["LOCATION"] = f"{media_root}/cache.sqlite3"
+        try:
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["testserver"],
+                MEDIA_ROOT=media_root,
+                CACHES={"default": cache},
+            ):
+                old_name = connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False
+                )
+                try:
+                    start = time.perf_counter()
+                    sample = seed(**params)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f"База заполнена за {elapsed:.1f} с")
+                    route_list = routes.routes(sample)
+                    missing = routes.missing(route_list)
+                    if missing:
+                        raise CommandError(
+                            "Нет запросов для адресов: "
+                            + ", ".join(sorted(missing))
+                        )
+                    return runner.run(
+                        route_list,
+                        sample,
+                        rounds=options["rounds"],
+                        warmup=options["warmup"],
+                    )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'route':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'queries':>8} {'alloc KiB':>10}"
+        )
+        for label, row in results.items():
+            self.stdout.write(
+                f"{label:<20} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                f"{row['p99_ms']:>8.2f} {row['queries']:>8} "
+                f"{row['alloc_kib']:>10.1f}"
+            )
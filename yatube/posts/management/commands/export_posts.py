@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает записи в JSONL или CSV потоком, "
+        "картинки копируются в каталог --media."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл или - для stdout.")
+        parser.add_argument("--format", choices=transfer.FORMATS)
+        parser.add_argument("--media", help="Каталог для картинок.")
+        parser.add_argument("--batch", type=int, default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = transfer.detect_format(options["path"], options["format"])
+        records = transfer.export_records(options["batch"], options["media"])
+        if options["path"] == "-":
+            transfer.write_records(sys.stdout, fmt, records)
+            return
+        with open(options["path"], "w", encoding="utf-8", newline="") as out:
+            transfer.write_records(out, fmt, records)
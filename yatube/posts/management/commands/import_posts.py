@@ -0,0 +1,65 @@
+import multiprocessing
+import sys
+import time
+from collections import deque
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import transfer
+from posts.page_cache import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает записи из JSONL или CSV пачками bulk_create, "
+        "при --workers больше 1 — пулом процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл или - для stdin.")
+        parser.add_argument("--format", choices=transfer.FORMATS)
+        parser.add_argument("--media", help="Каталог с картинками.")
+        parser.add_argument("--batch", type=int, default=transfer.BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=1)
+
+    def handle(self, *args, **options):
+        fmt = transfer.detect_format(options["path"], options["format"])
+        start = time.perf_counter()
+        if options["path"] == "-":
+            total = self.load(sys.stdin, fmt, options)
+        else:
+            with open(options["path"], encoding="utf-8", newline="") as src:
+                total = self.load(src, fmt, options)
+        elapsed = time.perf_counter() - start
+        bump_version("index")
+        self.stdout.write(self.style.SUCCESS(
+            f"Импортировано записей: {total} за {elapsed:.1f} с "
+            f"({total / max(elapsed, 1e-9):.0f} в секунду)"
+        ))
+
+    def load(self, stream, fmt, options):
+        batches = transfer.batches(
+            transfer.read_records(stream, fmt), options["batch"]
+        )
+        if options["workers"] == 1:
+            return sum(
+                transfer.import_batch(batch, options["media"])
+                for batch in batches
+            )
+
+        # Дочерние процессы не должны делить соединения с родителем.
+        connections.close_all()
+        total = 0
+        pending = deque()
+        with multiprocessing.Pool(options["workers"]) as pool:
+            for batch in batches:
+                pending.append(pool.apply_async(
+                    transfer.import_batch, (batch, options["media"])
+                ))
+                # Не читаем файл дальше, чем успевают воркеры.
+                if len(pending) >= options["workers"] * 2:
+                    total += pending.popleft().get()
+            while pending:
+                total += pending.popleft().get()
+        return total
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.page_cache import bump_post_versions
+from posts.thumbnails import claim, generate
+
+
+class Command(BaseCommand):
+    help = "Строит миниатюры записей из очереди пулом процессов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--batch", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=2)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать текущую очередь и выйти.",
+        )
+
+    def handle(self, *args, **options):
+        pool = None
+        if options["workers"] > 1:
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            pool = multiprocessing.Pool(options["workers"])
+        try:
+            self.process(pool, options)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def process(self, pool, options):
+        while True:
+            post_ids = claim(options["batch"])
+            if not post_ids:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+            if pool is None:
+                results = [generate(post_id) for post_id in post_ids]
+            else:
+                results = pool.map(generate, post_ids)
+            statuses = [status for _, status in results]
+            ready = statuses.count(Post.THUMBNAIL_READY)
+            failed = statuses.count(Post.THUMBNAIL_FAILED)
+            retried = statuses.count(Post.THUMBNAIL_PENDING)
+            if ready:
+                bump_post_versions([
+                    post_id for post_id, status in results
+                    if status == Post.THUMBNAIL_READY
+                ])
+            self.stdout.write(
+                f"Миниатюр построено: {ready}, ошибок: {failed}, "
+                f"отложено до повтора: {retried}"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import rebuild_counters, rebuild_group_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики записей, комментариев, подписок и групп."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_counters()
+            rebuild_group_stats()
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны"))
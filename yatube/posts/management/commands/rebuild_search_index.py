@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Заполняет поисковый индекс записей и комментариев заново."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = search.rebuild(Post)
+        self.stdout.write(
+            self.style.SUCCESS(f"Записей в поисковом индексе: {total}")
+        )
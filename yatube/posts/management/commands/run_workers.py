@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import queue
+
+
+def serve(stop, options, results):
+    """
+    Процесс пула: Ctrl+C ловит родитель и останавливает всех через stop.
+    Итоги уходят родителю через results, он и пишет их в stdout.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    done, failed = queue.work(
+        stop,
+        batch=options["batch"],
+        interval=options["interval"],
+        burst=options["burst"],
+    )
+    results.put((os.getpid(), done, failed))
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет задачи из очереди posts.queue пулом процессов. "
+        "Без него задачи только копятся, если не задан YATUBE_TASKS_EAGER=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--batch", type=int, default=10)
+        parser.add_argument("--interval", type=float, default=1)
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Выполнить задачи, которым пора, и выйти.",
+        )
+
+    def handle(self, *args, **options):
+        single = options["workers"] <= 1
+        stop = threading.Event() if single else multiprocessing.Event()
+        # SIGTERM останавливает воркеры после текущих задач. Обработчик
+        # наследуют и дочерние процессы пула.
+        previous = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            if single:
+                done, failed = queue.work(
+                    stop,
+                    batch=options["batch"],
+                    interval=options["interval"],
+                    burst=options["burst"],
+                )
+                self.stdout.write(f"Выполнено {done}, ошибок {failed}")
+            else:
+                self.run_pool(stop, options)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+    def run_pool(self, stop, options):
+        # Дочерние процессы не должны делить соединения с родителем.
+        connections.close_all()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=serve, args=(stop, options, results)
+            )
+            for _ in range(options["workers"])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for process in processes:
+                process.join()
+        # Итог отправляет каждый процесс, завершившийся без ошибки.
+        finished = sum(process.exitcode == 0 for process in processes)
+        for _ in range(finished):
+            pid, done, failed = results.get()
+            self.stdout.write(
+                f"Воркер {pid}: выполнено {done}, ошибок {failed}"
+            )
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Рассылает дайджесты накопившихся уведомлений: одно письмо "
+        "на пользователя. Запускается по расписанию, например из cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=settings.NOTIFICATION_DIGEST_BATCH,
+            help="Сколько получателей обрабатывать за один проход.",
+        )
+
+    def handle(self, *args, **options):
+        sent, events = notifications.send_digests(options["batch"])
+        self.stdout.write(f"Отправлено писем: {sent}, событий: {events}")
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в файлы реплик из "
+        "DATABASE_REPLICAS — локальная замена настоящей репликации."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Повторять копирование раз в столько секунд.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("Реплики не настроены: YATUBE_DB_REPLICAS.")
+        for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS):
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"{alias}: копируются только базы SQLite.")
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                self.copy(connections[alias].settings_dict["NAME"])
+            self.stdout.write(self.style.SUCCESS(
+                f"Реплик обновлено: {len(settings.DATABASE_REPLICAS)}"
+            ))
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
+
+    def copy(self, path):
+        """
+        Снимок через backup API во временный файл и атомарная замена:
+        читатели реплики не видят наполовину записанную копию.
+        """
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        temporary = f"{path}.tmp"
+        target = sqlite3.connect(temporary)
+        try:
+            source.connection.backup(target)
+            # Копия наследует режим журнала основной базы, а старые
+            # -wal и -shm файлы реплики к новому файлу не относятся.
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        os.replace(temporary, path)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import popular
+
+
+class Command(BaseCommand):
+    help = (
+        "Учитывает в рейтинге /popular/ новые записи, комментарии "
+        "и подписки и обновляет список. Запускается по расписанию."
+    )
+
+    def handle(self, *args, **options):
+        processed = popular.update_all()
+        self.stdout.write(f"Учтено событий: {processed}")
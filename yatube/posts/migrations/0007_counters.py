@@ -0,0 +1,63 @@
+# Generated by Django 2.2.6 on 2026-10-18 06:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from posts.counters import rebuild_counters
+
+
+def fill_counters(apps, schema_editor):
+    rebuild_counters(
+        user_model=apps.get_model(*settings.AUTH_USER_MODEL.split('.')),
+        stats_model=apps.get_model('posts', 'UserStats'),
+        post_model=apps.get_model('posts', 'Post'),
+        comment_model=apps.get_model('posts', 'Comment'),
+        follow_model=apps.get_model('posts', 'Follow'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True,
+                    related_name='stats',
+                    serialize=False,
+                    to=settings.AUTH_USER_MODEL,
+                    verbose_name='Пользователь'
+                )),
+                ('posts_count', models.PositiveIntegerField(
+                    default=0,
+                    verbose_name='Записей'
+                )),
+                ('followers_count', models.PositiveIntegerField(
+                    default=0,
+                    verbose_name='Подписчиков'
+                )),
+                ('following_count', models.PositiveIntegerField(
+                    default=0,
+                    verbose_name='Подписан'
+                )),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name='Комментариев'
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
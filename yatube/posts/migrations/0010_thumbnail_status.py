@@ -0,0 +1,45 @@
+# Generated by Django 2.2.6 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.exclude(image='').exclude(image__isnull=True).update(
+        thumbnail_status='pending'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_status',
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ('pending', 'В очереди'),
+                    ('processing', 'Обрабатывается'),
+                    ('ready', 'Готова'),
+                    ('failed', 'Ошибка'),
+                ],
+                editable=False,
+                max_length=10,
+                verbose_name='Миниатюра'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(
+                condition=models.Q(thumbnail_status='pending'),
+                fields=['thumbnail_status'],
+                name='post_thumbnail_pending'
+            ),
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
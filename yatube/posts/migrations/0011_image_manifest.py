@@ -0,0 +1,31 @@
+# Generated by Django 2.2.6 on 2026-10-18 07:02
+
+from django.db import migrations, models
+
+
+def requeue_thumbnails(apps, schema_editor):
+    # Готовые миниатюры sorl заменяются набором вариантов.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.filter(thumbnail_status='ready').update(
+        thumbnail_status='pending'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_thumbnail_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_manifest',
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                verbose_name='Варианты картинки'
+            ),
+        ),
+        migrations.RunPython(requeue_thumbnails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.6 on 2026-10-18 08:10
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # Индекс пуст: его заполняет manage.py rebuild_search_index.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search '
+        'USING fts5(text, comments, '
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (posts_search, rank) '
+        "VALUES ('rank', 'bm25(2.0, 1.0)')"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_image_manifest'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.6 on 2026-10-18 08:08
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, LPad
+import django.db.models.deletion
+
+PATH_WIDTH = 10
+ROOT_KEY = 10 ** PATH_WIDTH - 1
+
+
+def fill_root_paths(apps, schema_editor):
+    """Старые комментарии плоские: каждый становится корнем ветки."""
+    Comment = apps.get_model('posts', 'Comment')
+    Comment.objects.filter(path='').update(path=LPad(
+        Cast(Value(ROOT_KEY) - F('id'), models.CharField()),
+        PATH_WIDTH,
+        Value('0'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Путь в ветке'),
+        ),
+        migrations.RunPython(fill_root_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.6 on 2026-10-18 08:41
+
+from django.db import migrations, models
+from django.db.models import Max
+import django.db.models.deletion
+
+
+def skip_old_follows(apps, schema_editor):
+    """
+    У подписок нет даты: старые, учтённые как свежие, подняли бы
+    записи их авторов разом. Рейтинг считает подписки с этого места.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    ScoreCursor = apps.get_model('posts', 'ScoreCursor')
+    last_id = Follow.objects.aggregate(last_id=Max('id'))['last_id']
+    if last_id is not None:
+        ScoreCursor.objects.create(name='follow', last_id=last_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='posts.Post', verbose_name='Запись')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScoreCursor',
+            fields=[
+                ('name', models.CharField(max_length=20, primary_key=True, serialize=False, verbose_name='События')),
+                ('last_id', models.PositiveIntegerField(default=0, verbose_name='Последний id')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postscore',
+            index=models.Index(fields=['-score'], name='post_score'),
+        ),
+        migrations.RunPython(skip_old_follows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2026-10-18 08:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.counters import rebuild_group_stats
+
+
+def fill_group_stats(apps, schema_editor):
+    rebuild_group_stats(
+        group_model=apps.get_model('posts', 'Group'),
+        stats_model=apps.get_model('posts', 'GroupStats'),
+        post_model=apps.get_model('posts', 'Post'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('authors_count', models.PositiveIntegerField(default=0, verbose_name='Авторов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+            ],
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
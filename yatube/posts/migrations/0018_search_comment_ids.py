@@ -0,0 +1,51 @@
+# Generated by Django 2.2.6 on 2026-10-18 10:05
+
+from django.db import migrations
+
+def copy_index(schema_editor, columns, values):
+    """FTS5 не умеет ALTER TABLE ADD COLUMN: индекс копируется."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_search_copy '
+        f'USING fts5({columns}, '
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    names = columns.replace(' UNINDEXED', '')
+    schema_editor.execute(
+        f'INSERT INTO posts_search_copy (rowid, {names}) '
+        f'SELECT rowid, {values} FROM posts_search'
+    )
+    schema_editor.execute('DROP TABLE posts_search')
+    schema_editor.execute(
+        'ALTER TABLE posts_search_copy RENAME TO posts_search'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (posts_search, rank) '
+        "VALUES ('rank', 'bm25(2.0, 1.0)')"
+    )
+
+
+def add_comment_ids(apps, schema_editor):
+    # NULL в comment_ids: документ записан без разбивки по комментариям
+    # и соберётся заново при первом изменении комментария.
+    copy_index(
+        schema_editor,
+        'text, comments, comment_ids UNINDEXED',
+        'text, comments, NULL',
+    )
+
+
+def drop_comment_ids(apps, schema_editor):
+    copy_index(schema_editor, 'text, comments', 'text, comments')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_group_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_comment_ids, drop_comment_ids),
+    ]
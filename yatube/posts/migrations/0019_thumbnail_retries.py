@@ -0,0 +1,32 @@
+# Generated by Django 2.2.6 on 2026-10-18 09:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_search_comment_ids'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_thumbnail_pending',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Попыток построить миниатюру'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_run_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Срок миниатюры'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(thumbnail_status__in=['pending', 'processing']), fields=['thumbnail_run_at'], name='post_thumbnail_queue'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.6 on 2026-10-18 12:40
+
+from django.db import migrations
+
+from posts import search
+
+
+def fill_index(apps, schema_editor):
+    # 0012 создаёт индекс пустым: база, обновлённая с версии без поиска,
+    # получает его заполненным здесь. Уже заполненный индекс не трогаем.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM %s LIMIT 1' % search.SQLiteFTSBackend.table
+        )
+        if cursor.fetchone() is not None:
+            return
+    if Post.objects.exists():
+        search.rebuild(Post, backend=search.SQLiteFTSBackend())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_thumbnail_retries'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,12 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Cast, LPad
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -13,12 +20,36 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Записи для ленты: автор и группа подтягиваются JOIN-ом."""
+        return self.select_related("author", "group")
+
+
 class Post(models.Model):
+    THUMBNAIL_PENDING = "pending"
+    THUMBNAIL_PROCESSING = "processing"
+    THUMBNAIL_READY = "ready"
+    THUMBNAIL_FAILED = "failed"
+    THUMBNAIL_STATUSES = (
+        (THUMBNAIL_PENDING, "В очереди"),
+        (THUMBNAIL_PROCESSING, "Обрабатывается"),
+        (THUMBNAIL_READY, "Готова"),
+        (THUMBNAIL_FAILED, "Ошибка"),
+    )
+    # Браузер берёт первый подходящий <source>: компактные форматы раньше.
+    PICTURE_SOURCES = ("image/avif", "image/webp")
+    PICTURE_FALLBACK = "image/jpeg"
+
     text = models.TextField(verbose_name="Текст")
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации",
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         verbose_name="Автор",
@@ -34,15 +65,130 @@ class Post(models.Model):
         null=True,
     )
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    thumbnail_status = models.CharField(
+        verbose_name="Миниатюра",
+        max_length=10,
+        choices=THUMBNAIL_STATUSES,
+        blank=True,
+        editable=False,
+    )
+    image_manifest = models.TextField(
+        verbose_name="Варианты картинки",
+        blank=True,
+        editable=False,
+    )
+    # Как Task.run_at: пока миниатюра ждёт — время следующей попытки,
+    # пока строится — срок аренды обработчика.
+    thumbnail_run_at = models.DateTimeField(
+        verbose_name="Срок миниатюры",
+        default=timezone.now,
+        editable=False,
+    )
+    thumbnail_attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток построить миниатюру",
+        default=0,
+        editable=False,
+    )
+    comment_count = models.PositiveIntegerField(
+        verbose_name="Комментариев",
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_ready(self):
+        return self.thumbnail_status == self.THUMBNAIL_READY
+
+    @property
+    def image_variants(self):
+        """
+        Данные для <picture>: список <source> для современных форматов
+        и srcset запасного JPEG для <img>.
+        """
+        if not self.thumbnail_ready or not self.image_manifest:
+            return None
+        try:
+            manifest = json.loads(self.image_manifest)
+            variants = manifest["variants"]
+            fallback = variants[self.PICTURE_FALLBACK]
+            size = manifest["width"], manifest["height"]
+        except (ValueError, TypeError, KeyError):
+            return None
+
+        def srcset(entries):
+            return ", ".join(
+                f"{default_storage.url(name)} {width}w"
+                for name, width in entries
+            )
+
+        return {
+            "sources": [
+                {"type": mime, "srcset": srcset(variants[mime])}
+                for mime in self.PICTURE_SOURCES
+                if mime in variants
+            ],
+            "srcset": srcset(fallback),
+            "src": default_storage.url(fallback[-1][0]),
+            "width": size[0],
+            "height": size[1],
+        }
+
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=["thumbnail_run_at"],
+                name="post_thumbnail_queue",
+                condition=models.Q(
+                    thumbnail_status__in=["pending", "processing"]
+                ),
+            ),
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="post_pub_date"
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_pub_date"
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_pub_date"
+            ),
+        ]
+
+
+class CommentQuerySet(models.QuerySet):
+    def threads(self):
+        """Комментарии ветками: порядок пути, автор JOIN-ом."""
+        return self.select_related("author").order_by("path")
+
+    def fill_root_paths(self):
+        """
+        Пути для комментариев без пути — созданных bulk_create, который
+        обходит save(). Все они становятся корнями веток.
+        """
+        return self.filter(path="").update(path=LPad(
+            Cast(Value(Comment.ROOT_KEY) - F("id"), models.CharField()),
+            Comment.PATH_WIDTH,
+            Value("0"),
+        ))
 
 
 class Comment(models.Model):
+    # Материализованный путь: id предков и самого комментария по
+    # PATH_WIDTH цифр через "/". Корень ветки записан как ROOT_KEY - id,
+    # поэтому по возрастанию пути новые ветки идут первыми, а ответы
+    # в ветке — под своими комментариями в порядке написания.
+    PATH_WIDTH = 10
+    PATH_SEPARATOR = "/"
+    ROOT_KEY = 10 ** PATH_WIDTH - 1
+
     post = models.ForeignKey(
         Post,
         verbose_name="Комментарий",
@@ -55,6 +201,14 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name="comments"
     )
+    parent = models.ForeignKey(
+        "self",
+        verbose_name="Ответ на",
+        on_delete=models.CASCADE,
+        related_name="replies",
+        blank=True,
+        null=True,
+    )
     text = models.TextField(
         verbose_name="Текст",
     )
@@ -62,10 +216,74 @@ class Comment(models.Model):
         verbose_name="Дата написания",
         auto_now_add=True
     )
+    path = models.CharField(
+        verbose_name="Путь в ветке",
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def depth(self):
+        return self.path.count(self.PATH_SEPARATOR)
+
+    @classmethod
+    def reply_prefix(cls, parent_path):
+        """
+        Сегменты пути для ответа на комментарий с путём parent_path.
+        Ответ глубже COMMENT_MAX_DEPTH встаёт рядом с комментарием,
+        на который отвечали, — ветка не растёт вглубь бесконечно.
+        """
+        segments = parent_path.split(cls.PATH_SEPARATOR)
+        return segments[:settings.COMMENT_MAX_DEPTH]
+
+    @classmethod
+    def make_path(cls, prefix, pk):
+        own_key = pk if prefix else cls.ROOT_KEY - pk
+        return cls.PATH_SEPARATOR.join(
+            [*prefix, f"{own_key:0{cls.PATH_WIDTH}d}"]
+        )
+
+    def save(self, *args, **kwargs):
+        """Путь известен только после INSERT: в него входит id."""
+        if self.path:
+            return super().save(*args, **kwargs)
+        prefix = []
+        if self.parent_id is not None:
+            prefix = self.reply_prefix(self.parent.path)
+            parent_id = path_id(prefix, len(prefix) - 1) if prefix else None
+            if parent_id != self.parent_id:
+                Comment.parent.field.delete_cached_value(self)
+                self.parent_id = parent_id
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+            self.path = self.make_path(prefix, self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    class Meta:
+        ordering = ("created",)
+        indexes = [
+            models.Index(
+                fields=["post", "created"],
+                name="comment_post_created"
+            ),
+            models.Index(
+                fields=["post", "path"],
+                name="comment_post_path"
+            ),
+        ]
+
+
+def path_id(segments, position):
+    """id комментария из сегмента пути; корень записан как ROOT_KEY - id."""
+    key = int(segments[position])
+    return Comment.ROOT_KEY - key if position == 0 else key
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -94,3 +312,241 @@ class Follow(models.Model):
     # UniqueConstraint provides more functionality than unique_together.
     # unique_together may be deprecated in the future.
     # Не буду приучиваться к устаревающему варианту :)
+
+
+class TimelineEntry(models.Model):
+    """Запись в ленте подписчика, заполняется при публикации поста."""
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        on_delete=models.CASCADE,
+        related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Запись",
+        on_delete=models.CASCADE,
+        related_name="timeline_entries"
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_timeline_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_pub_date_post"
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются вместе с записями и подписками."""
+    user = models.OneToOneField(
+        User,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Записей",
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Подписчиков",
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name="Подписан",
+        default=0
+    )
+
+
+class GroupStats(models.Model):
+    """Сводка группы для каталога, обновляется вместе с записями."""
+    group = models.OneToOneField(
+        Group,
+        verbose_name="Группа",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Записей",
+        default=0
+    )
+    authors_count = models.PositiveIntegerField(
+        verbose_name="Авторов",
+        default=0
+    )
+    last_post_date = models.DateTimeField(
+        verbose_name="Последняя запись",
+        blank=True,
+        null=True
+    )
+
+
+class Task(models.Model):
+    """
+    Отложенная работа после записи: раскладка по лентам, индексация,
+    письма. Выполняется воркерами run_workers, см. posts.queue.
+
+    Пока задача ждёт, run_at — время запуска, пока выполняется — срок
+    аренды воркера, после выполнения — время завершения.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(verbose_name="Задача", max_length=100)
+    payload = models.TextField(verbose_name="Аргументы", default="{}")
+    key = models.CharField(
+        verbose_name="Ключ идемпотентности",
+        max_length=200,
+        unique=True,
+        blank=True,
+        null=True,
+    )
+    status = models.CharField(
+        verbose_name="Состояние",
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток",
+        default=0,
+    )
+    run_at = models.DateTimeField(verbose_name="Запуск")
+    error = models.TextField(verbose_name="Ошибка", blank=True)
+    created = models.DateTimeField(
+        verbose_name="Создана",
+        auto_now_add=True
+    )
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"],
+                name="task_status_run_at"
+            ),
+        ]
+
+
+class Notification(models.Model):
+    """
+    Событие для пользователя: комментарий к его записи, ответ на его
+    комментарий или новый подписчик. Строки короткие — только id:
+    тексты подтягиваются при показе и в дайджесте.
+    """
+    COMMENT = "comment"
+    REPLY = "reply"
+    FOLLOW = "follow"
+    KINDS = (
+        (COMMENT, "Комментарий"),
+        (REPLY, "Ответ"),
+        (FOLLOW, "Подписка"),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        verbose_name="Получатель",
+        on_delete=models.CASCADE,
+        related_name="notifications"
+    )
+    actor = models.ForeignKey(
+        User,
+        verbose_name="Кто",
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    kind = models.CharField(
+        verbose_name="Событие",
+        max_length=10,
+        choices=KINDS,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Запись",
+        on_delete=models.CASCADE,
+        related_name="+",
+        blank=True,
+        null=True,
+    )
+    created = models.DateTimeField(
+        verbose_name="Дата",
+        auto_now_add=True
+    )
+    is_read = models.BooleanField(verbose_name="Прочитано", default=False)
+    emailed = models.BooleanField(verbose_name="В дайджесте", default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipient", "-created", "-id"],
+                name="notification_recipient"
+            ),
+            # Частичные индексы остаются маленькими: прочитанные
+            # и разосланные строки в них не попадают.
+            models.Index(
+                fields=["recipient"],
+                name="notification_unread",
+                condition=models.Q(is_read=False),
+            ),
+            models.Index(
+                fields=["recipient", "id"],
+                name="notification_unsent",
+                condition=models.Q(emailed=False),
+            ),
+        ]
+
+
+class PostScore(models.Model):
+    """
+    Популярность записи для /popular/, см. posts.popular. Событие
+    с весом w в момент t добавляет w * 2^((t - эпоха) / полураспад),
+    а хранится log2 суммы: так старые и новые рейтинги сравнимы без
+    пересчёта всей таблицы, и числа не растут до переполнения.
+    """
+    post = models.OneToOneField(
+        Post,
+        verbose_name="Запись",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="score",
+    )
+    score = models.FloatField(verbose_name="Рейтинг")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-score"], name="post_score"),
+        ]
+
+
+class ScoreCursor(models.Model):
+    """Последний учтённый в рейтинге id событий каждого вида."""
+    name = models.CharField(
+        verbose_name="События",
+        max_length=20,
+        primary_key=True,
+    )
+    last_id = models.PositiveIntegerField(
+        verbose_name="Последний id",
+        default=0,
+    )
@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count, Max
+from django.template.loader import get_template
+
+from .models import Comment, Notification, Post, User
+
+
+def _unread_key(user_id):
+    return f"notifications_unread:{user_id}"
+
+
+def unread_count(user_id):
+    """
+    Число непрочитанных уведомлений для значка в меню. Считается
+    по базе, только если счётчика нет в кэше. Счётчик живёт
+    PAGE_CACHE_TIMEOUT: если новое уведомление пришло, пока его
+    пересчитывали, ошибка продержится не дольше.
+    """
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(
+            recipient_id=user_id, is_read=False
+        ).count()
+        cache.add(key, count, settings.PAGE_CACHE_TIMEOUT)
+    return count
+
+
+def notify(recipient_ids, actor_id, kind, post_id=None):
+    """Записывает уведомления одним INSERT. Себе уведомления не шлются."""
+    recipient_ids = set(recipient_ids) - {actor_id}
+    Notification.objects.bulk_create(
+        Notification(
+            recipient_id=recipient_id,
+            actor_id=actor_id,
+            kind=kind,
+            post_id=post_id,
+        )
+        for recipient_id in recipient_ids
+    )
+    for recipient_id in recipient_ids:
+        try:
+            cache.incr(_unread_key(recipient_id))
+        except ValueError:
+            # Счётчика нет — его посчитают по базе при следующем показе.
+            pass
+
+
+def notify_comment(comment):
+    """Автору записи — о комментарии, автору комментария — об ответе."""
+    if Comment.post.is_cached(comment):
+        post_author_id = comment.post.author_id
+    else:
+        post_author_id = Post.objects.filter(
+            id=comment.post_id
+        ).values_list("author_id", flat=True).first()
+    parent_author_id = None
+    if comment.parent_id is not None:
+        if Comment.parent.is_cached(comment):
+            parent_author_id = comment.parent.author_id
+        else:
+            parent_author_id = Comment.objects.filter(
+                id=comment.parent_id
+            ).values_list("author_id", flat=True).first()
+
+    if parent_author_id is not None:
+        notify([parent_author_id], comment.author_id, Notification.REPLY,
+               comment.post_id)
+    if post_author_id not in (None, parent_author_id):
+        notify([post_author_id], comment.author_id, Notification.COMMENT,
+               comment.post_id)
+
+
+def mark_read(user_id, up_to=None):
+    """
+    Отмечает прочитанными уведомления до up_to включительно — те, что
+    пользователь видел на странице, — или все, если up_to не задан.
+    Счётчик значка пересчитается при следующем показе: пришедшие
+    позже уведомления остаются непрочитанными.
+    """
+    unread = Notification.objects.filter(recipient_id=user_id, is_read=False)
+    if up_to is not None:
+        unread = unread.filter(id__lte=up_to)
+    unread.update(is_read=True)
+    cache.delete(_unread_key(user_id))
+
+
+def send_digests(batch_size=None, connection=None):
+    """
+    Рассылает дайджесты: одно письмо на получателя, сколько бы событий
+    у него ни накопилось. События сворачиваются в строки «событие,
+    запись, сколько раз» одним GROUP BY на пачку из batch_size
+    получателей; письма пачки уходят одним send_messages — одно
+    SMTP-соединение или одна запись в файл.
+
+    События, пришедшие во время рассылки, ждут следующего запуска.
+    Возвращает число писем и разосланных событий.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_DIGEST_BATCH
+    unsent = Notification.objects.filter(emailed=False)
+    last_id = unsent.aggregate(last_id=Max("id"))["last_id"]
+    if last_id is None:
+        return 0, 0
+    unsent = unsent.filter(id__lte=last_id)
+    template = get_template("posts/email/digest.txt")
+    connection = connection or get_connection()
+    sent = events = 0
+    previous_id = 0
+    while True:
+        recipient_ids = list(
+            unsent.filter(recipient_id__gt=previous_id).order_by(
+                "recipient_id"
+            ).values_list("recipient_id", flat=True).distinct()[:batch_size]
+        )
+        if not recipient_ids:
+            return sent, events
+        previous_id = recipient_ids[-1]
+        batch = unsent.filter(recipient_id__in=recipient_ids)
+        messages, count = digest_messages(template, batch)
+        connection.send_messages(messages)
+        batch.update(emailed=True)
+        sent += len(messages)
+        events += count
+
+
+def digest_messages(template, notifications):
+    """Письма по неразосланным уведомлениям, по одному на получателя."""
+    groups = notifications.values(
+        "recipient_id", "kind", "post_id"
+    ).annotate(
+        total=Count("id"), latest=Max("created")
+    ).order_by("recipient_id", "-latest")
+    digests = {}
+    post_ids = set()
+    for group in groups:
+        digests.setdefault(group["recipient_id"], []).append(group)
+        post_ids.add(group["post_id"])
+    posts = dict(Post.objects.filter(id__in=post_ids).values_list(
+        "id", "text"
+    ))
+    messages = []
+    count = 0
+    for recipient in User.objects.filter(id__in=digests).exclude(email=""):
+        lines = digests[recipient.id]
+        for line in lines:
+            line["post_text"] = posts.get(line["post_id"], "")
+        total = sum(line["total"] for line in lines)
+        count += total
+        messages.append(EmailMessage(
+            subject=f"Yatube: новых событий — {total}",
+            body=template.render({"user": recipient, "lines": lines}),
+            to=[recipient.email],
+        ))
+    return messages, count
@@ -0,0 +1,269 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from yatube.db_router import replica_alias
+from yatube.instrumentation import record_cache
+
+from . import fragments
+from .models import Post
+from .notifications import unread_count
+
+
+def _version_key(name):
+    return f"page_version:{name}"
+
+
+def get_version(name):
+    """
+    Текущее поколение страницы. Если счётчик вытеснен из кэша,
+    он начинается с текущего времени и не совпадёт со старыми копиями.
+    """
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def has_version(name):
+    """
+    Есть ли счётчик поколения в кэше. Для имён с id из адреса:
+    get_version завёл бы вечный ключ на любой выдуманный адрес.
+    """
+    return cache.get(_version_key(name)) is not None
+
+
+def remember_version(name):
+    """Заводит счётчик поколения объекта, который view нашло в базе."""
+    get_version(name)
+
+
+def get_versions(names):
+    """Поколения нескольких страниц одним обращением к кэшу."""
+    keys = {name: _version_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    return [
+        found[key] if key in found else get_version(name)
+        for name, key in keys.items()
+    ]
+
+
+def bump_version(name):
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_existing_versions(names):
+    """
+    Поднимает только поколения, счётчики которых есть в кэше.
+    Отсутствующий счётчик и так начнётся заново с текущего времени,
+    а массовый сброс — например, лент всех подписчиков автора —
+    не должен заводить ключи, которые вытеснят из кэша нужные.
+    """
+    for name in names:
+        try:
+            cache.incr(_version_key(name))
+        except ValueError:
+            pass
+
+
+def bump_post_versions(post_ids):
+    """
+    Поколения записей, их авторов и групп — для изменений, которые
+    делаются update() мимо сигналов.
+    """
+    names = {"index"}
+    for post_id, author_id, group_id in Post.objects.filter(
+        id__in=post_ids
+    ).values_list("id", "author_id", "group_id"):
+        names.update((f"post:{post_id}", f"author:{author_id}"))
+        if group_id is not None:
+            names.add(f"group:{group_id}")
+    for name in names:
+        bump_version(name)
+
+
+def versions_etag(names, *extra):
+    """Короткий хэш поколений names и дополнительных частей ключа."""
+    parts = [*map(str, get_versions(names)), *map(str, extra)]
+    return hashlib.md5(".".join(parts).encode()).hexdigest()[:20]
+
+
+def _id_key(kind, value):
+    return f"{kind}_id:{value}"
+
+
+def remember_id(kind, value, object_id):
+    """
+    Запоминает id группы или автора по slug или имени. Views
+    всё равно загружают объект, а ETag следующего запроса
+    обойдётся без базы.
+    """
+    cache.set(_id_key(kind, value), object_id, timeout=None)
+
+
+def user_id(username):
+    return cache.get(_id_key("user", username))
+
+
+def group_id(slug):
+    return cache.get(_id_key("group", slug))
+
+
+def following_version(user_id):
+    version, = get_versions([f"following:{user_id}"])
+    return version
+
+
+def remember_following_ids(user_id, version, author_ids):
+    """
+    Запоминает подписки пользователя. version берётся до запроса
+    подписок: подписка, добавленная между ними, сменит поколение,
+    и копия просто не пригодится.
+    """
+    cache.set(
+        f"following_ids:{user_id}:{version}",
+        author_ids,
+        settings.PAGE_CACHE_TIMEOUT,
+    )
+
+
+def following_ids(user_id):
+    """id авторов в подписках или None, если их ещё не запоминали."""
+    return cache.get(
+        f"following_ids:{user_id}:{following_version(user_id)}"
+    )
+
+
+def conditional_page(page_versions):
+    """
+    Условный GET для HTML-страниц. page_versions(request, **kwargs)
+    возвращает имена поколений, из которых собирается страница,
+    или None, если ETag не нужен.
+
+    ETag считается до view из счётчиков в кэше: совпавший запрос
+    анонима получает 304 без обращений к базе. Пока id из адреса
+    не запомнены в кэше, ETag не выдаётся. У вошедшего в ETag
+    попадают id и CSRF-cookie: страница с формой хранит токен.
+    Анонимные страницы можно ненадолго держать в общих кэшах,
+    страницы вошедших — только в браузере. Их ETag меняется и вместе
+    со значком непрочитанных уведомлений в меню.
+    """
+    def etag(request, *args, **kwargs):
+        names = page_versions(request, *args, **kwargs)
+        if names is None:
+            return None
+        user = request.user
+        personal = ("", "")
+        if user.is_authenticated:
+            personal = (
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+                unread_count(user.pk),
+            )
+        digest = versions_etag(
+            names,
+            settings.HTML_CACHE_VERSION,
+            user.pk or 0,
+            *personal,
+        )
+        return f'"h-{digest}"'
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if getattr(response, "stale_page", False):
+                # Старая копия из versioned_cache_page не должна получить
+                # ETag нового поколения.
+                del response["ETag"]
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response,
+                    public=True,
+                    max_age=0,
+                    s_maxage=settings.HTML_SHARED_MAX_AGE,
+                )
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
+
+
+def versioned_cache_page(page_versions, per_user=False):
+    """
+    Кэширует успешные GET-ответы, пока не изменятся поколения
+    page_versions(request, **kwargs) — тех же, что и для
+    conditional_page; None значит, что кэшировать нельзя.
+
+    В кэш попадает тело страницы с метками вместо фрагментов зрителя
+    (posts.fragments), поэтому без per_user оно одно на всех: и на
+    анонимов, и на вошедших. Каждый ответ собирается из тела заново.
+    Страницы с CSRF-токеном в формах так кэшировать нельзя.
+
+    Устаревшую копию пересобирает только один запрос: он берёт блокировку
+    через cache.add, остальные в это время получают старую копию.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = None
+            if request.method == "GET":
+                names = page_versions(request, *args, **kwargs)
+            if names is None:
+                return view(request, *args, **kwargs)
+
+            viewer = (request.user.pk or 0) if per_user else "all"
+            key = (
+                f"page:{view.__name__}:{viewer}:{request.get_full_path()}"
+            )
+            version = get_versions(names)
+            cached = cache.get(key)
+            if cached is not None and cached[0] == version:
+                record_cache(hits=1)
+                return fragments.assemble(request, cached[1])
+
+            lock_key = f"{key}:lock"
+            locked = cache.add(
+                lock_key, True, settings.PAGE_CACHE_LOCK_TIMEOUT
+            )
+            if not locked and cached is not None:
+                record_cache(hits=1)
+                response = fragments.assemble(request, cached[1])
+                response.stale_page = True
+                return response
+
+            record_cache(misses=1)
+            fragments.defer(request, True)
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    # Реплика могла не догнать изменение, которое подняло
+                    # поколение: такая копия живёт не дольше отставания.
+                    cache.set(
+                        key,
+                        (version, response),
+                        settings.REPLICA_LAG if replica_alias()
+                        else settings.PAGE_CACHE_TIMEOUT
+                    )
+            finally:
+                fragments.defer(request, False)
+                if locked:
+                    cache.delete(lock_key)
+            if response.status_code != 200:
+                return response
+            return fragments.assemble(request, response)
+        return wrapper
+    return decorator
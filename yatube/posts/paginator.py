@@ -0,0 +1,250 @@
+import base64
+import binascii
+import datetime as dt
+from abc import ABC, abstractmethod
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+
+class KeysetPaginator(ABC, Paginator):
+    """
+    Постраничный вывод по уникальному ключу записей. Страница
+    выбирается диапазонным запросом от курсора, без OFFSET и COUNT(*),
+    поэтому время ответа не зависит от глубины страницы. Курсор —
+    непрозрачный токен с направлением, номером страницы и ключом
+    граничной записи.
+
+    Выборка берёт на запись больше per_page, так что есть ли следующая
+    страница, известно и без COUNT(*): num_pages отвечает по последней
+    собранной странице, и has_next с next_page_number стоят дёшево.
+    count по-прежнему считает все записи.
+
+    Подкласс задаёт key_size — число частей ключа — и методы работы
+    с ключом. transform получает список выбранных объектов
+    и возвращает то, что попадёт в страницу.
+    """
+
+    key_size = 1
+
+    def get_page(self, number=None, cursor=None):
+        if cursor:
+            return self.cursor_page(cursor)
+        return self.offset_page(number)
+
+    def offset_page(self, number):
+        """Поддержка старых ссылок вида ?page=N."""
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        items = list(self.object_list[offset:offset + self.per_page + 1])
+        if not items and number > 1:
+            return self.offset_page(1)
+        return self._build_page(
+            items[:self.per_page],
+            number,
+            has_next=len(items) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def cursor_page(self, cursor):
+        try:
+            direction, number, key = decode_cursor(cursor, self.key_size)
+            key = self.parse_key(*key)
+        except ValueError:
+            return self.offset_page(1)
+
+        if direction == "next":
+            items = list(self.after(key)[:self.per_page + 1])
+            return self._build_page(
+                items[:self.per_page],
+                number,
+                has_next=len(items) > self.per_page,
+                has_previous=True,
+            )
+
+        items = list(self.before(key)[:self.per_page + 1])
+        has_previous = len(items) > self.per_page
+        return self._build_page(
+            items[:self.per_page][::-1],
+            number if has_previous else 1,
+            has_next=True,
+            has_previous=has_previous,
+        )
+
+    def transform(self, items):
+        return items
+
+    @abstractmethod
+    def cursor_key(self, item):
+        """Части ключа записи строками, key_size штук."""
+
+    @abstractmethod
+    def parse_key(self, *values):
+        """Ключ из частей, прочитанных из курсора."""
+
+    @abstractmethod
+    def after(self, key):
+        """Записи за ключом в порядке страницы."""
+
+    @abstractmethod
+    def before(self, key):
+        """Записи перед ключом в обратном порядке."""
+
+    def _build_page(self, items, number, has_next, has_previous):
+        self.num_pages = number + 1 if has_next else number
+        page = Page(self.transform(items), number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if items and has_next:
+            page.next_cursor = encode_cursor(
+                "next", number + 1, *self.cursor_key(items[-1])
+            )
+        if items and has_previous:
+            page.previous_cursor = encode_cursor(
+                "previous", number - 1, *self.cursor_key(items[0])
+            )
+        return page
+
+
+class CursorPaginator(KeysetPaginator):
+    """
+    Постраничный вывод записей по ключу (date_field, id_field),
+    от новых к старым.
+
+    transform позволяет листать, например, ленту TimelineEntry,
+    а показывать связанные записи.
+    """
+
+    key_size = 2
+
+    def __init__(self, object_list, per_page, date_field="pub_date",
+                 id_field="id", transform=None):
+        super().__init__(
+            object_list.order_by(f"-{date_field}", f"-{id_field}"),
+            per_page
+        )
+        self.date_field = date_field
+        self.id_field = id_field
+        if transform is not None:
+            self.transform = transform
+
+    def cursor_key(self, item):
+        return (
+            getattr(item, self.date_field).isoformat(),
+            getattr(item, self.id_field),
+        )
+
+    def parse_key(self, date, pk):
+        return dt.datetime.fromisoformat(date), int(pk)
+
+    def after(self, key):
+        return self.object_list.filter(self._key_filter("lt", *key))
+
+    def before(self, key):
+        return self.object_list.filter(
+            self._key_filter("gt", *key)
+        ).order_by(self.date_field, self.id_field)
+
+    def _key_filter(self, lookup, date, pk):
+        return Q(**{f"{self.date_field}__{lookup}": date}) | Q(**{
+            self.date_field: date,
+            f"{self.id_field}__{lookup}": pk,
+        })
+
+
+class PathPaginator(KeysetPaginator):
+    """
+    Постраничный вывод по возрастанию уникального строкового ключа —
+    материализованного пути комментариев или slug групп.
+    """
+
+    def __init__(self, object_list, per_page, key_field="path"):
+        super().__init__(object_list.order_by(key_field), per_page)
+        self.key_field = key_field
+
+    def cursor_key(self, item):
+        return (getattr(item, self.key_field),)
+
+    def parse_key(self, key):
+        return key
+
+    def after(self, key):
+        return self.object_list.filter(**{f"{self.key_field}__gt": key})
+
+    def before(self, key):
+        return self.object_list.filter(
+            **{f"{self.key_field}__lt": key}
+        ).reverse()
+
+
+def encode_cursor(direction, number, *key):
+    raw = "|".join(map(str, (direction, number, *key)))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, key_size):
+    """
+    Направление, номер страницы и key_size частей ключа строками.
+    Последняя часть может содержать «|».
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, number, *key = raw.split("|", key_size + 1)
+        number = max(int(number), 1)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Некорректный курсор")
+    if direction not in ("next", "previous") or len(key) != key_size:
+        raise ValueError("Некорректный курсор")
+    return direction, number, key
+
+
+class RankedPaginator(Paginator):
+    """
+    Постраничный вывод готового списка id — например, популярных
+    записей. Курсор хранит id граничной записи: если список успели
+    обновить, следующая страница продолжается от неё. Запись, выпавшая
+    из списка, сводит курсор к номеру страницы.
+    """
+
+    def __init__(self, ids, posts, per_page):
+        super().__init__(ids, per_page)
+        self.posts = posts
+
+    def get_page(self, number=None, cursor=None):
+        number, start = self._position(number, cursor)
+        ids = self.object_list[start:start + self.per_page]
+        if not ids and start:
+            return self.get_page(1)
+        posts = self.posts.in_bulk(ids)
+        page = Page([posts[pk] for pk in ids if pk in posts], number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if start + self.per_page < len(self.object_list):
+            page.next_cursor = encode_cursor("next", number + 1, ids[-1])
+        if start:
+            page.previous_cursor = encode_cursor(
+                "previous", number - 1, ids[0]
+            )
+        return page
+
+    def _position(self, number, cursor):
+        """Номер страницы и индекс её первой записи в списке."""
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if cursor:
+            try:
+                direction, number, (key,) = decode_cursor(cursor, 1)
+                index = self.object_list.index(int(key))
+            except ValueError:
+                return number, (number - 1) * self.per_page
+            if direction == "next":
+                return number, index + 1
+            start = max(index - self.per_page, 0)
+            return (number if start else 1), start
+        return number, (number - 1) * self.per_page
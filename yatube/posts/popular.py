@@ -0,0 +1,147 @@
+import datetime as dt
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, PostScore, ScoreCursor
+from .page_cache import bump_version
+
+# Начало отсчёта для затухания. Рейтинг — log2, поэтому и через
+# десятки лет он остаётся небольшим числом.
+EPOCH = dt.datetime(2020, 1, 1)
+IDS_KEY = "popular_ids"
+
+
+def exponent(weight, moment):
+    """log2 вклада события с весом weight в момент moment."""
+    age = (moment - EPOCH).total_seconds() / settings.POPULAR["HALF_LIFE"]
+    return math.log2(weight) + age
+
+
+def log_sum(exponents):
+    """log2(sum(2 ** x)) без переполнения."""
+    top = max(exponents)
+    return top + math.log2(sum(2 ** (x - top) for x in exponents))
+
+
+def new_events(cursors, now):
+    """
+    Пачки новых событий после запомненных id: вид и список
+    (id события, id записи, log2 вклада). У подписки нет даты, она
+    считается событием момента обновления и поднимает последнюю
+    запись автора.
+    """
+    weights = settings.POPULAR["WEIGHTS"]
+    batch = settings.POPULAR["BATCH"]
+
+    posts = Post.objects.filter(id__gt=cursors.get("post", 0)).order_by(
+        "id"
+    ).values_list("id", "pub_date")[:batch]
+    yield "post", [
+        (post_id, post_id, exponent(weights["post"], pub_date))
+        for post_id, pub_date in posts
+    ]
+
+    comments = Comment.objects.filter(
+        id__gt=cursors.get("comment", 0)
+    ).order_by("id").values_list("id", "post_id", "created")[:batch]
+    yield "comment", [
+        (comment_id, post_id, exponent(weights["comment"], created))
+        for comment_id, post_id, created in comments
+    ]
+
+    follows = list(Follow.objects.filter(
+        id__gt=cursors.get("follow", 0)
+    ).order_by("id").values_list("id", "author_id")[:batch])
+    latest = dict(Post.objects.filter(
+        author_id__in={author_id for _, author_id in follows}
+    ).order_by().values("author_id").annotate(
+        last_id=Max("id")
+    ).values_list("author_id", "last_id"))
+    follow_exponent = exponent(weights["follow"], now)
+    yield "follow", [
+        (follow_id, latest.get(author_id), follow_exponent)
+        for follow_id, author_id in follows
+    ]
+
+
+def update():
+    """
+    Учитывает в рейтинге события, появившиеся с прошлого раза, —
+    не больше POPULAR["BATCH"] каждого вида. Рейтинги и отметки
+    о том, докуда дочитаны события, меняются одной транзакцией:
+    упавший проход просто повторится. Возвращает число событий.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        cursors = dict(ScoreCursor.objects.values_list("name", "last_id"))
+        terms = {}
+        processed = 0
+        for name, events in new_events(cursors, now):
+            for event_id, post_id, value in events:
+                if post_id is not None:
+                    terms.setdefault(post_id, []).append(value)
+            if events:
+                processed += len(events)
+                ScoreCursor.objects.update_or_create(
+                    name=name, defaults={"last_id": events[-1][0]}
+                )
+        if not processed:
+            return 0
+        scores = PostScore.objects.in_bulk(terms)
+        # Записи могли удалить после того, как прочитаны события.
+        new_ids = set(Post.objects.filter(
+            id__in=terms.keys() - scores.keys()
+        ).values_list("id", flat=True))
+        for post_id, values in terms.items():
+            if post_id in scores:
+                values.append(scores[post_id].score)
+                scores[post_id].score = log_sum(values)
+        PostScore.objects.bulk_update(
+            scores.values(), ["score"], batch_size=500
+        )
+        PostScore.objects.bulk_create(
+            PostScore(post_id=post_id, score=log_sum(terms[post_id]))
+            for post_id in new_ids
+        )
+    refresh()
+    return processed
+
+
+def update_all():
+    """Догоняет все накопившиеся события."""
+    processed = 0
+    while True:
+        count = update()
+        if not count:
+            return processed
+        processed += count
+
+
+def top_ids():
+    return list(PostScore.objects.order_by("-score").values_list(
+        "post_id", flat=True
+    )[:settings.POPULAR["SIZE"]])
+
+
+def refresh():
+    """
+    Подменяет готовый список лучших записей одной записью в кэш:
+    читатели видят либо старый список, либо новый, и не ждут
+    обновления рейтинга.
+    """
+    cache.set(IDS_KEY, top_ids(), timeout=None)
+    bump_version("popular")
+
+
+def post_ids():
+    """Лучшие записи по убыванию рейтинга."""
+    ids = cache.get(IDS_KEY)
+    if ids is None:
+        ids = top_ids()
+        cache.add(IDS_KEY, ids, timeout=None)
+    return ids
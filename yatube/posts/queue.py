@@ -0,0 +1,152 @@
+import json
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def task(name):
+    """Регистрирует функцию как задачу name. Аргументы — JSON-совместимые."""
+    def decorator(function):
+        HANDLERS[name] = function
+        return function
+    return decorator
+
+
+def enqueue(name, key=None, delay=0, **kwargs):
+    """
+    Ставит задачу в очередь одним INSERT OR IGNORE: задача с уже
+    известным key повторно не добавляется, пока запись о ней не удалена
+    через TASKS["RETENTION"] секунд после выполнения. Внутри транзакции
+    задача добавляется после её фиксации: откаченная запись не оставляет
+    задач, а вставка не удлиняет транзакцию вызывающего.
+
+    С TASKS["EAGER"] задача выполняется сразу, в текущем процессе, —
+    так работают тесты и сервер разработки без run_workers.
+    """
+    if name not in HANDLERS:
+        raise LookupError(f"Неизвестная задача: {name}")
+    payload = json.dumps(kwargs)
+    if settings.TASKS["EAGER"]:
+        HANDLERS[name](**json.loads(payload))
+        return
+    transaction.on_commit(lambda: Task.objects.bulk_create(
+        [Task(
+            name=name,
+            key=key,
+            payload=payload,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )],
+        ignore_conflicts=True,
+    ))
+
+
+def claim(limit):
+    """
+    Забирает до limit задач, которым пора выполняться, и выдаёт воркеру
+    аренду на TASKS["LEASE"] секунд. Задачи воркера, который упал,
+    не отчитавшись, снова попадают в выдачу, когда аренда истекает.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(Task.objects.select_for_update(skip_locked=True).filter(
+            status__in=(Task.PENDING, Task.RUNNING),
+            run_at__lte=now,
+        ).order_by("run_at")[:limit])
+        Task.objects.filter(id__in=[task.id for task in tasks]).update(
+            status=Task.RUNNING,
+            run_at=now + timedelta(seconds=settings.TASKS["LEASE"]),
+            attempts=F("attempts") + 1,
+        )
+    for task in tasks:
+        task.attempts += 1
+    return tasks
+
+
+def backoff(attempts):
+    """
+    Пауза перед следующей попыткой: удваивается с каждой неудачей.
+    Случайная добавка до четверти не даёт задачам, упавшим из-за общего
+    сбоя, повторяться одновременно.
+    """
+    delay = settings.TASKS["BACKOFF"] * 2 ** (attempts - 1)
+    return delay * (1 + random.random() / 4)
+
+
+def run(task):
+    """
+    Выполняет задачу. Изменения в базе и отметка о выполнении
+    фиксируются одной транзакцией. При ошибке задача откладывается
+    по backoff, а после TASKS["MAX_ATTEMPTS"] попыток остаётся
+    в состоянии failed.
+    """
+    try:
+        handler = HANDLERS[task.name]
+        with transaction.atomic():
+            handler(**json.loads(task.payload))
+            Task.objects.filter(id=task.id).update(
+                status=Task.DONE, run_at=timezone.now(), error=""
+            )
+        return True
+    except Exception:
+        logger.exception("Задача %s не выполнена", task)
+        if task.attempts >= settings.TASKS["MAX_ATTEMPTS"]:
+            status, run_at = Task.FAILED, timezone.now()
+        else:
+            status = Task.PENDING
+            run_at = timezone.now() + timedelta(
+                seconds=backoff(task.attempts)
+            )
+        Task.objects.filter(id=task.id).update(
+            status=status, run_at=run_at, error=traceback.format_exc()
+        )
+        return False
+
+
+def purge():
+    """Удаляет выполненные задачи старше TASKS["RETENTION"] секунд."""
+    return Task.objects.filter(
+        status=Task.DONE,
+        run_at__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS["RETENTION"]
+        ),
+    ).delete()[0]
+
+
+def work(stop, batch=10, interval=1, burst=False):
+    """
+    Цикл воркера: забирает задачи пачками по batch, пока не выставлен
+    stop. Пустая очередь — пауза interval секунд и заодно очистка
+    старых задач; с burst воркер на пустой очереди завершается.
+    Возвращает число выполненных и упавших задач.
+    """
+    done = failed = 0
+    purged_at = 0
+    while not stop.is_set():
+        tasks = claim(batch)
+        for task in tasks:
+            if run(task):
+                done += 1
+            else:
+                failed += 1
+        if tasks:
+            continue
+        if time.monotonic() - purged_at > settings.TASKS["RETENTION"] / 10:
+            purge()
+            purged_at = time.monotonic()
+        if burst:
+            break
+        stop.wait(interval)
+    return done, failed
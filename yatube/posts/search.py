@@ -0,0 +1,350 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .paginator import decode_cursor, encode_cursor
+from .stemmer import stem
+
+REBUILD_BATCH_SIZE = 1000
+
+WORD = re.compile(r"\w+")
+CYRILLIC = re.compile(r"[а-яё]")
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, русские — приведённые к основе."""
+    return [
+        stem(word) if CYRILLIC.search(word) else word
+        for word in WORD.findall(text.lower())
+    ]
+
+
+class SearchBackend(ABC):
+    """
+    Интерфейс поискового индекса. Документ — запись вместе
+    с текстами её комментариев, идентификатор документа — id записи.
+    Комментарий можно заменить или убрать в документе, не собирая
+    документ заново.
+    """
+
+    def setup(self):
+        """Создаёт хранилище индекса, если его ещё нет."""
+
+    @abstractmethod
+    def update(self, documents):
+        """
+        Добавляет или заменяет документы (post_id, text, comments),
+        где comments — пары (comment_id, text).
+        """
+
+    @abstractmethod
+    def update_comment(self, post_id, comment_id, text):
+        """
+        Заменяет текст комментария в документе записи, text=None
+        убирает комментарий. Документа нет в индексе — делать нечего:
+        запись ещё ждёт индексации или уже удалена. False — документ
+        записан без разбивки по комментариям, его нужно собрать заново
+        через update.
+        """
+
+    @abstractmethod
+    def remove(self, post_ids):
+        """Убирает документы записей post_ids."""
+
+    @abstractmethod
+    def clear(self):
+        """Убирает все документы."""
+
+    @abstractmethod
+    def count(self, query):
+        """Число документов, подходящих под запрос."""
+
+    @abstractmethod
+    def search(self, query, limit, after=None, before=None, offset=0):
+        """
+        Список пар (score, post_id) по убыванию релевантности.
+        after и before — ключ (score, post_id) граничного результата.
+        """
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Индекс в виртуальной таблице FTS5 той же базы SQLite.
+
+    В таблицу пишутся уже приведённые к основе слова, поэтому
+    поиск по «котам» находит «котов». Индекс обновляют задачи
+    posts.tasks, когда до них дойдёт воркер (с TASKS["EAGER"] — сразу
+    в запросе).
+
+    Комментарии лежат в колонке comments по строке на комментарий,
+    их id в том же порядке — в неиндексируемой comment_ids. Так новый
+    или удалённый комментарий меняет одну строку документа: остальные
+    не читаются из базы и не приводятся к основе повторно.
+    """
+
+    table = "posts_search"
+    # Строк в одном запросе: SQLite принимает не больше 999 параметров.
+    # executemany не используется — его не умеет показывать debug_toolbar.
+    chunk_size = 300
+
+    def setup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                "USING fts5(text, comments, comment_ids UNINDEXED, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            # Текст записи весит вдвое больше комментариев.
+            cursor.execute(
+                f"INSERT INTO {self.table} ({self.table}, rank) "
+                "VALUES ('rank', 'bm25(2.0, 1.0)')"
+            )
+
+    def update(self, documents):
+        rows = [
+            (
+                post_id,
+                " ".join(tokenize(text)),
+                *self.join_comments({
+                    comment_id: " ".join(tokenize(comment))
+                    for comment_id, comment in comments
+                }),
+            )
+            for post_id, text, comments in documents
+        ]
+        self.remove([row[0] for row in rows])
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.chunk_size):
+                chunk = rows[start:start + self.chunk_size]
+                cursor.execute(
+                    f"INSERT INTO {self.table} "
+                    "(rowid, text, comments, comment_ids) "
+                    f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))}",
+                    [value for row in chunk for value in row]
+                )
+
+    @staticmethod
+    def join_comments(lines):
+        """Колонки comments и comment_ids из {comment_id: слова}."""
+        ids = sorted(lines)
+        return (
+            "\n".join(lines[comment_id] for comment_id in ids),
+            " ".join(map(str, ids)),
+        )
+
+    def update_comment(self, post_id, comment_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT comments, comment_ids FROM {self.table} "
+                "WHERE rowid = %s",
+                [post_id]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return True
+            comments, comment_ids = row
+            if comment_ids is None:
+                return False
+            lines = {}
+            if comment_ids:
+                lines = dict(zip(
+                    map(int, comment_ids.split(" ")),
+                    comments.split("\n"),
+                ))
+            if text is None:
+                lines.pop(comment_id, None)
+            else:
+                lines[comment_id] = " ".join(tokenize(text))
+            cursor.execute(
+                f"UPDATE {self.table} SET comments = %s, comment_ids = %s "
+                "WHERE rowid = %s",
+                [*self.join_comments(lines), post_id]
+            )
+        return True
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(post_ids), self.chunk_size):
+                chunk = post_ids[start:start + self.chunk_size]
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN "
+                    f"({', '.join(['%s'] * len(chunk))})",
+                    chunk
+                )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def match(self, query):
+        """
+        Запрос FTS5: все слова обязательны. Слова берутся в кавычки,
+        чтобы ввод не разбирался как синтаксис запроса.
+        """
+        return " ".join(f'"{token}"' for token in tokenize(query))
+
+    def count(self, query):
+        match = self.match(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {self.table} "
+                f"WHERE {self.table} MATCH %s",
+                [match]
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, query, limit, after=None, before=None, offset=0):
+        match = self.match(query)
+        if not match:
+            return []
+        # rank в FTS5 меньше у более релевантных документов.
+        sql = (
+            f"SELECT rank, rowid FROM {self.table} "
+            f"WHERE {self.table} MATCH %s"
+        )
+        params = [match]
+        order = "ASC"
+        if after is not None:
+            sql += " AND (rank > %s OR (rank = %s AND rowid > %s))"
+            params += [after[0], after[0], after[1]]
+        elif before is not None:
+            sql += " AND (rank < %s OR (rank = %s AND rowid < %s))"
+            params += [before[0], before[0], before[1]]
+            order = "DESC"
+        sql += f" ORDER BY rank {order}, rowid {order} LIMIT %s OFFSET %s"
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return rows[::-1] if before is not None else rows
+
+
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def documents(post_model, posts):
+    """
+    Документы индекса для записей posts: текст записи и пары
+    (id, текст) комментариев. Комментарии выбираются одним запросом
+    на пачку.
+    """
+    comments = {post.id: [] for post in posts}
+    comment_model = post_model._meta.get_field("comments").related_model
+    rows = comment_model.objects.filter(
+        post_id__in=comments
+    ).values_list("post_id", "id", "text")
+    for post_id, comment_id, text in rows:
+        comments[post_id].append((comment_id, text))
+    return [(post.id, post.text, comments[post.id]) for post in posts]
+
+
+def index_posts(post_model, posts, backend=None):
+    backend = backend or get_backend()
+    backend.update(documents(post_model, posts))
+
+
+def rebuild(post_model, backend=None):
+    """Заполняет индекс заново, пачками по REBUILD_BATCH_SIZE записей."""
+    backend = backend or get_backend()
+    backend.setup()
+    backend.clear()
+    posts = post_model.objects.only("text").order_by("id")
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(posts.filter(id__gt=last_id)[:REBUILD_BATCH_SIZE])
+        if not batch:
+            return total
+        backend.update(documents(post_model, batch))
+        total += len(batch)
+        last_id = batch[-1].id
+
+
+class SearchPaginator(Paginator):
+    """
+    Постраничный вывод результатов поиска по ключу (score, post_id).
+    Страница отдаёт записи в порядке релевантности; курсоры и num_pages
+    устроены так же, как в KeysetPaginator.
+    """
+
+    def __init__(self, query, posts, per_page, backend=None):
+        super().__init__(posts, per_page)
+        self.query = query
+        self.backend = backend or get_backend()
+
+    @property
+    def count(self):
+        if "_count" not in self.__dict__:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def get_page(self, number=None, cursor=None):
+        if cursor:
+            try:
+                direction, number, (score, pk) = decode_cursor(cursor, 2)
+                score, pk = float(score), int(pk)
+            except ValueError:
+                return self.offset_page(1)
+            if direction == "next":
+                rows = self.backend.search(
+                    self.query, self.per_page + 1, after=(score, pk)
+                )
+                return self._build_page(
+                    rows[:self.per_page], number,
+                    has_next=len(rows) > self.per_page,
+                    has_previous=True,
+                )
+            rows = self.backend.search(
+                self.query, self.per_page + 1, before=(score, pk)
+            )
+            has_previous = len(rows) > self.per_page
+            return self._build_page(
+                rows[-self.per_page:], number if has_previous else 1,
+                has_next=True,
+                has_previous=has_previous,
+            )
+        return self.offset_page(number)
+
+    def offset_page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        rows = self.backend.search(
+            self.query,
+            self.per_page + 1,
+            offset=(number - 1) * self.per_page
+        )
+        if not rows and number > 1:
+            return self.offset_page(1)
+        return self._build_page(
+            rows[:self.per_page], number,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def _build_page(self, rows, number, has_next, has_previous):
+        posts = self.object_list.in_bulk([pk for _, pk in rows])
+        self.num_pages = number + 1 if has_next else number
+        page = Page(
+            [posts[pk] for _, pk in rows if pk in posts],
+            number,
+            self
+        )
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = encode_cursor("next", number + 1, *rows[-1])
+        if rows and has_previous:
+            page.previous_cursor = encode_cursor(
+                "previous", number - 1, *rows[0]
+            )
+        return page
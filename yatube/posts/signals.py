@@ -0,0 +1,238 @@
+from django.conf import settings
+from django.core.files import File
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, notifications, queue
+from .page_cache import bump_version
+from .models import (Comment, Follow, Group, GroupStats, Notification,
+                     Post, UserStats)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_save, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    # Читаем из __dict__, чтобы не загружать отложенное поле.
+    # Файл, переданный в конструктор, ещё не сохранён и считается новым.
+    image = instance.__dict__.get("image")
+    if isinstance(image, File) and not getattr(image, "_committed", False):
+        image = None
+    instance._loaded_image = getattr(image, "name", image)
+
+
+@receiver(pre_save, sender=Post)
+def queue_thumbnail(sender, instance, **kwargs):
+    """Новая картинка ставится в очередь на построение миниатюры."""
+    if instance.image.name != getattr(instance, "_loaded_image", None):
+        instance.thumbnail_status = (
+            Post.THUMBNAIL_PENDING if instance.image else ""
+        )
+        instance.thumbnail_run_at = timezone.now()
+        instance.thumbnail_attempts = 0
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counters(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_counters(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    """
+    Сводка групп, где запись была и стала. Должен идти раньше
+    bump_post_feeds: тот запоминает новую группу как загруженную.
+    """
+    loaded_group_id = None
+    if not created:
+        loaded_group_id = getattr(instance, "_loaded_group_id", None)
+        if loaded_group_id == instance.group_id:
+            return
+    if loaded_group_id is not None:
+        counters.remove_group_post(loaded_group_id, instance)
+    if instance.group_id is not None:
+        counters.add_group_post(instance.group_id, instance)
+    if {loaded_group_id, instance.group_id} != {None}:
+        bump_version("group_stats")
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_group_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        counters.remove_group_post(instance.group_id, instance)
+        bump_version("group_stats")
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counters(instance.user_id, following_count=1)
+        counters.change_user_counters(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_user_counters(instance.user_id, following_count=-1)
+    counters.change_user_counters(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def notify_comment(sender, instance, created, **kwargs):
+    if created:
+        notifications.notify_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def notify_follow(sender, instance, created, **kwargs):
+    if created:
+        notifications.notify(
+            [instance.author_id], instance.user_id, Notification.FOLLOW
+        )
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        queue.enqueue(
+            "fan_out", key=f"fan_out:{instance.id}", post_id=instance.id
+        )
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        queue.enqueue(
+            "backfill_timeline",
+            key=f"backfill_timeline:{instance.id}",
+            follow_id=instance.id,
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    queue.enqueue(
+        "drop_author",
+        key=f"drop_author:{instance.id}",
+        user_id=instance.user_id,
+        author_id=instance.author_id,
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields, **kwargs):
+    if update_fields is None or "text" in update_fields:
+        queue.enqueue("index_post", post_id=instance.id)
+
+
+@receiver(pre_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    # До каскада: комментариям удаляемой записи нечего править в индексе.
+    queue.enqueue("unindex_post", post_id=instance.id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    queue.enqueue(
+        "index_comment",
+        post_id=instance.post_id,
+        comment_id=instance.id,
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def touch_group_posts(sender, instance, **kwargs):
+    """Карточки записей показывают группу, их нужно перерисовать."""
+    if not kwargs.get("created"):
+        instance.posts.update(updated=timezone.now())
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_index_version(sender, **kwargs):
+    bump_version("index")
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.__dict__.get("group_id")
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    """Поколения ленты автора, записи и групп, где она была и стала."""
+    bump_version(f"author:{instance.author_id}")
+    bump_version(f"post:{instance.id}")
+    loaded_group_id = getattr(instance, "_loaded_group_id", None)
+    for group_id in {instance.group_id, loaded_group_id} - {None}:
+        bump_version(f"group:{group_id}")
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_feeds(sender, instance, **kwargs):
+    """Число комментариев видно в лентах автора и группы записи."""
+    bump_version(f"post:{instance.post_id}")
+    if Comment.post.is_cached(instance):
+        post = instance.post.author_id, instance.post.group_id
+    else:
+        post = Post.objects.filter(id=instance.post_id).values_list(
+            "author_id", "group_id"
+        ).first()
+    if post is None:
+        return
+    author_id, group_id = post
+    bump_version(f"author:{author_id}")
+    if group_id is not None:
+        bump_version(f"group:{group_id}")
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_following(sender, instance, **kwargs):
+    bump_version(f"following:{instance.user_id}")
+    bump_version(f"followers:{instance.author_id}")
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_groups(sender, **kwargs):
+    """Slug группы есть в каждой записи любой ленты."""
+    bump_version("groups")
@@ -0,0 +1,120 @@
+import re
+from functools import lru_cache
+
+# Алгоритм Snowball для русского языка:
+# https://snowballstem.org/algorithms/russian/stemmer.html
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (
+    ("в", "вши", "вшись"),
+    ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"),
+)
+ADJECTIVE = (
+    (),
+    ("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+     "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+     "ая", "яя", "ою", "ею"),
+)
+PARTICIPLE = (
+    ("ем", "нн", "вш", "ющ", "щ"),
+    ("ивш", "ывш", "ующ"),
+)
+REFLEXIVE = ((), ("ся", "сь"))
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет",
+     "ют", "ны", "ть", "ешь", "нно"),
+    ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй",
+     "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют",
+     "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"),
+)
+NOUN = (
+    (),
+    ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии",
+     "и", "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам",
+     "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия",
+     "ья", "я"),
+)
+SUPERLATIVE = ((), ("ейше", "ейш"))
+DERIVATIONAL = ((), ("ость", "ост"))
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    vowel = re.search(f"[{VOWELS}]", word)
+    rv = vowel.end() if vowel else len(word)
+    r1 = re.search(f"[{VOWELS}][^{VOWELS}]", word)
+    r1 = r1.end() if r1 else len(word)
+    r2 = re.search(f"[{VOWELS}][^{VOWELS}]", word[r1:])
+    r2 = r1 + r2.end() if r2 else len(word)
+    return rv, r2
+
+
+def _strip(word, start, endings):
+    """
+    Снимает самое длинное окончание из endings, целиком лежащее
+    в word[start:]. Окончания первой группы снимаются только после
+    «а» или «я». Возвращает None, если снять нечего.
+    """
+    after_a, anywhere, longest = _ENDINGS[endings]
+    region = word[start:]
+    for length in range(min(longest, len(region)), 0, -1):
+        ending = region[-length:]
+        if ending in anywhere:
+            return word[:-length]
+        if ending in after_a:
+            stem = word[:-length]
+            if len(stem) > start and stem[-1] in "ая":
+                return stem
+            return None
+    return None
+
+
+# Окончания группы хранятся множествами: проверяем суффиксы слова
+# от длинного к короткому вместо перебора всех окончаний.
+_ENDINGS = {
+    group: (
+        frozenset(group[0]),
+        frozenset(group[1]),
+        max(map(len, group[0] + group[1])),
+    )
+    for group in (PERFECTIVE_GERUND, ADJECTIVE, PARTICIPLE, REFLEXIVE,
+                  VERB, NOUN, SUPERLATIVE, DERIVATIONAL)
+}
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    rv, r2 = _regions(word)
+
+    # Шаг 1.
+    stemmed = _strip(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stemmed = _strip(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = _strip(stemmed, rv, PARTICIPLE) or stemmed
+        else:
+            stemmed = _strip(word, rv, VERB) or _strip(word, rv, NOUN)
+    word = stemmed or word
+
+    # Шаг 2.
+    if word.endswith("и") and len(word) > rv:
+        word = word[:-1]
+
+    # Шаг 3.
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    # Шаг 4.
+    if word.endswith("нн") and len(word) - 1 > rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith("нн") and len(word) - 1 > rv:
+            word = word[:-1]
+        return word
+    if word.endswith("ь") and len(word) > rv:
+        word = word[:-1]
+    return word
@@ -0,0 +1,41 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+# Место в шаблоне страницы, куда вставляются куски потока.
+STREAM_MARKER = mark_safe("<!-- stream -->")
+
+
+def render_chunks(template_name, name, queryset, chunk_size, context=None):
+    """
+    Рендерит queryset кусками по chunk_size объектов. Объекты читаются
+    через iterator(), поэтому в памяти держится только текущий кусок.
+    context добавляется к каждому куску.
+    """
+    template = get_template(template_name)
+    items = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield template.render({**(context or {}), name: chunk})
+
+
+def stream_page(request, template_name, context, chunks):
+    """
+    Потоковый ответ из шаблона страницы: всё до {{ stream }} уходит
+    первым куском, затем куски chunks, затем хвост страницы.
+    """
+    page = render_to_string(
+        template_name, {**context, "stream": STREAM_MARKER}, request
+    )
+    head, tail = page.split(STREAM_MARKER, 1)
+
+    def content():
+        yield head
+        yield from chunks
+        yield tail
+
+    return StreamingHttpResponse(content())
@@ -0,0 +1,56 @@
+from django.db import transaction
+
+from . import search, timeline
+from .models import Comment, Follow, Post
+from .queue import task
+
+
+@task("fan_out")
+def fan_out(post_id):
+    timeline.fan_out_many(list(Post.objects.filter(id=post_id)))
+
+
+@task("backfill_timeline")
+def backfill_timeline(follow_id):
+    """
+    Подписку могли отменить, пока задача ждала: тогда лента не трогается.
+    Проверка и вставка идут одной транзакцией, поэтому отписка либо
+    видна здесь, либо её задача drop_author выполнится позже.
+    """
+    with transaction.atomic(savepoint=False):
+        follow = Follow.objects.filter(id=follow_id).values_list(
+            "user_id", "author_id"
+        ).first()
+        if follow is not None:
+            timeline.backfill(*follow)
+
+
+@task("drop_author")
+def drop_author(user_id, author_id):
+    timeline.drop_author(user_id, author_id)
+
+
+@task("index_post")
+def index_post(post_id):
+    search.index_posts(Post, Post.objects.filter(id=post_id))
+
+
+@task("index_comment")
+def index_comment(post_id, comment_id):
+    """
+    Обновляет в документе записи один комментарий. Удалённый к этому
+    времени комментарий из документа убирается — если только запись
+    не удалена вместе с ним: её документ уберёт unindex_post.
+    """
+    text = Comment.objects.filter(id=comment_id).values_list(
+        "text", flat=True
+    ).first()
+    if text is None and not Post.objects.filter(id=post_id).exists():
+        return
+    if not search.get_backend().update_comment(post_id, comment_id, text):
+        index_post(post_id)
+
+
+@task("unindex_post")
+def unindex_post(post_id):
+    search.get_backend().remove([post_id])
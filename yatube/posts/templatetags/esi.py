@@ -0,0 +1,10 @@
+from django import template
+
+from ..fragments import include
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def esi(context, name, *args):
+    return include(context["request"], name, *args)
@@ -0,0 +1,154 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="ApiAuthor")
+        cls.other = User.objects.create_user(username="ApiOther")
+        cls.reader = User.objects.create_user(username="ApiReader")
+        cls.group = Group.objects.create(
+            title="Api", slug="api-group", description="Api"
+        )
+        cls.post = Post.objects.create(
+            text="Api post", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def etag(self, url):
+        # Первый запрос запоминает id из адреса, до этого ETag нет.
+        self.client.get(url)
+        return self.client.get(url)["ETag"]
+
+    def test_feed_payload(self):
+        response = self.client.get(reverse("api_v1:index"))
+        data = json.loads(response.content)
+
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertNotIn(b", ", response.content)
+        self.assertEqual(data["results"][0], {
+            "id": self.post.id,
+            "author": "ApiAuthor",
+            "group": "api-group",
+            "text": "Api post",
+            "pub_date": self.post.pub_date.isoformat(),
+            "image": None,
+            "comments": 0,
+        })
+        self.assertIsNone(data["next_cursor"])
+
+    def test_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(text=f"Bulk {number}", author=self.other)
+            for number in range(12)
+        )
+        url = reverse("api_v1:index")
+
+        first = json.loads(self.client.get(url).content)
+        second = json.loads(self.client.get(
+            url, {"cursor": first["next_cursor"]}
+        ).content)
+
+        self.assertEqual(len(first["results"]), 10)
+        self.assertEqual(len(second["results"]), 3)
+        self.assertFalse(
+            {post["id"] for post in first["results"]}
+            & {post["id"] for post in second["results"]}
+        )
+
+    def test_unchanged_feed_is_not_modified_without_queries(self):
+        """Клиент с актуальным ETag получает 304, база не трогается."""
+        for url in (
+            reverse("api_v1:index"),
+            reverse("api_v1:group_posts", kwargs={"slug": "api-group"}),
+            reverse("api_v1:profile", kwargs={"username": "ApiAuthor"}),
+            reverse("api_v1:comments", kwargs={"post_id": self.post.id}),
+        ):
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_feed_versions(self):
+        """Новая запись меняет ленты автора и группы, но не чужие."""
+        profile = reverse("api_v1:profile", kwargs={"username": "ApiAuthor"})
+        other = reverse("api_v1:profile", kwargs={"username": "ApiOther"})
+        group = reverse("api_v1:group_posts", kwargs={"slug": "api-group"})
+        before = [self.etag(url) for url in (profile, other, group)]
+
+        Post.objects.create(text="New", author=self.author, group=self.group)
+        after = [self.etag(url) for url in (profile, other, group)]
+
+        self.assertNotEqual(before[0], after[0])
+        self.assertEqual(before[1], after[1])
+        self.assertNotEqual(before[2], after[2])
+
+    def test_comment_and_group_move_change_etags(self):
+        comments = reverse("api_v1:comments", kwargs={"post_id": self.post.id})
+        group = reverse("api_v1:group_posts", kwargs={"slug": "api-group"})
+        before = self.etag(comments), self.etag(group)
+
+        Comment.objects.create(post=self.post, author=self.other, text="Hi")
+        after_comment = self.etag(comments), self.etag(group)
+        post = Post.objects.get(id=self.post.id)
+        post.group = None
+        post.save()
+
+        self.assertNotEqual(before[0], after_comment[0])
+        self.assertNotEqual(before[1], after_comment[1])
+        self.assertNotEqual(after_comment[1], self.etag(group))
+        self.assertEqual(
+            json.loads(self.client.get(comments).content)["results"][0][
+                "text"
+            ],
+            "Hi",
+        )
+
+    def test_follow_feed(self):
+        url = reverse("api_v1:follow_index")
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(self.reader)
+        empty = self.etag(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=empty)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post["id"] for post in json.loads(response.content)["results"]],
+            [self.post.id],
+        )
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_following(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.other)
+
+        response = self.client.get(reverse(
+            "api_v1:following", kwargs={"username": "ApiReader"}
+        ))
+
+        self.assertEqual(
+            [author["username"]
+             for author in json.loads(response.content)["results"]],
+            ["ApiAuthor", "ApiOther"],
+        )
+
+    def test_unknown_feed_is_not_found(self):
+        response = self.client.get(reverse(
+            "api_v1:group_posts", kwargs={"slug": "missing"}
+        ))
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,52 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from benchmarks import routes, runner
+from benchmarks.seed import seed
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchUrlsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_route_is_measured(self):
+        """Бенчмарк покрывает все адреса posts и about."""
+        sample = seed(
+            users=5, groups=2, posts=40, comments=20, follows=2, images=1
+        )
+        route_list = routes.routes(sample)
+
+        self.assertEqual(routes.missing(route_list), set())
+        results = runner.run(route_list, sample, rounds=1, warmup=0)
+        self.assertEqual(
+            set(results), {route.label for route in route_list}
+        )
+        self.assertGreater(results["post"]["queries"], 0)
+
+    def test_compare_reports_regressions(self):
+        baseline = {
+            "index": {"p95_ms": 10, "queries": 3, "alloc_kib": 100},
+            "post": {"p95_ms": 10, "queries": 5, "alloc_kib": 100},
+        }
+        results = {
+            "index": {"p95_ms": 12, "queries": 3, "alloc_kib": 110},
+            "post": {"p95_ms": 30, "queries": 6, "alloc_kib": 200},
+            "new route": {"p95_ms": 1, "queries": 1, "alloc_kib": 1},
+        }
+
+        regressions = runner.compare(results, baseline, tolerance=0.5)
+
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(line.startswith("post:") for line in regressions))
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from ..cards import render_cards
+from ..models import Group, Post, User
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="CardAuthor")
+        cls.reader = User.objects.create_user(username="CardReader")
+        cls.group = Group.objects.create(title="Card group", slug="cards")
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text="Card text",
+            author=self.author,
+            group=self.group,
+        )
+
+    def render(self, user=None):
+        posts = Post.objects.feed().filter(pk=self.post.pk)
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        return render_cards(posts, request)
+
+    def test_card_is_rendered_from_cache(self):
+        """Повторная сборка берёт карточку из кэша."""
+        self.render()
+        Post.objects.filter(pk=self.post.pk).update(text="Changed quietly")
+
+        self.assertIn("Card text", self.render())
+
+    def test_edit_invalidates_card(self):
+        """Изменение записи или новый комментарий обновляют карточку."""
+        self.render()
+        self.post.text = "Edited text"
+        self.post.save()
+
+        self.assertIn("Edited text", self.render())
+
+        self.post.comments.create(author=self.reader, text="Comment")
+
+        self.assertIn("Комментариев: 1", self.render())
+
+    def test_group_change_invalidates_card(self):
+        """Переименование группы обновляет карточки её записей."""
+        self.render()
+        self.group.title = "Renamed group"
+        self.group.save()
+
+        self.assertIn("Renamed group", self.render())
+
+    def test_edit_button_depends_on_viewer(self):
+        """Кнопку редактирования видит только автор."""
+        self.assertIn("Редактировать", self.render(self.author))
+        self.assertNotIn("Редактировать", self.render(self.reader))
+        self.assertNotIn("Редактировать", self.render())
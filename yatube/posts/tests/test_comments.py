@@ -0,0 +1,211 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+
+@override_settings(COMMENTS_PER_PAGE=3, COMMENTS_STREAM_CHUNK=2)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Commented")
+        cls.post = Post.objects.create(text="Viral post", author=cls.author)
+        for number in range(7):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"Comment {number}"
+            )
+        cls.kwargs = {"username": "Commented", "post_id": cls.post.id}
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_page_shows_latest_comments(self):
+        """На странице записи только последние COMMENTS_PER_PAGE
+        комментариев и ссылка на более старые."""
+        response = self.client.get(reverse("post", kwargs=self.kwargs))
+        comments = response.context["comments"]
+
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ["Comment 6", "Comment 5", "Comment 4"],
+        )
+        self.assertContains(
+            response, reverse("post_comments", kwargs=self.kwargs)
+        )
+
+        older = self.client.get(
+            reverse("post", kwargs=self.kwargs),
+            {"cursor": comments.next_cursor},
+        )
+        self.assertEqual(
+            [comment.text for comment in older.context["comments"]],
+            ["Comment 3", "Comment 2", "Comment 1"],
+        )
+
+    def test_all_comments_are_streamed_in_chunks(self):
+        response = self.client.get(
+            reverse("post_comments", kwargs=self.kwargs)
+        )
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        content = "".join(chunks)
+
+        self.assertTrue(response.streaming)
+        # Начало страницы, четыре куска по два комментария и хвост.
+        self.assertEqual(len(chunks), 6)
+        # Ветки, как и на странице записи, идут от новых к старым.
+        positions = [content.index(f"Comment {n}</p>") for n in range(7)]
+        self.assertEqual(positions, sorted(positions, reverse=True))
+        self.assertTrue(content.rstrip().endswith("</html>"))
+
+    def test_first_chunk_is_sent_before_reading_comments(self):
+        """Время до первого байта не зависит от числа комментариев:
+        их читают, только когда клиент дочитал начало страницы."""
+        response = self.client.get(
+            reverse("post_comments", kwargs=self.kwargs)
+        )
+        content = iter(response.streaming_content)
+
+        with self.assertNumQueries(0):
+            head = next(content).decode()
+        with self.assertNumQueries(1):
+            rest = list(content)
+
+        self.assertIn("Viral post", head)
+        self.assertNotIn("Comment 0", head)
+        self.assertEqual(len(rest), 5)
+
+    def test_unknown_post_returns_404(self):
+        response = self.client.get(reverse("post_comments", kwargs={
+            "username": "Commented", "post_id": self.post.id + 1
+        }))
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(COMMENTS_PER_PAGE=4, COMMENT_MAX_DEPTH=2)
+class CommentThreadsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Threaded")
+        cls.post = Post.objects.create(text="Thread post", author=cls.author)
+        cls.kwargs = {"username": "Threaded", "post_id": cls.post.id}
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.author, text=text, parent=parent
+        )
+
+    def page(self, **params):
+        response = self.client.get(reverse("post", kwargs=self.kwargs), params)
+        return response.context["comments"]
+
+    def test_replies_follow_their_thread(self):
+        """Новые ветки первыми, ответы под своими комментариями."""
+        first = self.comment("first")
+        second = self.comment("second")
+        reply = self.comment("reply", parent=first)
+        self.comment("nested", parent=reply)
+        self.comment("reply 2", parent=first)
+
+        self.assertEqual(
+            [(c.text, c.depth) for c in self.page()],
+            [("second", 0), ("first", 0), ("reply", 1), ("nested", 2)],
+        )
+        self.assertEqual(second.depth, 0)
+
+    def test_page_is_one_indexed_query(self):
+        root = self.comment("root")
+        for number in range(6):
+            self.comment(f"reply {number}", parent=root)
+        page = Comment.objects.threads().filter(post=self.post)[:4]
+
+        with CaptureQueriesContext(connection) as captured:
+            comments = list(page)
+            authors = [comment.author.username for comment in comments]
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + captured[0]["sql"])
+            plan = " ".join(str(row) for row in cursor.fetchall())
+
+        self.assertEqual(len(captured), 1)
+        self.assertEqual(authors, ["Threaded"] * 4)
+        self.assertIn("comment_post_path", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_cursor_pages_split_long_threads(self):
+        """Страница ограничена COMMENTS_PER_PAGE даже внутри одной
+        большой ветки."""
+        root = self.comment("root")
+        for number in range(6):
+            self.comment(f"reply {number}", parent=root)
+        first = self.page()
+        second = self.page(cursor=first.next_cursor)
+        back = self.page(cursor=second.previous_cursor)
+
+        self.assertEqual(
+            [c.text for c in first], ["root", "reply 0", "reply 1", "reply 2"]
+        )
+        self.assertEqual(
+            [c.text for c in second], ["reply 3", "reply 4", "reply 5"]
+        )
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual([c.text for c in back], [c.text for c in first])
+
+    def test_depth_is_capped(self):
+        """Ответ глубже COMMENT_MAX_DEPTH встаёт рядом с комментарием,
+        на который отвечали."""
+        root = self.comment("root")
+        child = self.comment("child", parent=root)
+        grandchild = self.comment("grandchild", parent=child)
+        too_deep = self.comment("too deep", parent=grandchild)
+
+        self.assertEqual(grandchild.depth, 2)
+        self.assertEqual(too_deep.depth, 2)
+        self.assertEqual(too_deep.parent_id, child.id)
+        self.assertEqual(
+            Comment.objects.get(id=too_deep.id).path.split("/")[:2],
+            grandchild.path.split("/")[:2],
+        )
+
+    def test_reply_through_form(self):
+        root = self.comment("root")
+        url = reverse("add_comment", kwargs=self.kwargs)
+        other = Post.objects.create(text="Other", author=self.author)
+        foreign = Comment.objects.create(
+            post=other, author=self.author, text="foreign"
+        )
+
+        self.client.post(url, {"text": "answer", "parent": root.id})
+        self.client.post(url, {"text": "stray", "parent": foreign.id})
+        self.client.post(url, {"text": "broken", "parent": "x"})
+
+        self.assertEqual(Comment.objects.get(text="answer").parent, root)
+        self.assertIsNone(Comment.objects.get(text="stray").parent_id)
+        self.assertIsNone(Comment.objects.get(text="broken").parent_id)
+        response = self.client.get(
+            reverse("post", kwargs=self.kwargs), {"reply": root.id}
+        )
+        self.assertContains(
+            response, f'name="parent" value="{root.id}"'
+        )
+
+    def test_bulk_created_comments_become_threads(self):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f"bulk {n}")
+            for n in range(3)
+        )
+        Comment.objects.fill_root_paths()
+
+        self.assertEqual(
+            [c.text for c in self.page()], ["bulk 2", "bulk 1", "bulk 0"]
+        )
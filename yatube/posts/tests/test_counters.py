@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, User, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="CounterAuthor")
+        cls.reader = User.objects.create_user(username="CounterReader")
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_views_keep_counters(self):
+        """Публикация, комментарий и подписка обновляют счётчики."""
+        self.author_client.post(reverse("new_post"), {"text": "Counted"})
+        post = Post.objects.get(text="Counted")
+        self.reader_client.post(
+            reverse("add_comment", kwargs={
+                "username": self.author.username,
+                "post_id": post.id,
+            }),
+            {"text": "Counted comment"}
+        )
+        self.reader_client.get(
+            reverse("profile_follow", kwargs={"username": "CounterAuthor"})
+        )
+
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        self.reader_client.get(
+            reverse("profile_unfollow", kwargs={"username": "CounterAuthor"})
+        )
+
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_profile_shows_counters(self):
+        """Профиль показывает значения счётчиков."""
+        Post.objects.create(text="First", author=self.author)
+        Post.objects.create(text="Second", author=self.author)
+
+        response = self.reader_client.get(
+            reverse("profile", kwargs={"username": "CounterAuthor"})
+        )
+
+        self.assertContains(response, "Записей: 2")
+        self.assertContains(response, "Подписчиков: 0")
+
+    def test_rebuild_counters_command(self):
+        """Команда rebuild_counters восстанавливает счётчики."""
+        post = Post.objects.create(text="Rebuilt", author=self.author)
+        post.comments.create(author=self.reader, text="Rebuilt comment")
+        UserStats.objects.update(posts_count=0)
+        Post.objects.update(comment_count=0)
+
+        call_command("rebuild_counters", stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(post.comment_count, 1)
@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import popular
+from ..models import Follow, Group, Post, User
+
+
+class SharedPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="FragmentAuthor")
+        cls.reader = User.objects.create_user(username="FragmentReader")
+        cls.group = Group.objects.create(title="Fragments", slug="fragments")
+        cls.post = Post.objects.create(
+            text="Shared body", author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        popular.update_all()
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.clients = {}
+        for user in (self.author, self.reader):
+            self.clients[user.username] = Client()
+            self.clients[user.username].force_login(user)
+        self.urls = [
+            reverse("index"),
+            reverse("group_posts", kwargs={"slug": "fragments"}),
+            reverse("profile", kwargs={"username": "FragmentAuthor"}),
+            reverse("popular"),
+        ]
+
+    def rendered_pages(self, response):
+        return {
+            template.name for template in response.templates
+            if template.name.startswith(("index", "posts/"))
+        }
+
+    def test_body_is_shared_by_all_viewers(self):
+        """Тело, собранное для анонима, отдаётся вошедшим без рендеринга
+        страницы, с их меню и кнопками."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                # Первый запрос запоминает id из адреса.
+                self.guest.get(url)
+                self.guest.get(url)
+
+                author = self.clients["FragmentAuthor"].get(url)
+                reader = self.clients["FragmentReader"].get(url)
+
+                for response in (author, reader):
+                    self.assertEqual(self.rendered_pages(response), set())
+                    self.assertNotContains(response, "<!-- esi:")
+                self.assertContains(author, "Пользователь: FragmentAuthor")
+                self.assertContains(reader, "Пользователь: FragmentReader")
+                self.assertContains(author, "Редактировать")
+                self.assertNotContains(reader, "Редактировать")
+
+    def test_follow_button_follows_viewer(self):
+        url = self.urls[2]
+        self.guest.get(url)
+        self.guest.get(url)
+
+        self.assertContains(self.guest.get(url), "Подписаться")
+        self.assertContains(
+            self.clients["FragmentReader"].get(url), "Отписаться"
+        )
+
+    def test_follow_feed_is_cached_per_user(self):
+        client = self.clients["FragmentReader"]
+        url = reverse("follow_index")
+        # Первый запрос запоминает подписки, второй кладёт тело в кэш.
+        client.get(url)
+        client.get(url)
+
+        response = client.get(url)
+        other = self.clients["FragmentAuthor"].get(url)
+
+        self.assertEqual(self.rendered_pages(response), set())
+        self.assertContains(response, "Shared body")
+        self.assertNotContains(other, "Shared body")
+
+    def test_pages_with_forms_are_not_deferred(self):
+        """На странице записи есть CSRF-токен, её тело не общее."""
+        client = self.clients["FragmentReader"]
+        url = reverse("post", kwargs={
+            "username": "FragmentAuthor", "post_id": self.post.id
+        })
+        client.get(url)
+
+        response = client.get(url)
+
+        self.assertIn("posts/post.html", self.rendered_pages(response))
+        self.assertContains(response, "csrfmiddlewaretoken")
@@ -0,0 +1,134 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, GroupStats, Post, User
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="GroupAuthor")
+        cls.other = User.objects.create_user(username="GroupOther")
+
+    def setUp(self):
+        self.cats = Group.objects.create(title="Cats", slug="cats")
+        self.dogs = Group.objects.create(title="Dogs", slug="dogs")
+
+    def stats(self, group):
+        stats = GroupStats.objects.get(group=group)
+        return stats.posts_count, stats.authors_count, stats.last_post_date
+
+    def post(self, author, group, days_ago=0):
+        post = Post.objects.create(text="Grouped", author=author, group=group)
+        if days_ago:
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=post.pub_date - dt.timedelta(days=days_ago)
+            )
+            post.refresh_from_db()
+        return post
+
+    def test_create_edit_and_delete_keep_stats(self):
+        old = self.post(self.author, self.cats, days_ago=2)
+        second = self.post(self.author, self.cats, days_ago=1)
+        latest = self.post(self.other, self.cats)
+        self.assertEqual(self.stats(self.cats), (3, 2, latest.pub_date))
+        self.assertEqual(self.stats(self.dogs), (0, 0, None))
+
+        latest.group = self.dogs
+        latest.save()
+        self.assertEqual(self.stats(self.cats), (2, 1, second.pub_date))
+        self.assertEqual(self.stats(self.dogs), (1, 1, latest.pub_date))
+
+        second.delete()
+        self.assertEqual(self.stats(self.cats), (1, 1, old.pub_date))
+        old.group = None
+        old.save()
+        self.assertEqual(self.stats(self.cats), (0, 0, None))
+
+    def test_rebuild_counters_restores_group_stats(self):
+        post = self.post(self.author, self.cats)
+        GroupStats.objects.all().delete()
+
+        call_command("rebuild_counters", stdout=StringIO())
+
+        self.assertEqual(self.stats(self.cats), (1, 1, post.pub_date))
+        self.assertEqual(self.stats(self.dogs), (0, 0, None))
+
+
+@override_settings(GROUPS_PER_PAGE=3)
+class GroupListTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="ListAuthor")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def create_groups(self, start, count):
+        for number in range(start, start + count):
+            group = Group.objects.create(
+                title=f"Group {number:03d}", slug=f"group-{number:03d}"
+            )
+            Post.objects.create(text="Post", author=self.author, group=group)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_directory_pages_by_cursor(self):
+        self.create_groups(0, 7)
+        url = reverse("group_list")
+
+        first = self.client.get(url)
+        self.assertEqual(
+            [group.slug for group in first.context["page"]],
+            ["group-000", "group-001", "group-002"],
+        )
+        self.assertContains(first, "<td>1</td>", count=6)
+        second = self.client.get(
+            url, {"cursor": first.context["page"].next_cursor}
+        )
+        self.assertEqual(
+            [group.slug for group in second.context["page"]],
+            ["group-003", "group-004", "group-005"],
+        )
+
+    def test_query_count_does_not_depend_on_groups(self):
+        self.create_groups(0, 4)
+        url = reverse("group_list")
+        next_url = (
+            f"{url}?cursor={self.client.get(url).context['page'].next_cursor}"
+        )
+        expected = [self.count_queries(url), self.count_queries(next_url)]
+
+        self.create_groups(4, 30)
+
+        self.assertEqual(
+            [self.count_queries(url), self.count_queries(next_url)], expected
+        )
+        self.assertEqual(expected, [1, 1])
+
+    def test_directory_is_cached_until_stats_change(self):
+        self.create_groups(0, 1)
+        url = reverse("group_list")
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        Post.objects.create(
+            text="New", author=self.author, group=Group.objects.get()
+        )
+        self.assertContains(self.client.get(url), "<td>2</td>")
@@ -0,0 +1,120 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..page_cache import has_version
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="EtagAuthor")
+        cls.reader = User.objects.create_user(username="EtagReader")
+        cls.group = Group.objects.create(title="Etag", slug="etag")
+        cls.post = Post.objects.create(
+            text="Etag post", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.urls = {
+            "index": reverse("index"),
+            "group": reverse("group_posts", kwargs={"slug": "etag"}),
+            "profile": reverse(
+                "profile", kwargs={"username": "EtagAuthor"}
+            ),
+            "post": reverse("post", kwargs={
+                "username": "EtagAuthor", "post_id": self.post.id
+            }),
+            "search": reverse("search") + "?q=etag",
+        }
+
+    def etag(self, url, client=None):
+        client = client or self.client
+        # Первый запрос запоминает id из адреса, до этого ETag нет.
+        client.get(url)
+        return client.get(url)["ETag"]
+
+    def test_revalidation_does_not_hit_database(self):
+        """Аноним с актуальным ETag получает 304 до любых запросов
+        к базе и рендеринга."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                etag = self.etag(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_anonymous_pages_are_shareable(self):
+        response = self.client.get(self.urls["index"])
+
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("s-maxage=10", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_authorized_pages_are_private(self):
+        """Страницы вошедшего не кэшируются общими кэшами, а ETag
+        у разных пользователей не совпадает."""
+        self.client.force_login(self.reader)
+        other = Client()
+        other.force_login(self.author)
+
+        response = self.client.get(self.urls["post"])
+
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotEqual(
+            self.etag(self.urls["post"]),
+            self.etag(self.urls["post"], other),
+        )
+
+    def test_changes_invalidate_etag(self):
+        before = {name: self.etag(url) for name, url in self.urls.items()}
+
+        Comment.objects.create(post=self.post, author=self.reader, text="Hi")
+        Follow.objects.create(user=self.reader, author=self.author)
+        after = {name: self.etag(url) for name, url in self.urls.items()}
+
+        for name in self.urls:
+            with self.subTest(page=name):
+                self.assertNotEqual(before[name], after[name])
+
+    def test_other_author_does_not_change_profile(self):
+        url = self.urls["profile"]
+        etag = self.etag(url)
+
+        Post.objects.create(text="Other", author=self.reader)
+
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_follow_feed_revalidation(self):
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse("follow_index")
+        etag = self.etag(url)
+
+        unchanged = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        Post.objects.create(text="Fresh", author=self.author)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(changed.status_code, 200)
+
+    def test_unknown_post_leaves_no_version_key(self):
+        """Выдуманный id в адресе не заводит счётчик поколения."""
+        self.etag(self.urls["profile"])
+        missing = self.post.id + 1000
+
+        self.client.get(reverse("post", kwargs={
+            "username": "EtagAuthor", "post_id": missing
+        }))
+        self.client.get(reverse("api_v1:comments", kwargs={
+            "post_id": missing
+        }))
+
+        self.assertFalse(has_version(f"post:{missing}"))
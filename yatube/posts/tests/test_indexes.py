@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+FEED_TABLES = ('FROM "posts_post"', 'FROM "posts_timelineentry"',
+               'FROM "posts_comment"')
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="IndexAuthor")
+        cls.reader = User.objects.create_user(username="IndexReader")
+        cls.group = Group.objects.create(title="Index group", slug="index")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f"Indexed post {i}",
+                author=cls.author,
+                group=cls.group,
+            )
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.reader,
+                text=f"Indexed comment {i}"
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def query_plans(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if "ORDER BY" not in query["sql"]:
+                    continue
+                if not any(table in query["sql"] for table in FEED_TABLES):
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plans.append(" ".join(row[-1] for row in cursor.fetchall()))
+        return response, plans
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают индекс и не сортируют во временном B-дереве."""
+        urls = [
+            reverse("index"),
+            reverse("group_posts", kwargs={"slug": "index"}),
+            reverse("profile", kwargs={"username": "IndexAuthor"}),
+            reverse("follow_index"),
+            reverse("post", kwargs={
+                "username": "IndexAuthor",
+                "post_id": self.post.id,
+            }),
+        ]
+
+        for url in urls:
+            response, plans = self.query_plans(url)
+            page = response.context.get("page")
+            if page is not None and page.next_cursor:
+                plans += self.query_plans(
+                    f"{url}?cursor={page.next_cursor}"
+                )[1]
+            with self.subTest(url=url):
+                self.assertTrue(plans)
+                for plan in plans:
+                    self.assertIn("INDEX", plan)
+                    self.assertNotIn("TEMP B-TREE", plan)
@@ -0,0 +1,177 @@
+from io import StringIO
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import notifications
+from ..models import Comment, Follow, Notification, Post, User
+
+
+class NotificationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="Noticed", email="noticed@example.com"
+        )
+        cls.reader = User.objects.create_user(
+            username="Noticing", email="noticing@example.com"
+        )
+        cls.post = Post.objects.create(text="Noticed post", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def comment(self, author, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=author, text="Hi", parent=parent
+        )
+
+    def test_comment_and_reply_notify_authors(self):
+        """Автор записи узнаёт о комментарии, автор комментария —
+        об ответе. О своих действиях уведомлений нет."""
+        own = self.comment(self.author)
+        self.comment(self.reader, parent=own)
+        reply = self.comment(self.author)
+        self.comment(self.author, parent=self.comment(self.reader))
+        self.comment(self.reader, parent=reply)
+
+        self.assertEqual(
+            list(Notification.objects.order_by("id").values_list(
+                "recipient__username", "actor__username", "kind"
+            )),
+            [
+                ("Noticed", "Noticing", Notification.REPLY),
+                ("Noticed", "Noticing", Notification.COMMENT),
+                ("Noticing", "Noticed", Notification.REPLY),
+                ("Noticed", "Noticing", Notification.REPLY),
+            ],
+        )
+
+    def test_follow_notifies_author(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.kind, Notification.FOLLOW)
+
+    def test_badge_counter_is_cached(self):
+        """Новые уведомления увеличивают счётчик в кэше, база для
+        значка нужна только при пустом кэше."""
+        self.comment(self.reader)
+        with self.assertNumQueries(1):
+            self.assertEqual(notifications.unread_count(self.author.pk), 1)
+
+        self.comment(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.author.pk), 3)
+
+    def test_notifications_page_marks_read_on_post(self):
+        """Просмотр страницы уведомления не трогает, кнопка отмечает
+        прочитанными показанные, но не пришедшие позже."""
+        self.comment(self.reader)
+        self.comment(self.reader)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, 'badge-danger">2</span>')
+
+        response = self.client.get(reverse("notifications"))
+        self.assertContains(response, "Noticed post")
+        self.assertContains(response, "border-primary", count=2)
+        self.assertFalse(
+            Notification.objects.filter(is_read=True).exists()
+        )
+        up_to = response.context["newest"]
+
+        self.comment(self.reader)
+        response = self.client.post(
+            reverse("notifications"), {"up_to": up_to}
+        )
+        self.assertRedirects(response, reverse("notifications"))
+
+        self.assertEqual(
+            Notification.objects.filter(is_read=False).count(), 1
+        )
+        response = self.client.get(reverse("notifications"))
+        self.assertContains(response, "border-primary", count=1)
+        self.assertContains(response, 'badge-danger">1</span>')
+
+    def test_badge_refreshes_cached_pages(self):
+        """Новое уведомление сбрасывает копию ленты и ETag вошедшего."""
+        url = reverse("index")
+        self.client.get(url)
+        etag = self.client.get(url)["ETag"]
+
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'badge-danger">1</span>')
+
+
+class DigestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create_user(
+                username=f"Digest{number}",
+                email=f"digest{number}@example.com",
+            )
+            for number in range(3)
+        ]
+        cls.silent = User.objects.create_user(username="NoEmail")
+        cls.fan = User.objects.create_user(username="Fan")
+        cls.posts = [
+            Post.objects.create(text=f"Digest post {author}", author=author)
+            for author in [*cls.authors, cls.silent]
+        ]
+
+    def test_one_message_per_user_in_batches(self):
+        for post in self.posts:
+            notifications.notify(
+                [post.author_id], self.fan.pk, Notification.COMMENT, post.id
+            )
+        Notification.objects.bulk_create(
+            Notification(
+                recipient=self.authors[0],
+                actor=self.fan,
+                kind=Notification.COMMENT,
+                post=self.posts[0],
+            )
+            for _ in range(1000)
+        )
+        Follow.objects.create(user=self.fan, author=self.authors[0])
+
+        # Последний id, по пять запросов на каждую из двух пачек
+        # и пустая выборка получателей в конце.
+        with self.assertNumQueries(1 + 2 * 5 + 1):
+            sent, events = notifications.send_digests(batch_size=2)
+
+        self.assertEqual((sent, events), (3, 1004))
+        self.assertEqual(len(mail.outbox), 3)
+        first = mail.outbox[0]
+        self.assertEqual(first.to, ["digest0@example.com"])
+        self.assertIn("1002", first.subject)
+        self.assertIn("комментариев к записи «Digest post Digest0»: 1001",
+                      first.body)
+        self.assertIn("новых подписчиков: 1", first.body)
+        self.assertFalse(Notification.objects.filter(emailed=False).exists())
+
+        self.assertEqual(notifications.send_digests(), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_send_digests_command(self):
+        Follow.objects.create(user=self.fan, author=self.authors[1])
+
+        output = StringIO()
+        call_command("send_digests", stdout=output)
+
+        self.assertIn("Отправлено писем: 1, событий: 1", output.getvalue())
+        self.assertEqual(mail.outbox[0].to, ["digest1@example.com"])
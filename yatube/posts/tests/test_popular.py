@@ -0,0 +1,129 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import popular
+from ..models import Comment, Follow, Post, PostScore, ScoreCursor, User
+from ..page_cache import bump_version
+
+
+class PopularTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="PopularAuthor")
+        cls.reader = User.objects.create_user(username="PopularReader")
+        cls.quiet, cls.loud, cls.faded = [
+            Post.objects.create(text=text, author=cls.author)
+            for text in ("Quiet", "Loud", "Faded")
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def comment(self, post, count=1, age=None):
+        for _ in range(count):
+            comment = Comment.objects.create(
+                post=post, author=self.reader, text="+1"
+            )
+            if age is not None:
+                Comment.objects.filter(id=comment.id).update(
+                    created=timezone.now() - age
+                )
+
+    def test_recent_activity_outranks_old(self):
+        """Десяток комментариев трёхдневной давности весят меньше
+        двух сегодняшних."""
+        self.comment(self.faded, 10, age=dt.timedelta(days=3))
+        self.comment(self.loud, 2)
+
+        popular.update_all()
+
+        self.assertEqual(
+            popular.post_ids(), [self.loud.id, self.faded.id, self.quiet.id]
+        )
+        scores = dict(PostScore.objects.values_list("post_id", "score"))
+        self.assertAlmostEqual(
+            scores[self.faded.id], scores[self.quiet.id], places=1
+        )
+
+    def test_incremental_update_matches_full_rebuild(self):
+        """Новые события добавляются к сохранённому рейтингу, старые
+        второй раз не учитываются."""
+        self.comment(self.loud, 3)
+        self.assertEqual(popular.update_all(), 6)
+        self.comment(self.loud, 2)
+        self.assertEqual(popular.update_all(), 2)
+        incremental = PostScore.objects.get(post=self.loud).score
+
+        PostScore.objects.all().delete()
+        ScoreCursor.objects.all().delete()
+        popular.update_all()
+
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=self.loud).score, incremental
+        )
+        self.assertEqual(popular.update_all(), 0)
+
+    @override_settings(POPULAR={
+        "HALF_LIFE": 6 * 60 * 60,
+        "WEIGHTS": {"post": 1, "comment": 1, "follow": 3},
+        "BATCH": 2,
+        "SIZE": 2,
+    })
+    def test_batches_and_list_size(self):
+        self.comment(self.faded, 3)
+
+        self.assertEqual(popular.update(), 4)
+        self.assertEqual(popular.update_all(), 2)
+        self.assertEqual(popular.post_ids(), [self.faded.id, self.loud.id])
+
+    def test_follow_lifts_latest_post(self):
+        self.comment(self.quiet)
+        popular.update_all()
+        self.assertEqual(popular.post_ids()[0], self.quiet.id)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        popular.update_all()
+
+        self.assertEqual(popular.post_ids()[0], self.faded.id)
+
+    def test_page_is_served_from_precomputed_list(self):
+        self.comment(self.quiet, 2)
+        call_command("update_popular", stdout=StringIO())
+        url = reverse("popular")
+        self.client.get(url)
+
+        # Копия страницы устарела, но список id и карточки в кэше:
+        # остаётся одна выборка записей.
+        bump_version("index")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(
+            [post.text for post in response.context["page"]],
+            ["Quiet", "Faded", "Loud"],
+        )
+
+    def test_cursor_survives_refresh(self):
+        """Курсор продолжает с граничной записи, даже если список
+        успели пересчитать."""
+        popular.update_all()
+        with self.settings(POSTS_PER_PAGE=1):
+            first = self.client.get(reverse("popular")).context["page"]
+            self.assertEqual(first[0].text, "Faded")
+
+            self.comment(self.loud, 3)
+            popular.update_all()
+            second = self.client.get(
+                reverse("popular"), {"cursor": first.next_cursor}
+            ).context["page"]
+
+        self.assertEqual(second[0].text, "Quiet")
+        self.assertEqual(second.number, 2)
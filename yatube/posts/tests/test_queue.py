@@ -0,0 +1,171 @@
+import datetime as dt
+import threading
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import queue, search
+from ..models import Follow, Post, Task, TimelineEntry, User
+
+QUEUED = {**settings.TASKS, "EAGER": False, "MAX_ATTEMPTS": 2}
+
+
+def work():
+    return queue.work(threading.Event(), burst=True)
+
+
+@override_settings(TASKS=QUEUED)
+class TaskQueueTest(TransactionTestCase):
+    # Задачи попадают в очередь после фиксации транзакции, а TestCase
+    # её не фиксирует.
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="QueuedAuthor")
+        self.reader = User.objects.create_user(username="QueuedReader")
+        self.calls = []
+        queue.HANDLERS["test_flaky"] = self.flaky
+
+    def tearDown(self):
+        del queue.HANDLERS["test_flaky"]
+        # Таблицу поискового индекса очистка базы между тестами не трогает.
+        search.get_backend().clear()
+
+    def flaky(self, fail):
+        self.calls.append(fail)
+        if fail:
+            raise RuntimeError("temporary failure")
+
+    def test_new_post_returns_before_side_effects(self):
+        """Запрос только сохраняет запись и ставит задачи, ленты
+        и поиск обновляют воркеры."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        work()
+        client = Client()
+        client.force_login(self.author)
+
+        client.post(reverse("new_post"), {"text": "Queued walrus"})
+        post = Post.objects.get(text="Queued walrus")
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(search.get_backend().count("walrus"), 0)
+        self.assertEqual(
+            set(Task.objects.filter(status=Task.PENDING).values_list(
+                "name", flat=True
+            )),
+            {"fan_out", "index_post"},
+        )
+
+        self.assertEqual(work(), (2, 0))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(search.get_backend().count("walrus"), 1)
+
+    def test_follow_page_is_refreshed_after_worker(self):
+        """Лента, закэшированная до работы воркера, после неё
+        собирается заново."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        work()
+        cache.clear()
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse("follow_index")
+        # Первый запрос запоминает подписки, второй кладёт ленту в кэш.
+        client.get(url)
+        Post.objects.create(text="Late walrus", author=self.author)
+        self.assertNotContains(client.get(url), "Late walrus")
+
+        work()
+
+        self.assertContains(client.get(url), "Late walrus")
+
+    def test_idempotency_key(self):
+        queue.enqueue("test_flaky", key="once", fail=False)
+        queue.enqueue("test_flaky", key="once", fail=False)
+        work()
+        queue.enqueue("test_flaky", key="once", fail=False)
+        work()
+
+        self.assertEqual(Task.objects.filter(key="once").count(), 1)
+        self.assertEqual(self.calls, [False])
+
+    def test_failed_task_is_retried_with_backoff(self):
+        queue.enqueue("test_flaky", fail=True)
+        started = timezone.now()
+
+        self.assertEqual(work(), (0, 1))
+        task = Task.objects.get()
+        delay = (task.run_at - started).total_seconds()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreaterEqual(delay, settings.TASKS["BACKOFF"])
+        self.assertLessEqual(delay, settings.TASKS["BACKOFF"] * 1.25 + 1)
+        self.assertIn("temporary failure", task.error)
+        # До срока повтора задачу никто не берёт.
+        self.assertEqual(work(), (0, 0))
+
+        Task.objects.update(run_at=started)
+        work()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Задачу воркера, упавшего без отчёта, забирает другой."""
+        queue.enqueue("test_flaky", fail=False)
+        queue.claim(10)
+        self.assertEqual(queue.claim(10), [])
+
+        Task.objects.update(run_at=timezone.now() - dt.timedelta(seconds=1))
+        work()
+
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.DONE)
+        self.assertEqual(task.attempts, 2)
+
+    def test_unfollow_before_backfill_leaves_no_entries(self):
+        Post.objects.create(text="Old post", author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+
+        work()
+
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_done_tasks_are_purged(self):
+        queue.enqueue("test_flaky", key="old", fail=False)
+        work()
+        Task.objects.update(run_at=timezone.now() - dt.timedelta(
+            seconds=settings.TASKS["RETENTION"] + 1
+        ))
+
+        self.assertEqual(queue.purge(), 1)
+
+    def test_run_workers_command(self):
+        queue.enqueue("test_flaky", fail=False)
+
+        output = StringIO()
+        call_command("run_workers", workers=1, burst=True, stdout=output)
+
+        self.assertIn("Выполнено 1, ошибок 0", output.getvalue())
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_rolled_back_write_leaves_no_task(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                queue.enqueue("test_flaky", fail=False)
+                self.assertFalse(Task.objects.exists())
+                raise RuntimeError("rollback")
+
+        self.assertFalse(Task.objects.exists())
+
+    def test_unknown_task(self):
+        with self.assertRaises(LookupError):
+            queue.enqueue("missing")
@@ -0,0 +1,202 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search, tasks
+from ..models import Comment, Post, User
+from ..stemmer import stem
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Разные формы слова приводятся к одной основе."""
+        for forms in (
+            ("кот", "коты", "котов", "котами"),
+            ("красивый", "красивые", "красивого"),
+            ("читали", "читает", "читать"),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(form) for form in forms}), 1)
+
+    def test_snowball_examples(self):
+        for word, expected in (
+            ("программирование", "программирован"),
+            ("важнейшие", "важн"),
+            ("вложенных", "вложен"),
+            ("ёлки", "елк"),
+        ):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="SearchAuthor")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def search(self, query, **params):
+        return self.client.get(reverse("search"), {"q": query, **params})
+
+    def found(self, response):
+        return [post.text for post in response.context["page"]]
+
+    def test_finds_other_word_forms(self):
+        Post.objects.create(
+            text="Рыжие коты спят на крыше", author=self.author
+        )
+        Post.objects.create(text="Про собак", author=self.author)
+
+        response = self.search("рыжий кот")
+
+        self.assertEqual(self.found(response), ["Рыжие коты спят на крыше"])
+
+    def test_views_keep_index_in_sync(self):
+        """Новая запись, правка и комментарий сразу попадают в индекс."""
+        self.client.post(reverse("new_post"), {"text": "Первая версия"})
+        post = Post.objects.get(text="Первая версия")
+        self.assertEqual(self.found(self.search("первая")), [post.text])
+
+        self.client.post(
+            reverse("post_edit", kwargs={
+                "username": self.author.username,
+                "post_id": post.id,
+            }),
+            {"text": "Исправленный текст"}
+        )
+        self.assertEqual(self.found(self.search("первая")), [])
+        self.assertEqual(
+            self.found(self.search("исправленные")), ["Исправленный текст"]
+        )
+
+        self.client.post(
+            reverse("add_comment", kwargs={
+                "username": self.author.username,
+                "post_id": post.id,
+            }),
+            {"text": "Отличная заметка"}
+        )
+        self.assertEqual(
+            self.found(self.search("заметки")), ["Исправленный текст"]
+        )
+
+        post.delete()
+        self.assertEqual(self.found(self.search("заметки")), [])
+
+    def test_post_text_ranks_above_comments(self):
+        in_comment = Post.objects.create(
+            text="Обычный день", author=self.author
+        )
+        in_comment.comments.create(text="Вокзал", author=self.author)
+        Post.objects.create(text="Вокзал ночью", author=self.author)
+
+        response = self.search("вокзал")
+
+        self.assertEqual(
+            self.found(response), ["Вокзал ночью", "Обычный день"]
+        )
+
+    def test_query_syntax_is_escaped(self):
+        Post.objects.create(text="Ничего особенного", author=self.author)
+
+        response = self.search('") OR NEAR(* "')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.found(response), [])
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_cursor_pagination(self):
+        for number in range(5):
+            Post.objects.create(
+                text=f"Поход номер {number}", author=self.author
+            )
+
+        first = self.search("поход")
+        second = self.search("поход", cursor=first.context["page"].next_cursor)
+        third = self.search(
+            "поход", cursor=second.context["page"].next_cursor
+        )
+        back = self.search(
+            "поход", cursor=second.context["page"].previous_cursor
+        )
+
+        pages = [self.found(page) for page in (first, second, third)]
+        self.assertEqual(sum(len(texts) for texts in pages), 5)
+        self.assertEqual(len(set(sum(pages, []))), 5)
+        self.assertIsNone(third.context["page"].next_cursor)
+        self.assertEqual(self.found(back), pages[0])
+        self.assertContains(first, "q=%D0%BF%D0%BE%D1%85%D0%BE%D0%B4&amp;")
+
+
+class CommentIndexTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="IndexAuthor")
+
+    def setUp(self):
+        self.post = Post.objects.create(text="Заметка", author=self.author)
+        self.backend = search.get_backend()
+
+    def indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT text, comments, comment_ids FROM posts_search "
+                "WHERE rowid = %s",
+                [self.post.id]
+            )
+            return cursor.fetchone()
+
+    def test_comment_changes_patch_document(self):
+        """Комментарий меняет свою строку документа, не перечитывая
+        остальные, и документ совпадает с собранным заново."""
+        comments = [
+            self.post.comments.create(text=f"Мост {i}", author=self.author)
+            for i in range(20)
+        ]
+        with self.assertNumQueries(3):
+            tasks.index_comment(self.post.id, comments[0].id)
+
+        Comment.objects.filter(id=comments[1].id).update(text="Паром")
+        tasks.index_comment(self.post.id, comments[1].id)
+        comments[2].delete()
+        patched = self.indexed()
+        search.index_posts(Post, [self.post])
+
+        self.assertEqual(patched, self.indexed())
+        self.assertEqual(self.backend.count("паром"), 1)
+
+    def test_document_without_comment_ids_is_rebuilt(self):
+        """Документ, записанный до разбивки по комментариям,
+        собирается заново."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE posts_search SET comments = '', comment_ids = NULL"
+            )
+
+        self.post.comments.create(text="Паром", author=self.author)
+
+        comment = self.post.comments.get()
+        self.assertEqual(
+            self.indexed()[1:], (search.tokenize("Паром")[0], str(comment.id))
+        )
+
+    def test_post_delete_skips_comment_patches(self):
+        for i in range(3):
+            self.post.comments.create(text="Мост", author=self.author)
+
+        with CaptureQueriesContext(connection) as context:
+            self.post.delete()
+
+        self.assertFalse(any(
+            query["sql"].startswith("UPDATE posts_search")
+            for query in context
+        ))
+        self.assertEqual(self.backend.count("мост"), 0)
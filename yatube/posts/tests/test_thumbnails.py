@@ -0,0 +1,224 @@
+import datetime as dt
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Свой каталог: ThumbnailQueueTest удаляет общий, уходя.
+RETRY_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def uploaded_image(name="thumb.png"):
+    file_obj = BytesIO()
+    Image.new("RGB", (40, 20), color=(255, 0, 0)).save(file_obj, "png")
+    return SimpleUploadedFile(name, file_obj.getvalue(), "image/png")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="ThumbAuthor")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_new_post_shows_placeholder_until_processed(self):
+        """Миниатюра строится обработчиком очереди, до этого
+        в ленте показывается заглушка."""
+        self.client.post(
+            reverse("new_post"),
+            {"text": "With image", "image": uploaded_image()}
+        )
+        post = Post.objects.get(text="With image")
+
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAIL_PENDING)
+        self.assertNotContains(self.client.get(reverse("index")), "<img")
+
+        call_command(
+            "process_thumbnails", workers=1, once=True, stdout=StringIO()
+        )
+        post.refresh_from_db()
+
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAIL_READY)
+        self.assertContains(self.client.get(reverse("index")), "<img")
+
+    def test_variants_manifest_and_picture(self):
+        """Для картинки строятся несколько ширин и WebP,
+        шаблон выводит <picture> с srcset."""
+        image = BytesIO()
+        Image.new("RGB", (1200, 800), color=(0, 128, 0)).save(image, "png")
+        post = Post.objects.create(
+            text="Big image",
+            author=self.author,
+            image=SimpleUploadedFile("big.png", image.getvalue()),
+        )
+
+        call_command(
+            "process_thumbnails", workers=1, once=True, stdout=StringIO()
+        )
+        post.refresh_from_db()
+        variants = json.loads(post.image_manifest)["variants"]
+
+        self.assertEqual(
+            [width for _, width in variants["image/jpeg"]],
+            [320, 640, 960]
+        )
+        self.assertIn("image/webp", variants)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "<picture>")
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, "640w")
+
+    def test_picture_does_not_depend_on_manifest_order(self):
+        """Запасной srcset берётся из JPEG, <source> идут
+        от AVIF к WebP, в каком бы порядке ни лежали в манифесте."""
+        post = Post(
+            thumbnail_status=Post.THUMBNAIL_READY,
+            image_manifest=json.dumps({
+                "width": 320,
+                "height": 180,
+                "variants": {
+                    "image/jpeg": [["v/a.jpg", 320]],
+                    "image/webp": [["v/a.webp", 320]],
+                    "image/avif": [["v/a.avif", 320]],
+                },
+            }),
+        )
+
+        variants = post.image_variants
+
+        self.assertEqual(
+            [source["type"] for source in variants["sources"]],
+            ["image/avif", "image/webp"]
+        )
+        self.assertTrue(variants["srcset"].endswith("v/a.jpg 320w"))
+        self.assertTrue(variants["src"].endswith("v/a.jpg"))
+
+    def test_edit_requeues_only_changed_image(self):
+        """Правка текста не трогает миниатюру, новая картинка
+        снова ставится в очередь."""
+        post = Post.objects.create(
+            text="Image post",
+            author=self.author,
+            image=uploaded_image(),
+        )
+        Post.objects.filter(pk=post.pk).update(
+            thumbnail_status=Post.THUMBNAIL_READY
+        )
+        url = reverse("post_edit", kwargs={
+            "username": self.author.username,
+            "post_id": post.id,
+        })
+
+        self.client.post(url, {"text": "Edited text"})
+        post.refresh_from_db()
+
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAIL_READY)
+
+        self.client.post(
+            url, {"text": "Edited text", "image": uploaded_image("new.png")}
+        )
+        post.refresh_from_db()
+
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAIL_PENDING)
+
+
+@override_settings(
+    MEDIA_ROOT=RETRY_MEDIA_ROOT,
+    TASKS={**settings.TASKS, "MAX_ATTEMPTS": 2},
+)
+class ThumbnailRetryTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="RetryAuthor")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(RETRY_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            text="Retry", author=self.author, image=uploaded_image()
+        )
+
+    def make_due(self):
+        Post.objects.filter(id=self.post.id).update(
+            thumbnail_run_at=timezone.now() - dt.timedelta(seconds=1)
+        )
+
+    def test_expired_lease_is_reclaimed(self):
+        """Запись обработчика, упавшего без отчёта, забирает другой."""
+        self.assertEqual(thumbnails.claim(10), [self.post.id])
+        self.assertEqual(thumbnails.claim(10), [])
+
+        self.make_due()
+
+        self.assertEqual(thumbnails.claim(10), [self.post.id])
+        self.assertEqual(
+            thumbnails.generate(self.post.id),
+            (self.post.id, Post.THUMBNAIL_READY),
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_attempts, 2)
+
+    def test_failure_is_retried_then_failed(self):
+        """Ошибка, например пропавший файл, повторяется с паузой,
+        пока не кончатся попытки."""
+        Post.objects.filter(id=self.post.id).update(
+            image="posts/missing.png"
+        )
+        started = timezone.now()
+        thumbnails.claim(10)
+
+        self.assertEqual(
+            thumbnails.generate(self.post.id),
+            (self.post.id, Post.THUMBNAIL_PENDING),
+        )
+        self.post.refresh_from_db()
+        self.assertGreaterEqual(
+            (self.post.thumbnail_run_at - started).total_seconds(),
+            settings.TASKS["BACKOFF"],
+        )
+        self.assertEqual(thumbnails.claim(10), [])
+
+        self.make_due()
+        thumbnails.claim(10)
+
+        self.assertEqual(
+            thumbnails.generate(self.post.id),
+            (self.post.id, Post.THUMBNAIL_FAILED),
+        )
+
+    def test_lost_last_attempt_fails(self):
+        """Аренда последней попытки истекла — запись больше не ждёт."""
+        thumbnails.claim(10)
+        Post.objects.filter(id=self.post.id).update(thumbnail_attempts=2)
+        self.make_due()
+
+        self.assertEqual(thumbnails.claim(10), [])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail_status, Post.THUMBNAIL_FAILED)
@@ -0,0 +1,88 @@
+from django.test import TestCase, override_settings
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import follow_paginator, rebuild, trim
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="TimelineAuthor")
+        cls.reader = User.objects.create_user(username="TimelineReader")
+
+    def timeline_posts(self):
+        return list(TimelineEntry.objects.filter(
+            user=self.reader
+        ).values_list("post__text", flat=True))
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новая запись попадает в ленту подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text="Fan out", author=self.author)
+
+        self.assertEqual(self.timeline_posts(), ["Fan out"])
+
+    def test_follow_backfills_and_unfollow_cleans_timeline(self):
+        """Подписка заполняет ленту старыми записями, отписка очищает."""
+        Post.objects.create(text="Old post", author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertEqual(self.timeline_posts(), ["Old post"])
+
+        follow.delete()
+
+        self.assertEqual(self.timeline_posts(), [])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_trimmed(self):
+        """В ленте хранится не больше TIMELINE_LENGTH записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(3):
+            Post.objects.create(text=f"Post {i}", author=self.author)
+
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertNotIn("Post 0", self.timeline_posts())
+
+    def test_trim_is_one_query_for_all_followers(self):
+        readers = [
+            User.objects.create_user(username=f"TrimReader{i}")
+            for i in range(3)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        for i in range(2):
+            Post.objects.create(text=f"Trim {i}", author=self.author)
+
+        with self.settings(TIMELINE_LENGTH=1), self.assertNumQueries(1):
+            trim([reader.id for reader in readers])
+
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list("user_id", "post__text")),
+            {(reader.id, "Trim 1") for reader in readers},
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_prolific_author_is_read_on_demand(self):
+        """Записи авторов без раскладки подмешиваются при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text="Celebrity post", author=self.author)
+
+        self.assertEqual(self.timeline_posts(), [])
+        page = follow_paginator(self.reader, 10).get_page()
+
+        self.assertEqual([post.text for post in page], ["Celebrity post"])
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_rebuild_matches_incremental_timeline(self):
+        """rebuild собирает те же ленты, что и раскладка при записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(3):
+            Post.objects.create(text=f"Post {i}", author=self.author)
+        incremental = sorted(self.timeline_posts())
+
+        rebuild()
+
+        self.assertEqual(sorted(self.timeline_posts()), incremental)
@@ -0,0 +1,138 @@
+import datetime as dt
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import search
+from ..models import Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+    b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+    b"\x02\x4c\x01\x00\x3b"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="TransferAuthor")
+        cls.reader = User.objects.create_user(username="TransferReader")
+        cls.group = Group.objects.create(
+            title="Transfer", slug="transfer", description="Transfer"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.old = Post.objects.create(
+            text="Старые коты", author=self.author, group=self.group,
+            image=SimpleUploadedFile("transfer.gif", SMALL_GIF, "image/gif"),
+        )
+        Post.objects.filter(id=self.old.id).update(
+            pub_date="2019-01-01 10:00:00"
+        )
+        self.old.refresh_from_db()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def round_trip(self, fmt):
+        path = os.path.join(self.directory, f"posts.{fmt}")
+        media = os.path.join(self.directory, "media")
+        call_command("export_posts", path, media=media)
+        Post.objects.all().delete()
+        call_command(
+            "import_posts", path, media=media, batch=1, stdout=StringIO()
+        )
+        return Post.objects.get()
+
+    def assert_imported(self, post):
+        self.assertEqual(post.text, self.old.text)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date, self.old.pub_date)
+        self.assertEqual(post.thumbnail_status, Post.THUMBNAIL_PENDING)
+        with post.image.open() as image:
+            self.assertTrue(image.read())
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(
+            [pk for _, pk in search.get_backend().search("кот", 10)],
+            [post.id],
+        )
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка и загрузка сохраняют запись, дату и картинку,
+        а счётчики, ленты и поиск строятся заново."""
+        self.assert_imported(self.round_trip("jsonl"))
+
+    def test_csv_round_trip(self):
+        self.assert_imported(self.round_trip("csv"))
+
+    def test_unknown_author_is_created(self):
+        path = os.path.join(self.directory, "posts.jsonl")
+        with open(path, "w", encoding="utf-8") as records:
+            records.write(
+                '{"author": "Newcomer", "group": "", "text": "Привет"}\n'
+            )
+
+        call_command("import_posts", path, stdout=StringIO())
+
+        newcomer = User.objects.get(username="Newcomer")
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(newcomer.stats.posts_count, 1)
+
+    def test_import_updates_group_stats(self):
+        """Импорт прибавляет группам записи и новых авторов, а для
+        созданных групп заводит сводку."""
+        # Дату старой записи setUp поменял мимо сигналов.
+        call_command("rebuild_counters", stdout=StringIO())
+        path = os.path.join(self.directory, "posts.jsonl")
+        with open(path, "w", encoding="utf-8") as records:
+            for author, group, pub_date in (
+                ("TransferAuthor", "transfer", "2018-01-01T10:00:00"),
+                ("Newcomer", "transfer", "2020-01-01T10:00:00"),
+                ("Newcomer", "imported", "2020-02-01T10:00:00"),
+                ("TransferAuthor", "imported", "2020-03-01T10:00:00"),
+            ):
+                records.write(json.dumps({
+                    "author": author, "group": group,
+                    "text": "Импорт", "pub_date": pub_date,
+                }) + "\n")
+
+        call_command("import_posts", path, batch=2, stdout=StringIO())
+
+        self.group.stats.refresh_from_db()
+        imported = Group.objects.get(slug="imported").stats
+        self.assertEqual(
+            (self.group.stats.posts_count, self.group.stats.authors_count),
+            (3, 2),
+        )
+        self.assertEqual(
+            self.group.stats.last_post_date, dt.datetime(2020, 1, 1, 10)
+        )
+        self.assertEqual(
+            (imported.posts_count, imported.authors_count), (2, 2)
+        )
+        self.assertEqual(imported.last_post_date, dt.datetime(2020, 3, 1, 10))
@@ -6,6 +6,8 @@ from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from users.checks import check_reserved_usernames
+
 from ..models import Group, Post
 
 User = get_user_model()
@@ -130,3 +132,30 @@ class PostURLTests(TestCase):
         response = self.guest_client.get("dead_link/")
 
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_signup_rejects_route_names(self):
+        """Имя пользователя не может совпасть с адресом сайта:
+        его профиль был бы недоступен."""
+        for username in ("group", "Search", "internal", "notifications"):
+            with self.subTest(username=username):
+                response = self.guest_client.post(reverse("signup"), {
+                    "username": username,
+                    "password1": "Sturdy-pass-42",
+                    "password2": "Sturdy-pass-42",
+                })
+
+                self.assertFormError(
+                    response, "form", "username",
+                    "Это имя занято адресом сайта, выберите другое.",
+                )
+        self.assertFalse(User.objects.filter(username="group").exists())
+
+    def test_check_reports_shadowed_profiles(self):
+        """Уже заведённые пользователи с такими именами видны
+        в manage.py check --tag database."""
+        User.objects.create_user(username="Popular")
+
+        warnings = check_reserved_usernames(None)
+
+        self.assertEqual([warning.id for warning in warnings], ["users.W001"])
+        self.assertIn("Popular", warnings[0].msg)
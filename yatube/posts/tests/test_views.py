@@ -8,10 +8,13 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..models import Comment, Follow, Group, Post, User
+from ..paginator import CursorPaginator
 
 User = get_user_model()
 
@@ -188,7 +191,8 @@ class PostPagesTests(TestCase):
                 )
 
     def test_cached_index_page(self):
-        """Главная страница попадает в кэш"""
+        """Главная страница попадает в кэш и обновляется
+        при изменении записей."""
         cached_post = Post.objects.create(
             text="Cached post text",
             pub_date=datetime.datetime.today(),
@@ -196,16 +200,34 @@ class PostPagesTests(TestCase):
         )
 
         response_before_del = self.guest_client.get(reverse("index"))
+        response_cached = self.guest_client.get(reverse("index"))
         cached_post.delete()
         response_after_del = self.guest_client.get(reverse("index"))
-        cache.clear()
-        response_after_clear = self.guest_client.get(reverse("index"))
 
-        self.assertEqual(response_before_del.content,
-                         response_after_del.content)
-        self.assertNotEqual(response_after_del.content,
-                            response_after_clear.content)
-        self.assertEqual(response_after_del.context, None)
+        self.assertEqual(response_before_del.content, response_cached.content)
+        # Из кэша: шаблон страницы не рендерился, только фрагменты.
+        self.assertNotIn(
+            "index.html",
+            [template.name for template in response_cached.templates],
+        )
+        self.assertNotEqual(response_before_del.content,
+                            response_after_del.content)
+        self.assertNotContains(response_after_del, "Cached post text")
+
+    def test_stale_index_page_is_served_during_rebuild(self):
+        """Пока страницу пересобирает другой запрос,
+        отдаётся устаревшая копия."""
+        response_before = self.guest_client.get(reverse("index"))
+        Post.objects.create(text="Fresh post text", author=self.user)
+        key = f"page:index:all:{reverse('index')}"
+        cache.add(f"{key}:lock", True)
+
+        response_stale = self.guest_client.get(reverse("index"))
+        cache.delete(f"{key}:lock")
+        response_fresh = self.guest_client.get(reverse("index"))
+
+        self.assertEqual(response_before.content, response_stale.content)
+        self.assertContains(response_fresh, "Fresh post text")
 
     def test_authorized_user_can_follow(self):
         """Авторизованный пользователь может подписываться
@@ -330,3 +352,101 @@ class PaginatorViewsTest(TestCase):
         response = self.guest_client.get(reverse("index") + "?page=2")
 
         self.assertEqual(len(response.context.get("page").object_list), 3)
+
+    def test_cursor_pages(self):
+        """Курсор следующей страницы ведёт на оставшиеся записи,
+        курсор предыдущей — обратно на первую страницу."""
+        cache.clear()
+        first_page = self.guest_client.get(reverse("index")).context["page"]
+        response = self.guest_client.get(
+            reverse("index") + f"?cursor={first_page.next_cursor}"
+        )
+        second_page = response.context["page"]
+
+        self.assertEqual(len(second_page.object_list), 3)
+        self.assertEqual(second_page.number, 2)
+        self.assertIsNone(second_page.next_cursor)
+
+        response = self.guest_client.get(
+            reverse("index") + f"?cursor={second_page.previous_cursor}"
+        )
+
+        self.assertEqual(
+            list(response.context["page"].object_list),
+            list(first_page.object_list)
+        )
+        self.assertIsNone(response.context["page"].previous_cursor)
+
+    def test_page_navigation_does_not_count_posts(self):
+        """Соседние страницы известны из выборки, COUNT(*) не нужен."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first_page = paginator.get_page(1)
+        second_page = paginator.get_page(cursor=first_page.next_cursor)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(first_page.has_next())
+            self.assertFalse(first_page.has_previous())
+            self.assertEqual(first_page.next_page_number(), 2)
+            self.assertFalse(second_page.has_next())
+            self.assertEqual(second_page.previous_page_number(), 1)
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse("group_posts", kwargs={"slug": "test_group"})
+            + "?cursor=broken"
+        )
+
+        self.assertEqual(response.context["page"].number, 1)
+        self.assertEqual(len(response.context["page"].object_list), 10)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="FeedAuthor")
+        cls.reader = User.objects.create_user(username="FeedReader")
+        cls.group = Group.objects.create(title="Feed group", slug="feed")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f"Feed post {i}",
+                author=self.author,
+                group=self.group,
+            )
+            Comment.objects.create(
+                post=post,
+                author=self.reader,
+                text="Feed comment"
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_feed_query_count_does_not_depend_on_posts(self):
+        """Число запросов ленты постоянно и не зависит
+        от количества записей."""
+        # В каждом числе — подсчёт непрочитанных уведомлений для меню:
+        # кэш перед запросом очищен.
+        expected_queries = {
+            reverse("index"): 4,
+            reverse("group_posts", kwargs={"slug": "feed"}): 5,
+            reverse("profile", kwargs={"username": "FeedAuthor"}): 6,
+            reverse("follow_index"): 5,
+        }
+
+        for posts_count in (1, 9):
+            self.create_posts(posts_count)
+            for url, expected in expected_queries.items():
+                with self.subTest(url=url, posts_count=posts_count):
+                    self.assertEqual(self.count_queries(url), expected)
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Post
+from .queue import backoff
+
+logger = logging.getLogger(__name__)
+
+# Карточка записи показывает картинку с пропорциями 960x339.
+WIDTHS = (320, 640, 960)
+RATIO = 339 / 960
+
+# Форматы от самого компактного к запасному JPEG, который понимают все.
+FORMATS = (
+    ("AVIF", "image/avif", "avif", {"quality": 50}),
+    ("WEBP", "image/webp", "webp", {"quality": 75, "method": 4}),
+    ("JPEG", "image/jpeg", "jpg", {"quality": 80, "progressive": True}),
+)
+
+
+def available_formats():
+    extensions = Image.registered_extensions()
+    return [
+        image_format for image_format in FORMATS
+        if extensions.get(f".{image_format[2]}") == image_format[0]
+    ]
+
+
+def claim(limit):
+    """
+    Забирает из очереди до limit записей, которым пора строиться,
+    и выдаёт обработчику аренду на TASKS["LEASE"] секунд — как
+    posts.queue.claim. Строка переводится в processing отдельным
+    UPDATE по прочитанному сроку, поэтому параллельные обработчики
+    не возьмут одну запись дважды. Записи обработчика, который упал,
+    снова попадают в выдачу, когда аренда истекает; после
+    TASKS["MAX_ATTEMPTS"] попыток они остаются в состоянии failed.
+    """
+    now = timezone.now()
+    queued = Post.objects.filter(
+        thumbnail_status__in=(
+            Post.THUMBNAIL_PENDING, Post.THUMBNAIL_PROCESSING
+        ),
+        thumbnail_run_at__lte=now,
+    )
+    queued.filter(
+        thumbnail_status=Post.THUMBNAIL_PROCESSING,
+        thumbnail_attempts__gte=settings.TASKS["MAX_ATTEMPTS"],
+    ).update(thumbnail_status=Post.THUMBNAIL_FAILED)
+    due = queued.order_by("thumbnail_run_at").values_list(
+        "id", "thumbnail_run_at"
+    )[:limit]
+    return [
+        post_id for post_id, run_at in list(due)
+        if queued.filter(id=post_id, thumbnail_run_at=run_at).update(
+            thumbnail_status=Post.THUMBNAIL_PROCESSING,
+            thumbnail_run_at=now + timedelta(
+                seconds=settings.TASKS["LEASE"]
+            ),
+            thumbnail_attempts=F("thumbnail_attempts") + 1,
+        )
+    ]
+
+
+def crop_to_ratio(image):
+    width, height = image.size
+    if height / width > RATIO:
+        new_height = round(width * RATIO)
+        top = (height - new_height) // 2
+        return image.crop((0, top, width, top + new_height))
+    new_width = round(height / RATIO)
+    left = (width - new_width) // 2
+    return image.crop((left, 0, left + new_width, height))
+
+
+def build_variants(post):
+    """
+    Декодирует картинку один раз и сохраняет её в нескольких ширинах
+    и форматах. Ширины больше исходной не строятся, кроме самой малой.
+    """
+    with post.image.open("rb") as image_file:
+        image = Image.open(image_file)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    image = crop_to_ratio(image)
+    widths = [width for width in WIDTHS if width <= image.width]
+    widths = widths or WIDTHS[:1]
+
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    variants = {mime: [] for _, mime, _, _ in available_formats()}
+    for width in widths:
+        resized = image.resize(
+            (width, round(width * RATIO)), Image.LANCZOS
+        )
+        for image_format, mime, extension, options in available_formats():
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            name = default_storage.save(
+                f"variants/{post.pk}/{stem}-{width}.{extension}",
+                ContentFile(buffer.getvalue()),
+            )
+            variants[mime].append([name, width])
+    return {
+        "width": widths[-1],
+        "height": round(widths[-1] * RATIO),
+        "variants": variants,
+    }
+
+
+def delete_variants(manifest):
+    for entries in manifest.get("variants", {}).values():
+        for name, _ in entries:
+            default_storage.delete(name)
+
+
+def generate(post_id):
+    """
+    Строит варианты картинки записи. Выполняется в процессе пула.
+    При ошибке запись возвращается в очередь с паузой по
+    posts.queue.backoff, а после TASKS["MAX_ATTEMPTS"] попыток
+    остаётся в состоянии failed.
+    """
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        return post_id, None
+    old_manifest = json.loads(post.image_manifest or "{}")
+    status = Post.THUMBNAIL_READY
+    run_at = timezone.now()
+    manifest = ""
+    try:
+        manifest = json.dumps(build_variants(post))
+    except Exception:
+        logger.exception("Не удалось построить миниатюру записи %s", post_id)
+        status = Post.THUMBNAIL_FAILED
+        if post.thumbnail_attempts < settings.TASKS["MAX_ATTEMPTS"]:
+            status = Post.THUMBNAIL_PENDING
+            run_at += timedelta(seconds=backoff(post.thumbnail_attempts))
+    # Число попыток — номер аренды: если она истекла и запись взял
+    # другой обработчик, этот результат не запишется.
+    updated = Post.objects.filter(
+        id=post_id,
+        thumbnail_status=Post.THUMBNAIL_PROCESSING,
+        thumbnail_attempts=post.thumbnail_attempts,
+    ).update(
+        thumbnail_status=status,
+        thumbnail_run_at=run_at,
+        image_manifest=manifest,
+        updated=timezone.now()
+    )
+    if updated:
+        delete_variants(old_manifest)
+    elif manifest:
+        # Картинку успели сменить или запись забрал другой обработчик.
+        delete_variants(json.loads(manifest))
+    return post_id, status
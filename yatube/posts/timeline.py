@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .page_cache import (bump_existing_versions, following_version,
+                         remember_following_ids)
+from .paginator import CursorPaginator
+
+# Пользователей в одном DELETE trim: SQLite принимает не больше
+# 999 параметров.
+TRIM_CHUNK_SIZE = 500
+
+
+def is_prolific(author_id):
+    """
+    Авторов с огромной аудиторией не раскладываем по лентам подписчиков:
+    их записи подмешиваются в ленту при чтении.
+    """
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(post):
+    """Добавляет новую запись в ленты всех подписчиков автора."""
+    fan_out_many([post])
+
+
+def fan_out_many(posts):
+    """Раскладывает пачку записей по лентам подписчиков их авторов."""
+    author_ids = {post.author_id for post in posts}
+    author_ids -= set(UserStats.objects.filter(
+        user_id__in=author_ids,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list("user_id", flat=True))
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=author_ids
+    ).values_list("user_id", "author_id"):
+        followers.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for post in posts
+            for user_id in followers.get(post.author_id, ())
+        ),
+        ignore_conflicts=True,
+    )
+    user_ids = {user_id for ids in followers.values() for user_id in ids}
+    trim(user_ids)
+    bump_timelines(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними записями автора после подписки."""
+    if is_prolific(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        "-pub_date", "-id"
+    ).values_list("id", "pub_date")[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ),
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+    bump_timelines([user_id])
+
+
+def drop_author(user_id, author_id):
+    """Убирает из ленты записи автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+    bump_timelines([user_id])
+
+
+def bump_timelines(user_ids):
+    """
+    Сбрасывает копии лент после записи в TimelineEntry. Поколение,
+    поднятое при сохранении, здесь не поможет: с очередью задач лента
+    успевает попасть в кэш раньше, чем воркер разложит записи.
+    """
+    bump_existing_versions(f"following:{user_id}" for user_id in user_ids)
+
+
+def trim(user_ids):
+    """
+    Оставляет в лентах не больше TIMELINE_LENGTH последних записей:
+    один DELETE на пачку пользователей, позиции считает ROW_NUMBER,
+    как в rebuild.
+    """
+    user_ids = list(user_ids)
+    table = TimelineEntry._meta.db_table
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), TRIM_CHUNK_SIZE):
+            chunk = user_ids[start:start + TRIM_CHUNK_SIZE]
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id IN ("
+                "SELECT id FROM ("
+                "SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id "
+                "ORDER BY pub_date DESC, post_id DESC) AS position "
+                f"FROM {table} "
+                f"WHERE user_id IN ({', '.join(['%s'] * len(chunk))})"
+                ") WHERE position > %s)",
+                [*chunk, settings.TIMELINE_LENGTH],
+            )
+
+
+def rebuild():
+    """
+    Собирает все ленты заново одним INSERT ... SELECT: для каждого
+    подписчика берутся TIMELINE_LENGTH последних записей его авторов.
+    """
+    TimelineEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {TimelineEntry._meta.db_table} "
+            "(user_id, post_id, pub_date) "
+            "SELECT user_id, post_id, pub_date FROM ("
+            "SELECT follow.user_id, post.id AS post_id, post.pub_date, "
+            "ROW_NUMBER() OVER (PARTITION BY follow.user_id "
+            "ORDER BY post.pub_date DESC, post.id DESC) AS position "
+            f"FROM {Follow._meta.db_table} follow "
+            f"JOIN {Post._meta.db_table} post "
+            "ON post.author_id = follow.author_id "
+            f"JOIN {UserStats._meta.db_table} stats "
+            "ON stats.user_id = follow.author_id "
+            "WHERE stats.followers_count <= %s"
+            ") WHERE position <= %s",
+            [settings.TIMELINE_FANOUT_LIMIT, settings.TIMELINE_LENGTH],
+        )
+
+
+def follow_paginator(user, per_page):
+    """
+    Лента подписок листается прямо по TimelineEntry пользователя:
+    один диапазонный проход по индексу (user, pub_date, post).
+    Если среди подписок есть авторы без раскладки, их записи
+    подмешиваются запросом к Post.
+    """
+    version = following_version(user.pk)
+    follows = list(Follow.objects.filter(user=user).values_list(
+        "author_id", "author__stats__followers_count"
+    ))
+    # Тот же запрос даёт подписки для ETag ленты.
+    remember_following_ids(
+        user.pk, version, [author_id for author_id, _ in follows]
+    )
+    prolific = [
+        author_id for author_id, followers in follows
+        if (followers or 0) > settings.TIMELINE_FANOUT_LIMIT
+    ]
+    if prolific:
+        timeline = TimelineEntry.objects.filter(user=user).values("post_id")
+        return CursorPaginator(
+            Post.objects.feed().filter(
+                Q(id__in=timeline) | Q(author_id__in=prolific)
+            ),
+            per_page,
+        )
+    return CursorPaginator(
+        TimelineEntry.objects.filter(user=user).select_related(
+            "post__author", "post__group"
+        ),
+        per_page,
+        id_field="post_id",
+        transform=lambda entries: [entry.post for entry in entries],
+    )
@@ -0,0 +1,294 @@
+import csv
+import json
+import logging
+import os
+import shutil
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import reset_queries, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import search, timeline
+from .counters import later_post_date
+from .models import Group, GroupStats, Post, User, UserStats
+from .page_cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("id", "author", "group", "text", "pub_date", "image")
+FORMATS = ("jsonl", "csv")
+BATCH_SIZE = 1000
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "csv" if path.endswith(".csv") else "jsonl"
+
+
+def read_records(stream, fmt):
+    """Записи из JSONL или CSV по одной строке: память не растёт."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_records(stream, fmt, records):
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+        return
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_records(batch_size=BATCH_SIZE, media_dir=None):
+    """
+    Записи по возрастанию id. Таблица читается пачками по ключу,
+    а картинки копируются в media_dir, если он указан.
+    """
+    posts = Post.objects.order_by("id").values_list(
+        "id", "author__username", "group__slug", "text", "pub_date", "image"
+    )
+    last_id = 0
+    while True:
+        rows = list(posts.filter(id__gt=last_id)[:batch_size])
+        if not rows:
+            return
+        for post_id, author, group, text, pub_date, image in rows:
+            if image and media_dir:
+                copy_image(image, media_dir)
+            yield {
+                "id": post_id,
+                "author": author,
+                "group": group or "",
+                "text": text,
+                "pub_date": pub_date.isoformat(),
+                "image": image or "",
+            }
+        last_id = rows[-1][0]
+        reset_queries()
+
+
+def copy_image(name, media_dir):
+    target = os.path.join(media_dir, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        with default_storage.open(name) as source, \
+                open(target, "wb") as destination:
+            shutil.copyfileobj(source, destination)
+    except OSError:
+        logger.warning("Картинка %s не найдена, пропускаем", name)
+
+
+def import_image(name, media_dir):
+    if not name or not media_dir:
+        return None
+    path = os.path.join(media_dir, name)
+    try:
+        with open(path, "rb") as image_file:
+            return default_storage.save(
+                f"posts/{os.path.basename(name)}", File(image_file)
+            )
+    except OSError:
+        logger.warning("Картинка %s не найдена, пропускаем", path)
+        return None
+
+
+def resolve_users(usernames):
+    """id авторов по именам; недостающие создаются без пароля."""
+    users = dict(User.objects.filter(
+        username__in=usernames
+    ).values_list("username", "id"))
+    missing = set(usernames) - set(users)
+    if missing:
+        User.objects.bulk_create(
+            (User(username=name, password=make_password(None))
+             for name in missing),
+            ignore_conflicts=True,
+        )
+        users.update(User.objects.filter(
+            username__in=missing
+        ).values_list("username", "id"))
+    return users
+
+
+def resolve_groups(slugs):
+    """id групп по slug; недостающие создаются с заголовком-slug."""
+    groups = dict(Group.objects.filter(
+        slug__in=slugs
+    ).values_list("slug", "id"))
+    missing = set(slugs) - set(groups)
+    if missing:
+        Group.objects.bulk_create(
+            (Group(slug=slug, title=slug) for slug in missing),
+            ignore_conflicts=True,
+        )
+        groups.update(Group.objects.filter(
+            slug__in=missing
+        ).values_list("slug", "id"))
+        bump_version("groups")
+    return groups
+
+
+def parse_pub_date(value):
+    pub_date = parse_datetime(value or "")
+    if pub_date is None:
+        return timezone.now()
+    if settings.USE_TZ and timezone.is_naive(pub_date):
+        return timezone.make_aware(pub_date)
+    if not settings.USE_TZ and timezone.is_aware(pub_date):
+        return timezone.make_naive(pub_date)
+    return pub_date
+
+
+@contextmanager
+def keep_pub_date():
+    """
+    auto_now_add перезаписывает pub_date при вставке, а импорт должен
+    сохранить исходную дату. Поле общее на процесс, поэтому менеджер
+    используется только в командах импорта.
+    """
+    field = Post._meta.get_field("pub_date")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def assign_ids(posts):
+    """
+    SQLite не возвращает id из bulk_create. Транзакция держит блокировку
+    записи с первой вставки, поэтому последние len(posts) строк — наши,
+    по порядку вставки.
+    """
+    if not posts or posts[0].pk is not None:
+        return
+    ids = Post.objects.order_by("-id").values_list(
+        "id", flat=True
+    )[:len(posts)]
+    for post, post_id in zip(posts, reversed(list(ids))):
+        post.pk = post_id
+
+
+def add_posts_counts(counts):
+    """
+    Прибавляет авторам число загруженных записей. Авторов с одинаковым
+    приростом обновляем одним запросом, а не по запросу на автора.
+    """
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in counts),
+        ignore_conflicts=True,
+    )
+    authors = defaultdict(list)
+    for user_id, count in counts.items():
+        authors[count].append(user_id)
+    for count, user_ids in authors.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            posts_count=F("posts_count") + count
+        )
+
+
+def add_group_counts(posts):
+    """
+    Прибавляет группам загруженные записи, новых авторов и дату
+    последней записи — как counters.add_group_post, но одним запросом
+    на группу. Записи пачки уже вставлены, и их id больше прежних:
+    авторы, у которых в группе есть записи с меньшим id, не новые.
+    Строки сводок для групп, созданных resolve_groups, создаются здесь.
+    """
+    by_group = defaultdict(list)
+    for post in posts:
+        if post.group_id:
+            by_group[post.group_id].append(post)
+    if not by_group:
+        return
+    GroupStats.objects.bulk_create(
+        (GroupStats(group_id=group_id) for group_id in by_group),
+        ignore_conflicts=True,
+    )
+    known = set(Post.objects.filter(
+        group_id__in=by_group,
+        author_id__in={post.author_id for post in posts},
+        id__lt=min(post.pk for post in posts),
+    ).order_by().values_list("group_id", "author_id").distinct())
+    for group_id, group_posts in by_group.items():
+        new_authors = {
+            post.author_id for post in group_posts
+            if (group_id, post.author_id) not in known
+        }
+        GroupStats.objects.filter(group_id=group_id).update(
+            posts_count=F("posts_count") + len(group_posts),
+            authors_count=F("authors_count") + len(new_authors),
+            last_post_date=later_post_date(
+                max(post.pub_date for post in group_posts)
+            ),
+        )
+
+
+def import_batch(records, media_dir=None):
+    """
+    Импортирует пачку записей в одной транзакции вместе со счётчиками
+    авторов, сводками групп, лентами подписчиков и поисковым индексом.
+    bulk_create не вызывает сигналы, поэтому всё это делается здесь явно.
+    Выполняется и в дочерних процессах пула.
+    """
+    authors = resolve_users({record["author"] for record in records})
+    groups = resolve_groups(
+        {record["group"] for record in records if record.get("group")}
+    )
+    posts = []
+    for record in records:
+        image = import_image(record.get("image"), media_dir)
+        posts.append(Post(
+            author_id=authors[record["author"]],
+            group_id=groups.get(record.get("group")),
+            text=record["text"],
+            pub_date=parse_pub_date(record.get("pub_date")),
+            image=image,
+            thumbnail_status=Post.THUMBNAIL_PENDING if image else "",
+        ))
+
+    # Первая операция транзакции — запись: в SQLite транзакция сразу
+    # берёт блокировку записи и не упирается в её повышение.
+    with transaction.atomic(), keep_pub_date():
+        Post.objects.bulk_create(posts)
+        assign_ids(posts)
+        add_posts_counts(Counter(post.author_id for post in posts))
+        add_group_counts(posts)
+        timeline.fan_out_many(posts)
+        search.index_posts(Post, posts)
+    # bulk_create не вызывает сигналы: поколения лент авторов и групп
+    # для ETag поднимаем сами, общее index — команда в конце загрузки.
+    feeds = {f"author:{post.author_id}" for post in posts}
+    feeds.update(f"group:{post.group_id}" for post in posts if post.group_id)
+    if groups:
+        feeds.add("group_stats")
+    for name in feeds:
+        bump_version(name)
+    # При DEBUG журнал запросов с текстами вставок растёт до 9000 строк.
+    reset_queries()
+    return len(posts)
@@ -4,11 +4,17 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("group/", views.group_list, name="group_list"),
     path("group/<slug>/", views.group_posts, name="group_posts"),
     path("new/", views.new_post, name="new_post"),
+    path("popular/", views.popular_posts, name="popular"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search_posts, name="search"),
+    path("notifications/", views.notification_list, name="notifications"),
     path("<str:username>/", views.profile, name="profile"),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
+    path("<str:username>/<int:post_id>/comments/", views.post_comments,
+         name="post_comments"),
     path("<str:username>/<int:post_id>/edit/", views.post_edit,
          name="post_edit"),
     path("<str:username>/<int:post_id>/comment", views.add_comment,
@@ -1,64 +1,209 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_GET, require_http_methods
 
+from yatube.db_router import writes_on_get
+
+from . import notifications, popular, search, timeline
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .page_cache import (conditional_page, following_ids, group_id,
+                         has_version, remember_id, remember_version, user_id,
+                         versioned_cache_page)
+from .paginator import CursorPaginator, PathPaginator, RankedPaginator
+from .streaming import render_chunks, stream_page
+
+
+def paginate(request, posts):
+    return get_page(
+        request,
+        CursorPaginator(posts, settings.POSTS_PER_PAGE)
+    )
+
+
+def get_page(request, paginator):
+    return paginator.get_page(
+        request.GET.get("page"),
+        cursor=request.GET.get("cursor"),
+    )
+
+
+def index_versions(request):
+    # Поиск тоже: индекс меняется вместе с записями и комментариями.
+    return ["index"]
+
+
+def popular_versions(request):
+    # Карточки меняются вместе с поколением index.
+    return ["index", "popular"]
+
+
+def group_list_versions(request):
+    return ["groups", "group_stats"]
+
+
+def group_versions(request, slug):
+    page_group_id = group_id(slug)
+    if page_group_id is None:
+        return None
+    return ["groups", f"group:{page_group_id}"]
+
 
+def author_versions(username):
+    """Записи автора и счётчики в его карточке."""
+    author_id = user_id(username)
+    if author_id is None:
+        return None
+    return [
+        "groups",
+        f"author:{author_id}",
+        f"followers:{author_id}",
+        f"following:{author_id}",
+    ]
 
-@cache_page(20, key_prefix='index_page')
+
+def profile_versions(request, username):
+    names = author_versions(username)
+    if names is not None and request.user.is_authenticated:
+        # Кнопка «Подписаться» зависит от подписок читателя.
+        names.append(f"following:{request.user.pk}")
+    return names
+
+
+def profile_body_versions(request, username):
+    # Кнопка подписки — фрагмент зрителя, тело общее.
+    return author_versions(username)
+
+
+def post_versions(request, username, post_id):
+    names = author_versions(username)
+    if names is None or not has_version(f"post:{post_id}"):
+        return None
+    return [*names, f"post:{post_id}"]
+
+
+def follow_versions(request):
+    if not request.user.is_authenticated:
+        return None
+    author_ids = following_ids(request.user.pk)
+    if author_ids is None:
+        return None
+    return [
+        "groups",
+        f"following:{request.user.pk}",
+        *(f"author:{author_id}" for author_id in author_ids),
+    ]
+
+
+@conditional_page(index_versions)
+@versioned_cache_page(index_versions)
 @require_GET
 def index(request):
-    all_posts = Post.objects.all()
+    all_posts = Post.objects.feed()
 
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    page = paginate(request, all_posts)
 
     return render(request, "index.html", {"page": page})
 
 
+@conditional_page(index_versions)
+@require_GET
+def search_posts(request):
+    query = request.GET.get("q", "").strip()
+    page = None
+    if query:
+        page = get_page(request, search.SearchPaginator(
+            query,
+            Post.objects.feed(),
+            settings.POSTS_PER_PAGE
+        ))
+
+    return render(request, "posts/search.html", {"query": query, "page": page})
+
+
+@conditional_page(popular_versions)
+@versioned_cache_page(popular_versions)
+@require_GET
+def popular_posts(request):
+    page = get_page(request, RankedPaginator(
+        popular.post_ids(),
+        Post.objects.feed(),
+        settings.POSTS_PER_PAGE
+    ))
+
+    return render(request, "posts/popular.html", {"page": page})
+
+
+@conditional_page(group_list_versions)
+@versioned_cache_page(group_list_versions)
+@require_GET
+def group_list(request):
+    paginator = PathPaginator(
+        Group.objects.select_related("stats"),
+        settings.GROUPS_PER_PAGE,
+        key_field="slug",
+    )
+
+    page = get_page(request, paginator)
+
+    return render(request, "posts/group_list.html", {"page": page})
+
+
+@conditional_page(group_versions)
+@versioned_cache_page(group_versions)
 @require_GET
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    all_posts = group.posts.all()
+    remember_id("group", slug, group.id)
+    all_posts = Post.objects.feed().filter(group=group)
 
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    page = paginate(request, all_posts)
 
     return render(request, "posts/group.html", {"group": group, "page": page})
 
 
+@conditional_page(profile_versions)
+@versioned_cache_page(profile_body_versions)
 @require_GET
 def profile(request, username):
-    user_profile = get_object_or_404(User, username=username)
-    all_posts = user_profile.posts.all()
+    user_profile = get_object_or_404(
+        User.objects.select_related("stats"),
+        username=username
+    )
+    remember_id("user", username, user_profile.id)
+    all_posts = Post.objects.feed().filter(author=user_profile)
 
-    paginator = Paginator(all_posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=user_profile
-    ).exists()
+    page = paginate(request, all_posts)
 
     return render(
         request,
         "posts/profile.html",
-        {"user_profile": user_profile, "page": page, "following": following}
+        {"user_profile": user_profile, "page": page}
     )
 
 
+@conditional_page(post_versions)
 @require_GET
 def post_view(request, username, post_id):
-    user_profile = get_object_or_404(User, username=username)
+    user_profile = get_object_or_404(
+        User.objects.select_related("stats"),
+        username=username
+    )
+    remember_id("user", username, user_profile.id)
     post = get_object_or_404(Post, id=post_id, author=user_profile.id)
+    remember_version(f"post:{post.id}")
 
     form = CommentForm()
-    comments = post.comments.all()
+    comments = get_page(request, PathPaginator(
+        post.comments.threads(),
+        settings.COMMENTS_PER_PAGE,
+    ))
+    try:
+        reply_to = int(request.GET.get("reply", ""))
+    except ValueError:
+        reply_to = None
 
     return render(
         request,
@@ -68,10 +213,43 @@ def post_view(request, username, post_id):
             "post": post,
             "form": form,
             "comments": comments,
+            "reply_to": reply_to,
         },
     )
 
 
+@conditional_page(post_versions)
+@require_GET
+def post_comments(request, username, post_id):
+    """
+    Все ветки комментариев записи одним потоковым ответом.
+
+    Начало страницы уходит клиенту до чтения комментариев, дальше они
+    рендерятся кусками по COMMENTS_STREAM_CHUNK, так что ни время до
+    первого байта, ни память не зависят от их числа. Комментарии
+    читаются уже после выхода из middleware, поэтому адреса нет
+    в REPLICA_VIEWS: чтение шло бы с разных баз.
+    """
+    user_profile = get_object_or_404(User, username=username)
+    remember_id("user", username, user_profile.id)
+    post = get_object_or_404(Post, id=post_id, author=user_profile.id)
+    remember_version(f"post:{post.id}")
+    context = {"user_profile": user_profile, "post": post}
+
+    return stream_page(
+        request,
+        "posts/post_comments.html",
+        context,
+        render_chunks(
+            "posts/comment_list.html",
+            "comments",
+            post.comments.threads(),
+            settings.COMMENTS_STREAM_CHUNK,
+            context,
+        ),
+    )
+
+
 @require_http_methods(["GET", "POST"])
 @login_required
 def new_post(request):
@@ -82,7 +260,8 @@ def new_post(request):
 
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
 
     return redirect("/")
 
@@ -103,7 +282,12 @@ def post_edit(request, username, post_id):
     )
 
     if form.is_valid():
-        form.save()
+        # Счётчик комментариев меняется в обход формы, не перезаписываем его.
+        form.save(commit=False).save(
+            update_fields=(
+                *PostForm.Meta.fields, "thumbnail_status", "updated"
+            )
+        )
         return redirect("post", username, post_id)
 
     return render(
@@ -125,21 +309,65 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.post_id = post_id
         comment.author = request.user
-        comment.save()
+        parent_id = request.POST.get("parent", "")
+        if parent_id.isdigit():
+            # Ответ только на комментарий той же записи, иначе — новая ветка.
+            comment.parent = Comment.objects.filter(
+                id=parent_id, post_id=post_id
+            ).first()
+        with transaction.atomic():
+            comment.save()
     return redirect("post", username, post_id)
 
 
+@conditional_page(follow_versions)
 @login_required()
+@versioned_cache_page(follow_versions, per_user=True)
 def follow_index(request):
-    follow_posts = Post.objects.filter(author__following__user=request.user)
+    paginator = timeline.follow_paginator(
+        request.user,
+        settings.POSTS_PER_PAGE
+    )
 
-    paginator = Paginator(follow_posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    page = get_page(request, paginator)
 
     return render(request, "posts/follow.html", {"page": page})
 
 
+@require_http_methods(["GET", "POST"])
+@login_required
+def notification_list(request):
+    """
+    Просмотр ничего не меняет: предзагрузка и обход ссылок не должны
+    отмечать уведомления. Прочитанными их отмечает кнопка — POST
+    с id самого нового показанного уведомления.
+    """
+    if request.method == "POST":
+        try:
+            up_to = int(request.POST.get("up_to", ""))
+        except ValueError:
+            up_to = None
+        notifications.mark_read(request.user.pk, up_to)
+        return redirect("notifications")
+
+    paginator = CursorPaginator(
+        request.user.notifications.select_related("actor", "post__author"),
+        settings.NOTIFICATIONS_PER_PAGE,
+        date_field="created",
+    )
+    page = get_page(request, paginator)
+    newest = None
+    if page.number == 1 and page.object_list:
+        newest = page.object_list[0].id
+
+    return render(
+        request,
+        "posts/notifications.html",
+        {"page": page, "newest": newest},
+    )
+
+
+@writes_on_get
 @login_required()
 def profile_follow(request, username):
     user_profile = get_object_or_404(User, username=username)
@@ -152,6 +380,7 @@ def profile_follow(request, username):
     return profile(request, username)
 
 
+@writes_on_get
 @login_required()
 def profile_unfollow(request, username):
     user_profile = get_object_or_404(User, username=username)
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.checks import Tags, Warning, register
+from django.db import DatabaseError
+
+from .forms import reserved_usernames
+
+
+@register(Tags.database)
+def check_reserved_usernames(app_configs, **kwargs):
+    """
+    Пользователи, чьи имена заняли новые адреса сайта: форма регистрации
+    таких больше не пропустит, а уже заведённые нужно переименовать —
+    их профиль открывает чужую страницу. Проверка идёт только
+    с manage.py check --tag database.
+    """
+    try:
+        usernames = [
+            username for username in get_user_model().objects.values_list(
+                "username", flat=True
+            ).iterator()
+            if username.lower() in reserved_usernames()
+        ]
+    except DatabaseError:
+        return []
+    return [
+        Warning(
+            f"Профиль пользователя {username} недоступен: "
+            f"адрес /{username}/ занят страницей сайта.",
+            hint="Переименуйте пользователя.",
+            id="users.W001",
+        )
+        for username in usernames
+    ]
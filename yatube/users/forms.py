@@ -1,10 +1,43 @@
+from functools import lru_cache
+
+from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import URLResolver, get_resolver
 
 User = get_user_model()
 
 
+@lru_cache(maxsize=None)
+def reserved_usernames():
+    """
+    Первые сегменты адресов сайта: group, search, internal и другие.
+    Профиль живёт по адресу /<username>/, и пользователь с таким именем
+    получил бы чужую страницу вместо своей.
+    """
+    names = set()
+    patterns = list(get_resolver().url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        route = str(pattern.pattern)
+        if not route and isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+            continue
+        segment = route.lstrip("^").split("/")[0]
+        if segment and "<" not in segment:
+            names.add(segment.lower())
+    return frozenset(names)
+
+
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+    def clean_username(self):
+        username = self.cleaned_data["username"]
+        if username.lower() in reserved_usernames():
+            raise forms.ValidationError(
+                "Это имя занято адресом сайта, выберите другое."
+            )
+        return username
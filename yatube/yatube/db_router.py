@@ -0,0 +1,97 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Cookie «читать с основной базы»: ставится после изменяющего запроса
+# и живёт REPLICA_LAG секунд, пока реплики догоняют основную базу.
+STICKY_COOKIE = "db_primary"
+
+SAFE_METHODS = ("GET", "HEAD")
+
+_local = threading.local()
+
+
+def replica_alias():
+    """Реплика, выбранная для текущего запроса, или None."""
+    return getattr(_local, "alias", None)
+
+
+def writes_on_get(view):
+    """
+    Помечает view, которое меняет данные и на GET, — например, подписку
+    по ссылке. После него, как после POST, ставится STICKY_COOKIE.
+    """
+    view.writes_on_get = True
+    return view
+
+
+class ReplicaRouter:
+    """
+    Запись всегда идёт в основную базу. Чтение уходит на реплику,
+    только если ReplicaMiddleware выбрала её для запроса, и не внутри
+    транзакции основной базы: там нужно видеть собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        # Явный default, а не None: иначе Django возьмёт базу из
+        # instance._state.db, и объект, прочитанный с реплики,
+        # потянет за собой чтение связанных объектов оттуда же.
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики — копии основной базы, схема приходит вместе с данными.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """
+    Отправляет чтение GET-запросов к REPLICA_VIEWS на случайную реплику.
+
+    После POST и других изменяющих запросов, а также после view,
+    помеченных writes_on_get, ставит cookie STICKY_COOKIE: пока она жива,
+    пользователь читает с основной базы и видит свои изменения, даже
+    если реплики отстают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.alias = None
+        writes = (
+            request.method not in SAFE_METHODS
+            or getattr(request, "writes_on_get", False)
+        )
+        if settings.DATABASE_REPLICAS and writes:
+            response.set_cookie(
+                STICKY_COOKIE, "1",
+                max_age=settings.REPLICA_LAG,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, "writes_on_get", False):
+            request.writes_on_get = True
+            return
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+        ):
+            _local.alias = random.choice(settings.DATABASE_REPLICAS)
@@ -0,0 +1,257 @@
+import atexit
+import glob
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+# Границы корзин гистограмм, миллисекунды.
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+COUNTERS = ("requests", "queries", "cache_hits", "cache_misses")
+HISTOGRAMS = ("latency_ms", "db_ms", "template_ms")
+
+_local = threading.local()
+
+
+def current():
+    """Замеры текущего запроса или None, если запрос не попал в выборку."""
+    return getattr(_local, "metrics", None)
+
+
+def record_cache(hits=0, misses=0):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: считает запросы и их время."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries += 1
+
+    def server_timing(self, total_ms):
+        return ", ".join((
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f"tpl;dur={self.template_ms:.1f}",
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f"total;dur={total_ms:.1f}",
+        ))
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return super().render(context, request)
+        # Вложенные render_to_string уже входят во время внешнего шаблона.
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_ms += (time.perf_counter() - start) * 1000
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который замеряет время рендеринга."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self
+        )
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def empty_view():
+    return {
+        **{name: 0 for name in COUNTERS},
+        **{
+            name: {"buckets": [0] * (len(BUCKETS_MS) + 1), "sum": 0.0}
+            for name in HISTOGRAMS
+        },
+    }
+
+
+def merge(target, source):
+    for view, data in source.items():
+        totals = target.setdefault(view, empty_view())
+        for name in COUNTERS:
+            totals[name] += data[name]
+        for name in HISTOGRAMS:
+            totals[name]["sum"] += data[name]["sum"]
+            totals[name]["buckets"] = [
+                left + right for left, right in zip(
+                    totals[name]["buckets"], data[name]["buckets"]
+                )
+            ]
+    return target
+
+
+class Registry:
+    """
+    Гистограммы процесса по именам view. Каждый процесс сбрасывает
+    свои данные в отдельный файл каталога DIRECTORY, collect складывает
+    файлы всех процессов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed = time.monotonic()
+
+    def observe(self, view, metrics, total_ms):
+        values = {
+            "latency_ms": total_ms,
+            "db_ms": metrics.db_ms,
+            "template_ms": metrics.template_ms,
+        }
+        with self.lock:
+            data = self.views.setdefault(view, empty_view())
+            data["requests"] += 1
+            data["queries"] += metrics.queries
+            data["cache_hits"] += metrics.cache_hits
+            data["cache_misses"] += metrics.cache_misses
+            for name, value in values.items():
+                data[name]["buckets"][bisect_left(BUCKETS_MS, value)] += 1
+                data[name]["sum"] += value
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.views))
+
+    def flush(self, directory):
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as metrics_file:
+            json.dump(self.snapshot(), metrics_file)
+        os.replace(f"{path}.tmp", path)
+        self.flushed = time.monotonic()
+
+    def maybe_flush(self, directory, interval):
+        if time.monotonic() - self.flushed >= interval:
+            self.flush(directory)
+
+
+registry = Registry()
+
+
+def collect(directory):
+    """Сумма гистограмм всех процессов, включая текущий."""
+    if not directory:
+        return registry.snapshot()
+    registry.flush(directory)
+    totals = {}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path) as metrics_file:
+                merge(totals, json.load(metrics_file))
+        except (OSError, ValueError):
+            continue
+    return totals
+
+
+@atexit.register
+def flush_at_exit():
+    registry.flush(settings.INSTRUMENTATION["DIRECTORY"])
+
+
+def exposition(totals):
+    """Текстовый формат Prometheus."""
+    lines = []
+    for name in COUNTERS:
+        lines.append(f"# TYPE yatube_{name}_total counter")
+        for view, data in sorted(totals.items()):
+            lines.append(
+                f'yatube_{name}_total{{view="{view}"}} {data[name]}'
+            )
+    for name in HISTOGRAMS:
+        lines.append(f"# TYPE yatube_{name} histogram")
+        for view, data in sorted(totals.items()):
+            histogram = data[name]
+            count = 0
+            bounds = [*map(str, BUCKETS_MS), "+Inf"]
+            for bound, bucket in zip(bounds, histogram["buckets"]):
+                count += bucket
+                lines.append(
+                    f'yatube_{name}_bucket{{view="{view}",le="{bound}"}} '
+                    f"{count}"
+                )
+            lines.append(
+                f'yatube_{name}_sum{{view="{view}"}} {histogram["sum"]:.3f}'
+            )
+            lines.append(f'yatube_{name}_count{{view="{view}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentationMiddleware:
+    """
+    Замеряет долю SAMPLE_RATE запросов: число и время запросов к базе,
+    время рендеринга шаблонов, попадания в кэш и полное время ответа.
+
+    Остальные запросы проходят без обёрток. Время базы входит во время
+    шаблонов, если queryset вычисляется при рендеринге.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = settings.INSTRUMENTATION
+
+    def __call__(self, request):
+        if random.random() >= self.options["SAMPLE_RATE"]:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        registry.observe(view, metrics, total_ms)
+        registry.maybe_flush(
+            self.options["DIRECTORY"], self.options["FLUSH_INTERVAL"]
+        )
+        if self.options["SERVER_TIMING"]:
+            response["Server-Timing"] = metrics.server_timing(total_ms)
+        return response
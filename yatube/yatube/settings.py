@@ -11,10 +11,14 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Настройки загружены тестами: manage.py test или pytest.
+TESTING = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -52,7 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "yatube.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "yatube.db_router.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -66,12 +72,28 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Замеры запросов: доля запросов в выборке, заголовок Server-Timing
+# и каталог, куда каждый процесс сбрасывает свои гистограммы раз
+# в FLUSH_INTERVAL секунд. Без каталога /internal/metrics/ показывает
+# только процесс, который обработал запрос. Server-Timing видят все
+# клиенты, поэтому он включается только явно: YATUBE_SERVER_TIMING=1.
+INSTRUMENTATION = {
+    "SAMPLE_RATE": float(os.environ.get("YATUBE_METRICS_SAMPLE_RATE", 1)),
+    "SERVER_TIMING": os.environ.get("YATUBE_SERVER_TIMING", "0") != "0",
+    "DIRECTORY": os.environ.get("YATUBE_METRICS_DIR"),
+    "FLUSH_INTERVAL": 10,
+}
+
+# /internal/metrics/ открыт персоналу и сборщику метрик с заголовком
+# Authorization: Bearer <YATUBE_METRICS_TOKEN>. Без токена — только персоналу.
+METRICS_TOKEN = os.environ.get("YATUBE_METRICS_TOKEN", "")
+
 ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "yatube.instrumentation.InstrumentedDjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -81,6 +103,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "yatube.context_processors.year",
+                "posts.context_processors.notifications",
             ],
         },
     },
@@ -92,13 +115,44 @@ WSGI_APPLICATION = "yatube.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube.sqlite_backend — sqlite3 с WAL, настройками соединения и повтором
+# запросов к занятой базе. Соединения живут между запросами.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "yatube.sqlite_backend",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": int(os.environ.get("YATUBE_DB_CONN_MAX_AGE", 60)),
     }
 }
 
+# Реплики для чтения: пути к файлам SQLite через запятую в
+# YATUBE_DB_REPLICAS. Локально копии обновляет команда sync_replicas;
+# для Postgres достаточно добавить реплики в DATABASES и их псевдонимы
+# в DATABASE_REPLICAS. GET-запросы к REPLICA_VIEWS читают с реплик,
+# а после изменяющего запроса пользователь REPLICA_LAG секунд читает
+# с основной базы.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get("YATUBE_DB_REPLICAS", "").split(",")), 1
+):
+    # sync_replicas подменяет файл реплики: соединение открывается
+    # на каждый запрос, а журнал без WAL, чтобы к новому файлу
+    # не применился -wal от старого.
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "NAME": name,
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {"pragmas": {"journal_mode": "DELETE"}},
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["yatube.db_router.ReplicaRouter"]
+# Полные имена view: JSON API (api_v1:…) читает с основной базы, иначе
+# ETag нового поколения мог бы достаться данным отставшей реплики.
+REPLICA_VIEWS = ("index", "group_posts", "profile", "post", "follow_index")
+REPLICA_LAG = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -151,11 +205,113 @@ LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 LOGOUT_REDIRECT_URL = "index"
 
+# Очередь задач после записи (posts.queue). Задачи выполняют воркеры
+# run_workers, запрос только ставит их в очередь. В тестах, а также
+# с YATUBE_TASKS_EAGER=1 (сервер разработки без воркеров) задачи
+# выполняются сразу в текущем процессе.
+# Неудачная попытка повторяется через BACKOFF * 2^(n-1) секунд,
+# после MAX_ATTEMPTS задача остаётся в состоянии failed. LEASE — сколько
+# задача числится за воркером, RETENTION — сколько хранятся выполненные
+# задачи и их ключи идемпотентности.
+TASKS = {
+    "EAGER": os.environ.get(
+        "YATUBE_TASKS_EAGER", "1" if TESTING else "0"
+    ) != "0",
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF": 5,
+    "LEASE": 300,
+    "RETENTION": 60 * 60 * 24,
+}
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Кэш должен быть общим для всех процессов сервера, иначе сброс поколений
+# страниц и ключи sorl-thumbnail не доходят до соседних воркеров.
+# По умолчанию используется файл SQLite; YATUBE_CACHE=redis переключает
+# на django-redis (пакет ставится отдельно), locmem — на память процесса.
+# В кэше лежат карточка и счётчик поколения на каждую запись, копии
+# страниц на каждый курсор и подписчика: для 20 тысяч записей это около
+# ста тысяч ключей. Стандартные 300 вытесняли бы их сразу; при
+# переполнении удаляется десятая часть, начиная с ближайших к истечению.
+CACHE_BACKENDS = {
+    "sqlite": {
+        "BACKEND": "yatube.cache.SQLiteCache",
+        "LOCATION": os.environ.get(
+            "YATUBE_CACHE_PATH",
+            os.path.join(BASE_DIR, "cache.sqlite3")
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": 200000,
+            "CULL_FREQUENCY": 10,
+        },
+    },
+    "redis": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    },
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+# Тесты держат кэш в памяти процесса: cache.clear() в них не должен
+# стирать кэш сервера разработки, а ключи — переживать прогон.
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    "default": CACHE_BACKENDS[
+        "locmem" if TESTING else os.environ.get("YATUBE_CACHE", "sqlite")
+    ],
+}
+
+POSTS_PER_PAGE = 10
+GROUPS_PER_PAGE = 50
+
+# На странице записи комментарии листаются по COMMENTS_PER_PAGE,
+# а страница всех комментариев отдаётся потоком кусками
+# по COMMENTS_STREAM_CHUNK.
+COMMENTS_PER_PAGE = 50
+COMMENTS_STREAM_CHUNK = 500
+# Глубина веток комментариев: ответ на комментарий этой глубины встаёт
+# рядом с ним. Путь в 255 символов вмещает до 22 уровней.
+COMMENT_MAX_DEPTH = 4
+
+# Уведомления листаются по NOTIFICATIONS_PER_PAGE. Дайджесты
+# (manage.py send_digests, запускается по расписанию) собираются
+# пачками по NOTIFICATION_DIGEST_BATCH получателей.
+NOTIFICATIONS_PER_PAGE = 20
+NOTIFICATION_DIGEST_BATCH = 200
+
+# Рейтинг /popular/ (posts.popular), обновляется manage.py update_popular
+# по расписанию. Вклад события падает вдвое за HALF_LIFE секунд;
+# за проход учитывается до BATCH событий каждого вида, в ленте —
+# SIZE лучших записей.
+POPULAR = {
+    "HALF_LIFE": 6 * 60 * 60,
+    "WEIGHTS": {"post": 1, "comment": 1, "follow": 3},
+    "BATCH": 5000,
+    "SIZE": 500,
 }
+
+SEARCH_BACKEND = "posts.search.SQLiteFTSBackend"
+
+# Лента подписок хранит не больше TIMELINE_LENGTH записей на пользователя.
+# Записи авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+# в ленты не раскладываются и подмешиваются при чтении.
+TIMELINE_LENGTH = 500
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Отрисованные карточки записей в лентах. Версию нужно поднять,
+# если изменился шаблон post_item.html.
+POST_CARD_CACHE_VERSION = 2
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Страницы с versioned_cache_page живут долго: устаревшие копии
+# отбрасываются по счётчику поколений, а не по таймауту.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# ETag HTML-страниц. Версию нужно поднять, если изменились шаблоны:
+# иначе браузеры продолжат показывать сохранённые копии.
+HTML_CACHE_VERSION = 2
+# Сколько секунд общий кэш (прокси, CDN) может отдавать анонимную
+# страницу без перепроверки.
+HTML_SHARED_MAX_AGE = 10
+PAGE_CACHE_LOCK_TIMEOUT = 10
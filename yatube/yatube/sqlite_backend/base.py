@@ -0,0 +1,83 @@
+import time
+
+from django.db.backends.sqlite3 import base
+
+# Применяются к каждому новому соединению. OPTIONS["pragmas"]
+# в настройках базы дополняет или переопределяет их.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -20000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# Повторы запроса, которому SQLite ответил «database is locked»,
+# с удвоением паузы. Повторяются только запросы вне транзакции.
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+
+
+def is_busy(error):
+    return "database is locked" in str(error)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """
+    Повторяет запрос, если база занята и открытой транзакции нет.
+    Такой запрос — отдельная запись в режиме autocommit или BEGIN —
+    при ошибке ничего не изменил, и повтор безопасен. Внутри транзакции
+    ошибка поднимается: её часть уже выполнена.
+    """
+
+    def execute(self, query, params=None):
+        return self.retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self.retry(super().executemany, query, param_list)
+
+    def retry(self, method, *args):
+        delay = BUSY_BACKOFF
+        for attempt in range(BUSY_RETRIES):
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                if (
+                    attempt == BUSY_RETRIES - 1
+                    or not is_busy(error)
+                    or self.connection.in_transaction
+                ):
+                    raise
+            time.sleep(delay)
+            delay *= 2
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    sqlite3 для нескольких процессов сервера: WAL, чтобы читатели
+    не ждали писателя, настройки соединения из PRAGMAS и повтор
+    запросов при занятой базе.
+
+    Транзакции atomic начинаются с BEGIN IMMEDIATE: блокировка записи
+    берётся сразу и ждёт busy_timeout. При обычном BEGIN транзакция,
+    которая сначала читает, а потом пишет, получает «database is locked»
+    без ожидания, если другой процесс успел записать.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop("pragmas", {})}
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=RetryingCursorWrapper)
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def increment(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr("counter")
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cache.sqlite3")
+        self.cache = SQLiteCache(self.path, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_delete(self):
+        """Значения сохраняются, читаются пачкой и удаляются."""
+        self.cache.set("first", {"value": 1})
+        self.cache.set_many({"second": 2, "third": 3})
+
+        self.assertEqual(self.cache.get("first"), {"value": 1})
+        self.assertEqual(
+            self.cache.get_many(["second", "third", "missing"]),
+            {"second": 2, "third": 3}
+        )
+
+        self.cache.delete("first")
+
+        self.assertIsNone(self.cache.get("first"))
+
+    def test_add_respects_existing_and_expired_keys(self):
+        """add не перезаписывает живой ключ, но занимает истёкший."""
+        self.assertTrue(self.cache.add("lock", 1))
+        self.assertFalse(self.cache.add("lock", 2))
+
+        self.cache.set("expired", 1, timeout=0)
+
+        self.assertTrue(self.cache.add("expired", 2))
+        self.assertEqual(self.cache.get("expired"), 2)
+
+    def test_incr_is_shared_between_processes(self):
+        """Счётчик атомарен для нескольких процессов."""
+        self.cache.set("counter", 0, timeout=None)
+        workers = [
+            multiprocessing.Process(target=increment, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(self.cache.get("counter"), 200)
+
+    def test_cull_keeps_permanent_keys(self):
+        """При переполнении вытесняются ключи со сроком, а не вечные."""
+        cache = SQLiteCache(self.path, {
+            "OPTIONS": {"MAX_ENTRIES": 50, "CULL_FREQUENCY": 2},
+        })
+        cache.set("page_version:index", 1, timeout=None)
+        cache.set("expired", 1, timeout=-1)
+        for number in range(400):
+            cache.set(f"card:{number}", number)
+
+        self.assertEqual(cache.get("page_version:index"), 1)
+        self.assertFalse(cache.has_key("expired"))
+        self.assertIsNone(cache.get("card:0"))
+        self.assertLessEqual(
+            len(cache.get_many(f"card:{number}" for number in range(400))),
+            100,
+        )
+
+    def test_incr_missing_key(self):
+        """incr отсутствующего ключа вызывает ValueError, как в Django."""
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+
+class TestCacheSettingsTest(SimpleTestCase):
+    def test_tests_do_not_share_the_server_cache(self):
+        """Тесты не пишут в cache.sqlite3 сервера разработки."""
+        self.assertIsInstance(caches["default"], LocMemCache)
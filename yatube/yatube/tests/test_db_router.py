@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import resolve, reverse
+
+from posts.models import Post
+
+from ..db_router import STICKY_COOKIE, ReplicaMiddleware, ReplicaRouter
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.aliases = []
+
+    def read_alias(self, request):
+        """Псевдоним базы, с которой view читал бы внутри запроса."""
+        request.resolver_match = resolve(request.path)
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            self.aliases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        response = middleware(request)
+        return self.aliases[-1], response
+
+    def test_feed_reads_go_to_replica(self):
+        alias, _ = self.read_alias(RequestFactory().get(reverse("index")))
+
+        self.assertEqual(alias, "replica1")
+        self.assertEqual(self.router.db_for_read(Post), "default")
+        self.assertEqual(self.router.db_for_write(Post), "default")
+
+    def test_other_views_read_primary(self):
+        alias, _ = self.read_alias(RequestFactory().get(reverse("new_post")))
+
+        self.assertEqual(alias, "default")
+
+    def test_read_your_writes_after_post(self):
+        """После POST пользователь читает с основной базы, пока жива
+        cookie, — реплика могла ещё не получить его изменения."""
+        _, response = self.read_alias(
+            RequestFactory().post(reverse("new_post"))
+        )
+        cookie = response.cookies[STICKY_COOKIE]
+        request = RequestFactory().get(reverse("index"))
+        request.COOKIES[STICKY_COOKIE] = cookie.value
+        alias, _ = self.read_alias(request)
+
+        self.assertEqual(cookie["max-age"], 10)
+        self.assertEqual(alias, "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_nothing_changes(self):
+        alias, response = self.read_alias(
+            RequestFactory().post(reverse("new_post"))
+        )
+
+        self.assertEqual(alias, "default")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaStickinessTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(
+            User.objects.create_user(username="ReplicaAuthor")
+        )
+
+    def test_new_post_sets_sticky_cookie(self):
+        response = self.client.post(reverse("new_post"), {"text": "Fresh"})
+
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_follow_link_sets_sticky_cookie(self):
+        """Подписка по ссылке — GET, но следующая лента читается
+        с основной базы."""
+        User.objects.create_user(username="ReplicaFollowed")
+
+        for name in ("profile_follow", "profile_unfollow"):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(name, kwargs={"username": "ReplicaFollowed"})
+                )
+
+                self.assertIn(STICKY_COOKIE, response.cookies)
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import instrumentation
+from ..instrumentation import Registry, RequestMetrics
+
+User = get_user_model()
+
+
+def instrumentation_settings(**options):
+    return override_settings(
+        INSTRUMENTATION={**settings.INSTRUMENTATION, **options}
+    )
+
+
+class InstrumentationMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        instrumentation.registry.views.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_server_timing_header(self):
+        """Заголовок Server-Timing показывает базу, шаблоны и кэш."""
+        with instrumentation_settings(SAMPLE_RATE=1, SERVER_TIMING=True):
+            response = Client().get(reverse("index"))
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+        self.assertIn('cache;desc="hit=0 miss=1"', timing)
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+
+    def test_server_timing_is_off_by_default(self):
+        """Число запросов и тайминги не уходят каждому клиенту."""
+        with instrumentation_settings(SAMPLE_RATE=1):
+            response = Client().get(reverse("index"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertIn("index", instrumentation.registry.views)
+
+    def test_unsampled_requests_are_not_instrumented(self):
+        with instrumentation_settings(SAMPLE_RATE=0):
+            response = Client().get(reverse("index"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(instrumentation.registry.views, {})
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_endpoint(self):
+        """Метрики отдают гистограммы по именам view сборщику с токеном,
+        адрес клиента доступа не даёт."""
+        with instrumentation_settings(DIRECTORY=self.directory):
+            Client().get(reverse("index"))
+            Client().get(reverse("index"))
+            response = Client().get(
+                reverse("metrics"),
+                HTTP_AUTHORIZATION="Bearer scrape-secret",
+            )
+            forbidden = [
+                Client(REMOTE_ADDR="127.0.0.1").get(reverse("metrics")),
+                Client().get(
+                    reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong"
+                ),
+            ]
+
+        body = response.content.decode()
+        self.assertIn('yatube_requests_total{view="index"} 2', body)
+        self.assertIn(
+            'yatube_latency_ms_bucket{view="index",le="+Inf"} 2', body
+        )
+        self.assertIn('yatube_cache_hits_total{view="index"} 1', body)
+        self.assertEqual(
+            [response.status_code for response in forbidden], [403, 403]
+        )
+
+    def test_metrics_for_staff_without_token(self):
+        staff = Client()
+        staff.force_login(
+            User.objects.create_user(username="MetricsStaff", is_staff=True)
+        )
+
+        self.assertEqual(staff.get(reverse("metrics")).status_code, 200)
+        self.assertEqual(Client().get(reverse("metrics")).status_code, 403)
+
+    def test_collect_merges_process_files(self):
+        """Гистограммы процессов из общего каталога складываются."""
+        metrics = RequestMetrics()
+        metrics.queries = 3
+        other = Registry()
+        other.observe("index", metrics, 7)
+        with open(os.path.join(self.directory, "1.json"), "w") as data:
+            json.dump(other.views, data)
+        instrumentation.registry.observe("index", metrics, 70)
+
+        totals = instrumentation.collect(self.directory)
+
+        self.assertEqual(totals["index"]["requests"], 2)
+        self.assertEqual(totals["index"]["queries"], 6)
+        self.assertEqual(sum(totals["index"]["latency_ms"]["buckets"]), 2)
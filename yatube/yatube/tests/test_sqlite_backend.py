@@ -0,0 +1,51 @@
+import sqlite3
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from ..sqlite_backend import base
+
+
+class SQLiteBackendTest(TestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            synchronous = cursor.fetchone()[0]
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout = cursor.fetchone()[0]
+
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(busy_timeout, 5000)
+
+
+@mock.patch.object(base, "BUSY_BACKOFF", 0)
+class RetryOnBusyTest(SimpleTestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:", isolation_level=None)
+        self.cursor = self.connection.cursor(
+            factory=base.RetryingCursorWrapper
+        )
+        self.calls = 0
+
+    def tearDown(self):
+        self.connection.close()
+
+    def locked_twice(self):
+        self.calls += 1
+        if self.calls <= 2:
+            raise sqlite3.OperationalError("database is locked")
+        return "done"
+
+    def test_statement_outside_transaction_is_retried(self):
+        self.assertEqual(self.cursor.retry(self.locked_twice), "done")
+        self.assertEqual(self.calls, 3)
+
+    def test_statement_inside_transaction_is_not_retried(self):
+        """Часть транзакции уже выполнена — повторять один запрос нельзя."""
+        self.connection.execute("BEGIN")
+        self.connection.execute("CREATE TABLE t (id INTEGER)")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            self.cursor.retry(self.locked_twice)
+        self.assertEqual(self.calls, 1)
@@ -8,10 +8,13 @@ from . import views
 urlpatterns = [
     path("404/", views.page_not_found),
     path("500/", views.server_error),
+    # Служебные адреса живут под одним префиксом.
+    path("internal/metrics/", views.metrics, name="metrics"),
     path("admin/", admin.site.urls),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("api/v1/", include("posts.api_urls")),
     path("", include("posts.urls")),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
@@ -1,7 +1,13 @@
+import hmac
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import instrumentation
+
 
 def page_not_found(request, exception=None):
     return render(request, "misc/404.html",
@@ -12,3 +18,27 @@ def page_not_found(request, exception=None):
 def server_error(request):
     return render(request, "misc/500.html",
                   status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def has_metrics_token(request):
+    """
+    Заголовок Authorization: Bearer METRICS_TOKEN. Адрес клиента
+    не проверяется: за обратным прокси все запросы приходят с локального.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, value = header.partition(" ")
+    if not token or scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(value.strip().encode(), token.encode())
+
+
+def metrics(request):
+    """Гистограммы в формате Prometheus для персонала и сборщика."""
+    if not (request.user.is_staff or has_metrics_token(request)):
+        raise PermissionDenied
+    totals = instrumentation.collect(settings.INSTRUMENTATION["DIRECTORY"])
+    return HttpResponse(
+        instrumentation.exposition(totals),
+        content_type="text/plain; version=0.0.4"
+    )